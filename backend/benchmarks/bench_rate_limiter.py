@@ -0,0 +1,63 @@
+"""
+频率限制器基准：大量不同 IP 下的单次检查延迟与内存
+
+依次用 N 个不同 IP 各请求一次，按批次统计平均延迟，验证延迟不随已跟踪 IP 数量增长，
+且跟踪的键数量受 max_keys 限制。
+
+运行：
+    python benchmarks/bench_rate_limiter.py --ips 1000000 --max-keys 100000
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import argparse
+import resource
+import time
+
+from codegate.utils.rate_limiter import MemoryRateLimitStore, RateLimiter
+
+
+def _ip(i: int) -> str:
+    return f"{(i >> 24) & 255}.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="频率限制器基准")
+    parser.add_argument("--ips", type=int, default=1_000_000, help="不同 IP 数量")
+    parser.add_argument("--max-keys", type=int, default=100_000, help="限流器最多跟踪的键数量")
+    parser.add_argument("--batches", type=int, default=10, help="统计批次数")
+    args = parser.parse_args()
+
+    store = MemoryRateLimitStore(max_keys=args.max_keys)
+    limiter = RateLimiter(store)
+    ips = [_ip(i) for i in range(args.ips)]
+    batch_size = max(1, args.ips // args.batches)
+
+    for start in range(0, args.ips, batch_size):
+        batch = ips[start:start + batch_size]
+        began = time.perf_counter()
+        for ip in batch:
+            limiter.check_rate_limit(ip, max_attempts=60, time_window_seconds=60)
+        elapsed = time.perf_counter() - began
+        print(
+            f"IP {start + len(batch):>9,}  平均 {elapsed / len(batch) * 1e6:6.2f}µs/次  "
+            f"跟踪键 {len(store):>8,}"
+        )
+
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"峰值 RSS {max_rss_mb:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
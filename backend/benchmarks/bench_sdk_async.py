@@ -0,0 +1,130 @@
+"""
+SDK API 数据库访问基准：同步 Session vs 异步 AsyncSession
+
+模拟 SDK 路由（async def）在并发负载下的表现：若干慢查询与大量快查询并发执行，
+统计快查询的延迟分布。同步 Session 会阻塞事件循环，慢查询期间所有快查询都被拖慢；
+异步会话下快查询不受影响。
+
+运行：
+    python benchmarks/bench_sdk_async.py --fast 200 --slow 4
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from codegate.database import Base
+from codegate.models import Project
+from codegate.services.project import ProjectService
+
+# 递归 CTE 制造一个耗时约百毫秒级的查询
+SLOW_QUERY = text(
+    "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < :rows) "
+    "SELECT SUM(x) FROM n"
+)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * pct))
+    return ordered[index]
+
+
+def _report(name: str, latencies: list[float], elapsed: float) -> None:
+    print(
+        f"{name:<6} fast p50={statistics.median(latencies) * 1000:8.2f}ms "
+        f"p95={_percentile(latencies, 0.95) * 1000:8.2f}ms "
+        f"max={max(latencies) * 1000:8.2f}ms total={elapsed:6.2f}s"
+    )
+
+
+async def run_sync_mode(db_path: Path, project_id: str, fast: int, slow: int, rows: int) -> None:
+    """当前行为：async 路由中直接调用同步 Session"""
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    factory = sessionmaker(bind=engine)
+    latencies: list[float] = []
+
+    async def fast_request() -> None:
+        start = time.perf_counter()
+        await asyncio.sleep(0)
+        with factory() as db:
+            ProjectService.get_by_id(db, project_id)
+        latencies.append(time.perf_counter() - start)
+
+    async def slow_request() -> None:
+        await asyncio.sleep(0)
+        with factory() as db:
+            db.execute(SLOW_QUERY, {"rows": rows}).scalar()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[slow_request() for _ in range(slow)], *[fast_request() for _ in range(fast)])
+    _report("sync", latencies, time.perf_counter() - start)
+    engine.dispose()
+
+
+async def run_async_mode(db_path: Path, project_id: str, fast: int, slow: int, rows: int) -> None:
+    """异步路径：AsyncSession + run_sync 复用服务层"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", pool_size=slow + 5, max_overflow=fast)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    latencies: list[float] = []
+
+    async def fast_request() -> None:
+        start = time.perf_counter()
+        async with factory() as db:
+            await db.run_sync(ProjectService.get_by_id, project_id)
+        latencies.append(time.perf_counter() - start)
+
+    async def slow_request() -> None:
+        async with factory() as db:
+            (await db.execute(SLOW_QUERY, {"rows": rows})).scalar()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[slow_request() for _ in range(slow)], *[fast_request() for _ in range(fast)])
+    _report("async", latencies, time.perf_counter() - start)
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SDK API 同步/异步数据库访问延迟对比")
+    parser.add_argument("--fast", type=int, default=200, help="并发快查询数量")
+    parser.add_argument("--slow", type=int, default=4, help="并发慢查询数量")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="慢查询递归行数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        engine = create_engine(f"sqlite:///{db_path}")
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            project = Project(name="bench", status=True)
+            db.add(project)
+            db.commit()
+            project_id = project.id
+        engine.dispose()
+
+        asyncio.run(run_sync_mode(db_path, project_id, args.fast, args.slow, args.rows))
+        asyncio.run(run_async_mode(db_path, project_id, args.fast, args.slow, args.rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,11 +15,13 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..config import settings
+from ..database import get_db, get_db_context
 from ..schemas.invitation_code import (
     CodeGenerateRequest,
     CodeUpdateRequest,
@@ -27,6 +29,7 @@ from ..schemas.invitation_code import (
     InvitationCodeListResponse,
     BatchDisableUnusedRequest,
     BatchDisableUnusedResponse,
+    CodeImportResponse,
 )
 from ..schemas.auth import AdminResponse
 from ..api.auth import require_admin
@@ -80,36 +83,156 @@ def get_codes(
     is_disabled: Optional[bool] = Query(None, description="是否禁用筛选（True=已禁用, False=未禁用）"),
     is_expired: Optional[bool] = Query(None, description="是否过期筛选（True=已过期, False=未过期）"),
     search: Optional[str] = Query(None, description="搜索关键词"),
+    cursor: Optional[str] = Query(None, description="游标（上一页返回的 next_cursor，传入时忽略 page）"),
+    include_total: bool = Query(True, description="是否统计总数（False 时 total 为空，不执行 COUNT）"),
     db: Session = Depends(get_db),
     current_admin: AdminResponse = Depends(require_admin),
 ):
     """
     获取激活码列表
+
+    支持页码分页与游标分页：每页响应都带有 next_cursor，翻页时传入 cursor
+    即按 (created_at, id) 键集分页，深页查询开销与页码无关。
     """
     # 检查项目是否存在
     project = ProjectService.get_by_id(db=db, project_id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
 
-    codes, total = CodeService.get_list(
-        db=db,
-        project_id=project_id,
-        page=page,
-        page_size=page_size,
-        status=status,
-        is_disabled=is_disabled,
-        is_expired=is_expired,
-        search=search,
-    )
+    try:
+        codes, total, next_cursor = CodeService.get_list(
+            db=db,
+            project_id=project_id,
+            page=page,
+            page_size=page_size,
+            status=status,
+            is_disabled=is_disabled,
+            is_expired=is_expired,
+            search=search,
+            cursor=cursor,
+            with_total=include_total,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return InvitationCodeListResponse(
         total=total,
         page=page,
         page_size=page_size,
         items=[InvitationCodeResponse.model_validate(c) for c in codes],
+        next_cursor=next_cursor,
+    )
+
+
+# 导出格式对应的媒体类型
+EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def build_export_response(
+    project_id: str,
+    export_format: str,
+    compress: bool,
+    **filters: Any,
+) -> StreamingResponse:
+    """
+    构建激活码流式导出响应
+
+    导出在独立的数据库会话中进行（响应开始发送后请求级会话可能已关闭），
+    调用方需事先校验项目与导出格式。
+    """
+    def stream():
+        with get_db_context() as export_db:
+            yield from CodeService.iter_export(
+                export_db, project_id, export_format=export_format, compress=compress, **filters
+            )
+
+    filename = f"codes-{project_id}.{export_format}" + (".gz" if compress else "")
+    return StreamingResponse(
+        stream(),
+        media_type="application/gzip" if compress else EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
+@router.get("/export")
+def export_codes(
+    project_id: str,
+    http_request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="导出格式（csv / ndjson）"),
+    gzip: bool = Query(False, description="是否 gzip 压缩"),
+    status: Optional[bool] = Query(None, description="状态筛选（True=已使用, False=未使用）"),
+    is_disabled: Optional[bool] = Query(None, description="是否禁用筛选（True=已禁用, False=未禁用）"),
+    is_expired: Optional[bool] = Query(None, description="是否过期筛选（True=已过期, False=未过期）"),
+    search: Optional[str] = Query(None, description="搜索关键词"),
+    db: Session = Depends(get_db),
+    current_admin: AdminResponse = Depends(require_admin),
+):
+    """
+    流式导出激活码（CSV / NDJSON，可选 gzip）
+
+    筛选条件与激活码列表相同，不分页、不计数，内存占用与导出数量无关。
+    """
+    # 检查项目是否存在
+    project = ProjectService.get_by_id(db=db, project_id=project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="项目不存在")
+
+    # 记录审计日志
+    log_admin(db, "export_codes", current_admin.id, "project", project_id, "success",
+              request=http_request, format=format, gzip=gzip, status=status,
+              is_disabled=is_disabled, is_expired=is_expired, search=search)
+    db.commit()
+
+    return build_export_response(
+        project_id, format, gzip,
+        status=status, is_disabled=is_disabled, is_expired=is_expired, search=search,
+    )
+
+
+@router.post("/import", response_model=CodeImportResponse)
+def import_codes(
+    project_id: str,
+    http_request: Request,
+    file: UploadFile = File(..., description="导入文件（CSV / JSON，UTF-8）"),
+    format: Optional[str] = Query(None, pattern="^(csv|json)$", description="文件格式（默认按文件扩展名识别）"),
+    db: Session = Depends(get_db),
+    current_admin: AdminResponse = Depends(require_admin),
+):
+    """
+    批量导入激活码（CSV / JSON）
+
+    上传文件由框架暂存到临时文件，服务端按块流式解析并分块写入；
+    无效行、重复行与已存在的激活码在响应中逐行列出，其余行正常导入。
+    """
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail=f"文件大小不能超过 {settings.MAX_UPLOAD_SIZE} 字节")
+
+    import_format = format
+    if import_format is None:
+        extension = (file.filename or "").rsplit(".", 1)[-1].lower()
+        if extension not in ("csv", "json"):
+            raise HTTPException(status_code=400, detail="无法识别文件格式，请指定 format（csv / json）")
+        import_format = extension
+
+    try:
+        report = CodeService.import_codes(db=db, project_id=project_id, stream=file.file, import_format=import_format)
+    except ProjectNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        log_admin(db, "import_codes", current_admin.id, "project", project_id, "failed",
+                  request=http_request, filename=file.filename, format=import_format, reason=str(e))
+        db.commit()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 记录审计日志
+    log_admin(db, "import_codes", current_admin.id, "project", project_id, "success",
+              request=http_request, filename=file.filename, format=import_format,
+              total=report["total"], imported_count=report["imported_count"],
+              rejected_count=report["rejected_count"])
+    db.commit()
+    return report
+
+
 @router.get("/{code_id}", response_model=InvitationCodeResponse)
 def get_code(
     project_id: str,
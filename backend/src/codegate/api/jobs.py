@@ -0,0 +1,54 @@
+"""
+定时任务 API 路由
+
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..schemas.auth import AdminResponse
+from ..schemas.job import ScheduledJobListResponse, ScheduledJobResponse
+from ..api.auth import require_admin
+from ..jobs.scheduler import get_job_status
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.get("", response_model=ScheduledJobListResponse)
+def list_jobs(
+    db: Session = Depends(get_db),
+    current_admin: AdminResponse = Depends(require_admin),
+):
+    """
+    获取内置定时任务的运行状态（所有 worker 共享，最近一次运行的耗时与处理行数）
+    """
+    return ScheduledJobListResponse(
+        items=[
+            ScheduledJobResponse.model_validate({
+                "name": job.name,
+                "interval_seconds": job.interval_seconds,
+                "running": job.lease_owner is not None,
+                "last_started_at": job.last_started_at,
+                "last_finished_at": job.last_finished_at,
+                "last_duration_seconds": job.last_duration_seconds,
+                "last_status": job.last_status,
+                "last_result": job.last_result,
+                "last_error": job.last_error,
+            })
+            for job in get_job_status(db)
+        ]
+    )
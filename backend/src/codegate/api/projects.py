@@ -16,21 +16,24 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from fastapi import Request
 
-from ..database import get_db
+from ..database import get_db, get_db_context
 from ..models.project import Project
 from ..schemas.project import (
     ProjectCreate,
     ProjectUpdate,
     ProjectResponse,
+    ProjectUpdateResponse,
     ProjectListResponse,
 )
 from ..schemas.auth import AdminResponse
-from ..services.project import ProjectService
+from ..schemas.verification import VerificationSeriesResponse
+from ..services.project import ProjectPurgeService, ProjectService
+from ..services.verification import VerificationService
 from ..api.auth import require_admin
 from ..core.exceptions import (
     ProjectNotFoundError,
@@ -122,21 +125,53 @@ def get_project(
             "code_count": stats["total"],
             "verified_count": stats["verified"],
             "unverified_count": stats["unverified"],
+            "disabled_count": stats["disabled"],
             "expired_count": stats["expired"],
         }
     )
 
 
-@router.put("/{project_id}", response_model=ProjectResponse)
+@router.get("/{project_id}/verification-series", response_model=VerificationSeriesResponse)
+def get_verification_series(
+    project_id: str,
+    granularity: str = Query("hour", description="时间粒度（hour/day）"),
+    start_time: Optional[int] = Query(None, description="开始时间（UTC时间戳，秒级，默认 24 小时/30 天前）"),
+    end_time: Optional[int] = Query(None, description="结束时间（UTC时间戳，秒级，默认当前时间）"),
+    db: Session = Depends(get_db),
+    current_admin: AdminResponse = Depends(require_admin),
+):
+    """
+    获取项目核销成功/失败次数的时间序列（按小时或按天）
+    """
+    try:
+        items = VerificationService.get_series(
+            db=db,
+            project_id=project_id,
+            start_time=start_time,
+            end_time=end_time,
+            granularity=granularity,
+        )
+    except ProjectNotFoundError:
+        raise HTTPException(status_code=404, detail="项目不存在")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return VerificationSeriesResponse(project_id=project_id, granularity=granularity, items=items)
+
+
+@router.put("/{project_id}", response_model=ProjectUpdateResponse)
 def update_project(
     request: Request,
     project_id: str,
     project_data: ProjectUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_admin: AdminResponse = Depends(require_admin),
 ):
     """
     更新项目
+
+    过期时间变更时同步重算跟随项目过期的激活码，受影响数量较多时在响应后分块重算。
     """
     try:
         # 获取更新前的项目信息
@@ -148,7 +183,7 @@ def update_project(
             "expires_at": old_project.expires_at.isoformat() if old_project and old_project.expires_at else None,
         } if old_project else None
 
-        project = ProjectService.update(db=db, project_id=project_id, project_data=project_data)
+        project, expiry = ProjectService.update(db=db, project_id=project_id, project_data=project_data)
 
         # 记录审计日志
         new_data = {
@@ -158,9 +193,14 @@ def update_project(
             "expires_at": project.expires_at.isoformat() if project.expires_at else None,
         }
         log_admin(db, "update_project", current_admin.id, "project", project_id, "success",
-                  request=request, before=old_data, after=new_data)
+                  request=request, before=old_data, after=new_data, codes_expiry=expiry)
         db.commit()
-        return ProjectResponse.model_validate(project)
+        if expiry["deferred"]:
+            background_tasks.add_task(_recompute_code_expiry, project_id)
+        response = ProjectUpdateResponse.model_validate(project)
+        response.codes_expiry_updated = expiry["updated"]
+        response.codes_expiry_pending = expiry["deferred"]
+        return response
     except ProjectNotFoundError as e:
         log_admin(db, "update_project", current_admin.id, "project", project_id, "failed",
                   request=request, reason=str(e))
@@ -177,11 +217,14 @@ def update_project(
 def delete_project(
     request: Request,
     project_id: str,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_admin: AdminResponse = Depends(require_admin),
 ):
     """
     删除项目
+
+    项目立即禁用并从列表中移除，激活码和核销日志在响应后按块清除（中断后由清理任务继续）。
     """
     try:
         # 获取删除前的项目信息
@@ -191,14 +234,34 @@ def delete_project(
             "description": old_project.description if old_project else None,
         } if old_project else None
 
-        ProjectService.delete(db=db, project_id=project_id)
+        ProjectService.request_delete(db=db, project_id=project_id, requested_by=current_admin.id)
 
         # 记录审计日志
         log_admin(db, "delete_project", current_admin.id, "project", project_id, "success",
                   request=request, deleted=deleted_data)
         db.commit()
+        background_tasks.add_task(_purge_project, project_id)
     except ProjectNotFoundError as e:
         log_admin(db, "delete_project", current_admin.id, "project", project_id, "failed",
                   request=request, reason=str(e))
         db.commit()
         raise HTTPException(status_code=404, detail=str(e))
+
+
+def _recompute_code_expiry(project_id: str) -> None:
+    """后台分块重算跟随项目过期时间的激活码（使用独立会话，每块提交）"""
+    with get_db_context() as recompute_db:
+        try:
+            ProjectService.recompute_code_expiry(recompute_db, project_id)
+        except ProjectNotFoundError:
+            pass
+
+
+def _purge_project(project_id: str) -> None:
+    """后台按块清除项目（使用独立会话，每块提交）"""
+    with get_db_context() as purge_db:
+        try:
+            ProjectPurgeService.purge(purge_db, project_id)
+        except ProjectNotFoundError:
+            # 已被并发的删除请求或清理任务清除
+            pass
@@ -5,14 +5,18 @@ SDK API 认证依赖
 """
 import hmac
 import hashlib
+import tempfile
 import time
 import urllib.parse
 from typing import Optional, Dict
 from fastapi import Request, HTTPException, Header, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...database import get_db
+from ...config import settings
+from ...database import get_async_db
 from ...models.api_key import ApiKey
+from ...services.api_key.api_key_cache import CachedApiKey, api_key_cache, api_key_usage
 
 # 空字符串的 SHA256 哈希值（常量）
 EMPTY_STRING_HASH = "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
@@ -20,6 +24,9 @@ EMPTY_STRING_HASH = "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b785
 # 时间戳窗口（秒），默认 ±5 分钟
 TIMESTAMP_WINDOW = 300
 
+# 非 JSON 请求体（上传文件）在内存中暂存的上限，超过后写入临时文件
+SPOOL_MAX_MEMORY_SIZE = 1024 * 1024
+
 
 def verify_signature(
     method: str,
@@ -28,7 +35,8 @@ def verify_signature(
     body: Optional[str],
     timestamp: int,
     secret: str,
-    signature: str
+    signature: str,
+    body_hash: Optional[str] = None
 ) -> bool:
     """
     验证 HMAC-SHA256 签名
@@ -41,6 +49,7 @@ def verify_signature(
         timestamp: 时间戳
         secret: API Secret
         signature: 客户端提供的签名
+        body_hash: 已计算的请求体 SHA256（提供时忽略 body）
     
     Returns:
         签名是否有效
@@ -53,10 +62,11 @@ def verify_signature(
         query_string = ""
     
     # 2. 计算请求体哈希
-    if body:
-        body_hash = hashlib.sha256(body.encode('utf-8')).hexdigest()
-    else:
-        body_hash = EMPTY_STRING_HASH
+    if body_hash is None:
+        if body:
+            body_hash = hashlib.sha256(body.encode('utf-8')).hexdigest()
+        else:
+            body_hash = EMPTY_STRING_HASH
     
     # 3. 构建签名字符串
     string_to_sign = f"{method}\n{path}\n{query_string}\n{body_hash}\n{timestamp}"
@@ -72,20 +82,46 @@ def verify_signature(
     return hmac.compare_digest(expected_signature, signature)
 
 
+async def _spool_request_body(request: Request) -> str:
+    """
+    流式读取请求体：计算 SHA256，同时暂存到 request.state.body_file（超过 1MB 写入临时文件）
+
+    Returns:
+        请求体 SHA256 十六进制字符串
+
+    Raises:
+        HTTPException: 请求体超过上传大小限制
+    """
+    digest = hashlib.sha256()
+    body_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY_SIZE)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > settings.MAX_UPLOAD_SIZE:
+            body_file.close()
+            raise HTTPException(status_code=413, detail="Request body too large")
+        digest.update(chunk)
+        body_file.write(chunk)
+    body_file.seek(0)
+    request.state.body_file = body_file
+    return digest.hexdigest()
+
+
 async def verify_sdk_auth(
     request: Request,
     x_api_key: str = Header(..., alias="X-API-Key"),
     x_timestamp: str = Header(..., alias="X-Timestamp"),
     x_signature: str = Header(..., alias="X-Signature"),
-    db: Session = Depends(get_db)
-) -> ApiKey:
+    db: AsyncSession = Depends(get_async_db)
+) -> CachedApiKey:
     """
     SDK API 认证依赖
     
-    验证 API Key 和 HMAC 签名
+    验证 API Key 和 HMAC 签名。API Key 查询结果进程内缓存（含无效 Key 的负缓存），
+    最后使用时间写入内存缓冲，由后台任务批量写回。
     
     Returns:
-        ApiKey 对象
+        CachedApiKey 只读快照
     
     Raises:
         HTTPException: 认证失败
@@ -105,23 +141,32 @@ async def verify_sdk_auth(
             detail="Timestamp expired. Request timestamp is too old or too far in the future."
         )
     
-    # 3. 查询 API Key
-    from sqlalchemy import select
-    stmt = select(ApiKey).where(
-        ApiKey.api_key == x_api_key,
-        ApiKey.is_active == True
-    )
-    api_key = db.execute(stmt).scalar_one_or_none()
+    # 3. 查询 API Key（优先命中缓存）
+    hit, api_key = api_key_cache.get(x_api_key)
+    if not hit:
+        generation = api_key_cache.generation
+        stmt = select(ApiKey).where(
+            ApiKey.api_key == x_api_key,
+            ApiKey.is_active == True
+        )
+        model = (await db.execute(stmt)).scalar_one_or_none()
+        api_key = CachedApiKey.from_model(model) if model else None
+        api_key_cache.set(x_api_key, api_key, generation)
     
     if not api_key:
         raise HTTPException(status_code=401, detail="Invalid API credentials")
     
     # 4. 获取请求体和查询参数
     body = None
+    body_hash = None
     if request.method in ["POST", "PUT", "PATCH"]:
-        body_bytes = await request.body()
-        if body_bytes:
-            body = body_bytes.decode('utf-8')
+        if request.headers.get("content-type", "").startswith("application/json"):
+            body_bytes = await request.body()
+            if body_bytes:
+                body = body_bytes.decode('utf-8')
+        else:
+            # 上传文件：边接收边计算哈希，不在内存中缓存完整请求体
+            body_hash = await _spool_request_body(request)
     
     # 获取查询参数
     query_params = dict(request.query_params)
@@ -137,13 +182,12 @@ async def verify_sdk_auth(
         body=body,
         timestamp=timestamp,
         secret=api_key.secret,
-        signature=x_signature
+        signature=x_signature,
+        body_hash=body_hash
     ):
         raise HTTPException(status_code=401, detail="Invalid signature")
     
-    # 7. 更新最后使用时间
-    from datetime import datetime
-    api_key.last_used_at = datetime.utcnow()
-    db.commit()
+    # 7. 记录最后使用时间（批量写回，不在请求内开启写事务）
+    api_key_usage.record(api_key.id)
     
     return api_key
@@ -0,0 +1,50 @@
+"""
+SDK API 频率限制依赖
+
+按 IP 与按 API Key 分别限流，计数存储由 RATE_LIMIT_BACKEND 决定。
+"""
+from fastapi import Depends, HTTPException, Request
+
+from ...config import settings
+from ...services.api_key.api_key_cache import CachedApiKey
+from ...utils.rate_limiter import rate_limiter
+from .auth import verify_sdk_auth
+
+# 限流时间窗口（秒）
+RATE_LIMIT_WINDOW_SECONDS = 60
+
+
+def _raise_rate_limited() -> None:
+    raise HTTPException(
+        status_code=429,
+        detail="Rate limit exceeded",
+        headers={"Retry-After": str(RATE_LIMIT_WINDOW_SECONDS)},
+    )
+
+
+def limit_sdk_ip(request: Request) -> None:
+    """
+    SDK API 按 IP 限流（在认证之前执行，同时限制无效凭证的尝试）
+
+    Raises:
+        HTTPException: 超过频率限制（429）
+    """
+    if not settings.RATE_LIMIT_ENABLED or not request.client:
+        return
+    if not rate_limiter.hit(f"sdk:ip:{request.client.host}", settings.SDK_RATE_LIMIT_PER_IP,
+                            RATE_LIMIT_WINDOW_SECONDS):
+        _raise_rate_limited()
+
+
+def limit_sdk_api_key(api_key: CachedApiKey = Depends(verify_sdk_auth)) -> None:
+    """
+    SDK API 按 API Key 限流
+
+    Raises:
+        HTTPException: 超过频率限制（429）
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    if not rate_limiter.hit(f"sdk:key:{api_key.id}", settings.SDK_RATE_LIMIT_PER_API_KEY,
+                            RATE_LIMIT_WINDOW_SECONDS):
+        _raise_rate_limited()
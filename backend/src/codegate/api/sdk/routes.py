@@ -5,17 +5,21 @@ SDK API 路由
 """
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Request, Query
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
 import math
 
-from ...database import get_db
-from ...models.api_key import ApiKey
+from ...database import get_async_db, get_db_context
+from ...services.api_key.api_key_cache import CachedApiKey
 from ...services.project import ProjectService
 from ...services.code import CodeService
 from ...services.verification import VerificationService
-from ...schemas.verification import VerificationRequest
+from ...schemas.verification import VerificationRequest, VerificationSeriesResponse
+from ...schemas.invitation_code import CodeImportResponse
 from .auth import verify_sdk_auth
+from ..codes import build_export_response
+from .rate_limit import limit_sdk_api_key, limit_sdk_ip
 from ...schemas.utils import datetime_to_timestamp
 from ...core.exceptions import (
     CodeNotFoundError,
@@ -24,10 +28,17 @@ from ...core.exceptions import (
     CodeExpiredError,
     ProjectDisabledError,
     ProjectExpiredError,
+    ProjectNotFoundError,
 )
+from ...core.constants import MAX_BATCH_VERIFY_COUNT
 from urllib.parse import unquote
 
-router = APIRouter(prefix="/api/v1", tags=["sdk_api"])
+# 限流依赖为同步函数，由 FastAPI 在线程池中执行，Redis 存储的网络往返不阻塞事件循环
+router = APIRouter(
+    prefix="/api/v1",
+    tags=["sdk_api"],
+    dependencies=[Depends(limit_sdk_ip), Depends(limit_sdk_api_key)],
+)
 
 
 class ProjectStatistics(BaseModel):
@@ -54,8 +65,8 @@ class SDKProjectResponse(BaseModel):
 async def get_project(
     project_id: str,
     request: Request,
-    db: Session = Depends(get_db),
-    api_key: ApiKey = Depends(verify_sdk_auth),
+    db: AsyncSession = Depends(get_async_db),
+    api_key: CachedApiKey = Depends(verify_sdk_auth),
 ):
     """
     获取项目信息
@@ -70,7 +81,7 @@ async def get_project(
         )
 
     # 获取项目
-    project = ProjectService.get_by_id(db=db, project_id=project_id)
+    project = await db.run_sync(ProjectService.get_by_id, project_id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -79,7 +90,7 @@ async def get_project(
         raise HTTPException(status_code=401, detail="Project is disabled")
 
     # 获取统计信息
-    stats = ProjectService.get_code_stats(db=db, project_id=project_id)
+    stats = await db.run_sync(ProjectService.get_code_stats, project_id=project_id)
 
     # 转换时间戳
     created_at = datetime_to_timestamp(project.created_at) if project.created_at else None
@@ -118,10 +129,29 @@ class CodeItem(BaseModel):
 class CodeListResponse(BaseModel):
     """激活码列表响应"""
     items: list[CodeItem]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+def _status_filters(status: Optional[str]) -> tuple[Optional[bool], Optional[bool], Optional[bool]]:
+    """
+    将 SDK 状态筛选参数转换为 (status, is_disabled, is_expired) 筛选条件
+
+    Args:
+        status: unused / used / disabled / expired
+    """
+    if status == "unused":
+        return False, False, False
+    if status == "used":
+        return True, False, False
+    if status == "disabled":
+        return None, True, None
+    if status == "expired":
+        return None, None, True
+    return None, None, None
 
 
 @router.get("/projects/{project_id}/codes", response_model=CodeListResponse)
@@ -132,12 +162,15 @@ async def list_codes(
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
     status: Optional[str] = Query(None, description="状态筛选（unused/used/disabled/expired）"),
     search: Optional[str] = Query(None, description="搜索关键词"),
-    db: Session = Depends(get_db),
-    api_key: ApiKey = Depends(verify_sdk_auth),
+    cursor: Optional[str] = Query(None, description="游标（上一页返回的 next_cursor，传入时忽略 page）"),
+    include_total: bool = Query(True, description="是否统计总数（False 时 total、total_pages 为空）"),
+    db: AsyncSession = Depends(get_async_db),
+    api_key: CachedApiKey = Depends(verify_sdk_auth),
 ):
     """
     查询激活码列表
 
+    支持页码分页与游标分页（传入 next_cursor 取下一页）；
     需要 SDK API 认证（API Key + HMAC 签名）
     """
     # 验证项目 ID 匹配
@@ -148,7 +181,7 @@ async def list_codes(
         )
 
     # 检查项目是否存在
-    project = ProjectService.get_by_id(db=db, project_id=project_id)
+    project = await db.run_sync(ProjectService.get_by_id, project_id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -157,34 +190,24 @@ async def list_codes(
         raise HTTPException(status_code=401, detail="Project is disabled")
 
     # 转换状态筛选参数
-    status_bool = None
-    is_disabled = None
-    is_expired = None
-
-    if status == "unused":
-        status_bool = False
-        is_disabled = False
-        is_expired = False
-    elif status == "used":
-        status_bool = True
-        is_disabled = False
-        is_expired = False
-    elif status == "disabled":
-        is_disabled = True
-    elif status == "expired":
-        is_expired = True
+    status_bool, is_disabled, is_expired = _status_filters(status)
 
     # 查询激活码列表
-    codes, total = CodeService.get_list(
-        db=db,
-        project_id=project_id,
-        page=page,
-        page_size=page_size,
-        status=status_bool,
-        is_disabled=is_disabled,
-        is_expired=is_expired,
-        search=search,
-    )
+    try:
+        codes, total, next_cursor = await db.run_sync(
+            CodeService.get_list,
+            project_id=project_id,
+            page=page,
+            page_size=page_size,
+            status=status_bool,
+            is_disabled=is_disabled,
+            is_expired=is_expired,
+            search=search,
+            cursor=cursor,
+            with_total=include_total,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # 转换为响应格式
     items = []
@@ -201,7 +224,9 @@ async def list_codes(
             created_at=datetime_to_timestamp(code.created_at) if code.created_at else 0,
         ))
 
-    total_pages = math.ceil(total / page_size) if total > 0 else 0
+    total_pages = None
+    if total is not None:
+        total_pages = math.ceil(total / page_size) if total > 0 else 0
 
     return CodeListResponse(
         items=items,
@@ -209,6 +234,7 @@ async def list_codes(
         page=page,
         page_size=page_size,
         total_pages=total_pages,
+        next_cursor=next_cursor,
     )
 
 
@@ -235,13 +261,52 @@ class CodeDetailResponse(BaseModel):
     verification_logs: list[VerificationLogItem] = []
 
 
+@router.get("/projects/{project_id}/codes/export")
+async def export_codes(
+    project_id: str,
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="导出格式（csv / ndjson）"),
+    gzip: bool = Query(False, description="是否 gzip 压缩"),
+    status: Optional[str] = Query(None, description="状态筛选（unused/used/disabled/expired）"),
+    search: Optional[str] = Query(None, description="搜索关键词"),
+    db: AsyncSession = Depends(get_async_db),
+    api_key: CachedApiKey = Depends(verify_sdk_auth),
+):
+    """
+    流式导出激活码（CSV / NDJSON，可选 gzip）
+
+    需要 SDK API 认证（API Key + HMAC 签名）
+    """
+    # 验证项目 ID 匹配
+    if api_key.project_id != project_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Project ID in path does not match API Key's project"
+        )
+
+    # 检查项目是否存在
+    project = await db.run_sync(ProjectService.get_by_id, project_id=project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # 检查项目状态
+    if not project.status:
+        raise HTTPException(status_code=401, detail="Project is disabled")
+
+    status_bool, is_disabled, is_expired = _status_filters(status)
+    return build_export_response(
+        project_id, format, gzip,
+        status=status_bool, is_disabled=is_disabled, is_expired=is_expired, search=search,
+    )
+
+
 @router.get("/projects/{project_id}/codes/{code_id}", response_model=CodeDetailResponse)
 async def get_code(
     project_id: str,
     code_id: str,
     request: Request,
-    db: Session = Depends(get_db),
-    api_key: ApiKey = Depends(verify_sdk_auth),
+    db: AsyncSession = Depends(get_async_db),
+    api_key: CachedApiKey = Depends(verify_sdk_auth),
 ):
     """
     查询单个激活码详情
@@ -256,7 +321,7 @@ async def get_code(
         )
 
     # 检查项目是否存在
-    project = ProjectService.get_by_id(db=db, project_id=project_id)
+    project = await db.run_sync(ProjectService.get_by_id, project_id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -265,7 +330,7 @@ async def get_code(
         raise HTTPException(status_code=401, detail="Project is disabled")
 
     # 通过 ID 查询激活码（仅支持 UUID 格式）
-    code = CodeService.get_by_id(db=db, code_id=code_id)
+    code = await db.run_sync(CodeService.get_by_id, code_id=code_id)
 
     if not code:
         raise HTTPException(status_code=404, detail="Code not found")
@@ -275,7 +340,7 @@ async def get_code(
         raise HTTPException(status_code=404, detail="Code not found")
 
     # 获取核销日志
-    logs, _ = VerificationService.get_logs(db=db, code_id=code.id, page=1, page_size=100)
+    logs, _ = await db.run_sync(VerificationService.get_logs, code_id=code.id, page=1, page_size=100)
 
     return CodeDetailResponse(
         id=code.id,
@@ -305,8 +370,8 @@ async def get_code_by_code(
     project_id: str,
     code: str,
     request: Request,
-    db: Session = Depends(get_db),
-    api_key: ApiKey = Depends(verify_sdk_auth),
+    db: AsyncSession = Depends(get_async_db),
+    api_key: CachedApiKey = Depends(verify_sdk_auth),
 ):
     """
     通过激活码内容查询
@@ -324,7 +389,7 @@ async def get_code_by_code(
         )
 
     # 检查项目是否存在
-    project = ProjectService.get_by_id(db=db, project_id=project_id)
+    project = await db.run_sync(ProjectService.get_by_id, project_id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -333,7 +398,7 @@ async def get_code_by_code(
         raise HTTPException(status_code=401, detail="Project is disabled")
 
     # 查询激活码
-    code_obj = CodeService.get_by_code(db=db, code=decoded_code)
+    code_obj = await db.run_sync(CodeService.get_by_code, code=decoded_code)
     if not code_obj:
         raise HTTPException(status_code=404, detail="Code not found")
 
@@ -342,7 +407,7 @@ async def get_code_by_code(
         raise HTTPException(status_code=404, detail="Code not found")
 
     # 获取核销日志
-    logs, _ = VerificationService.get_logs(db=db, code_id=code_obj.id, page=1, page_size=100)
+    logs, _ = await db.run_sync(VerificationService.get_logs, code_id=code_obj.id, page=1, page_size=100)
 
     return CodeDetailResponse(
         id=code_obj.id,
@@ -383,13 +448,36 @@ class VerifyResponse(BaseModel):
     error_code: Optional[str] = None
 
 
+# 核销业务异常 -> (message, error_code)
+VERIFY_ERROR_CODES = {
+    CodeNotFoundError: ("Code not found", "CODE_NOT_FOUND"),
+    CodeAlreadyVerifiedError: ("Code has already been used", "CODE_ALREADY_USED"),
+    CodeDisabledError: ("Code is disabled", "CODE_DISABLED"),
+    CodeExpiredError: ("Code is expired", "CODE_EXPIRED"),
+    ProjectDisabledError: ("Project is disabled", "PROJECT_DISABLED"),
+    ProjectExpiredError: ("Project is expired", "PROJECT_EXPIRED"),
+}
+VERIFY_ERRORS = tuple(VERIFY_ERROR_CODES)
+
+
+def _verify_error_response(code: str, error: Exception) -> VerifyResponse:
+    """将核销业务异常转换为核销响应"""
+    message, error_code = VERIFY_ERROR_CODES[type(error)]
+    return VerifyResponse(
+        success=False,
+        code=code,
+        message=message,
+        error_code=error_code,
+    )
+
+
 @router.post("/projects/{project_id}/codes/verify", response_model=VerifyResponse)
 async def verify_code(
     project_id: str,
     request: Request,
     verify_request: VerifyRequest,
-    db: Session = Depends(get_db),
-    api_key: ApiKey = Depends(verify_sdk_auth),
+    db: AsyncSession = Depends(get_async_db),
+    api_key: CachedApiKey = Depends(verify_sdk_auth),
 ):
     """
     核销激活码
@@ -404,7 +492,7 @@ async def verify_code(
         )
 
     # 检查项目是否存在
-    project = ProjectService.get_by_id(db=db, project_id=project_id)
+    project = await db.run_sync(ProjectService.get_by_id, project_id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -418,8 +506,8 @@ async def verify_code(
             code=verify_request.code,
             verified_by=verify_request.verified_by,
         )
-        code = VerificationService.verify(
-            db=db,
+        code = await db.run_sync(
+            VerificationService.verify,
             request=verification_req,
             ip_address=ip_address,
             user_agent=user_agent,
@@ -432,49 +520,129 @@ async def verify_code(
             verified_at=datetime_to_timestamp(code.verified_at) if code.verified_at else None,
             message="Code verified successfully",
         )
-    except CodeNotFoundError:
-        return VerifyResponse(
-            success=False,
-            code=verify_request.code,
-            message="Code not found",
-            error_code="CODE_NOT_FOUND",
-        )
-    except CodeAlreadyVerifiedError:
-        return VerifyResponse(
-            success=False,
-            code=verify_request.code,
-            message="Code has already been used",
-            error_code="CODE_ALREADY_USED",
-        )
-    except CodeDisabledError:
-        return VerifyResponse(
-            success=False,
-            code=verify_request.code,
-            message="Code is disabled",
-            error_code="CODE_DISABLED",
-        )
-    except CodeExpiredError:
-        return VerifyResponse(
-            success=False,
-            code=verify_request.code,
-            message="Code is expired",
-            error_code="CODE_EXPIRED",
+    except VERIFY_ERRORS as e:
+        return _verify_error_response(verify_request.code, e)
+
+
+class VerifyBatchRequest(BaseModel):
+    """批量核销请求"""
+    codes: list[str] = Field(..., min_length=1, max_length=MAX_BATCH_VERIFY_COUNT)
+    verified_by: Optional[str] = None
+
+
+class VerifyBatchResponse(BaseModel):
+    """批量核销响应"""
+    items: list[VerifyResponse]
+    success_count: int
+    failed_count: int
+
+
+@router.post("/projects/{project_id}/codes/verify-batch", response_model=VerifyBatchResponse)
+async def verify_codes_batch(
+    project_id: str,
+    request: Request,
+    verify_request: VerifyBatchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    api_key: CachedApiKey = Depends(verify_sdk_auth),
+):
+    """
+    批量核销激活码
+
+    逐个返回核销结果，错误码与单个核销接口一致；
+    需要 SDK API 认证（API Key + HMAC 签名）
+    """
+    # 验证项目 ID 匹配
+    if api_key.project_id != project_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Project ID in path does not match API Key's project"
         )
-    except ProjectDisabledError:
-        return VerifyResponse(
-            success=False,
-            code=verify_request.code,
-            message="Project is disabled",
-            error_code="PROJECT_DISABLED",
+
+    # 获取客户端信息
+    ip_address = request.client.host if request.client else None
+    user_agent = request.headers.get("user-agent")
+
+    try:
+        results = await db.run_sync(
+            VerificationService.verify_batch,
+            project_id=project_id,
+            codes=verify_request.codes,
+            verified_by=verify_request.verified_by,
+            ip_address=ip_address,
+            user_agent=user_agent,
         )
-    except ProjectExpiredError:
-        return VerifyResponse(
-            success=False,
-            code=verify_request.code,
-            message="Project is expired",
-            error_code="PROJECT_EXPIRED",
+    except ProjectNotFoundError:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    items = []
+    for result in results:
+        if result["error"] is not None:
+            items.append(_verify_error_response(result["code"], result["error"]))
+            continue
+        items.append(VerifyResponse(
+            success=True,
+            code_id=result["code_id"],
+            code=result["code"],
+            verified_at=datetime_to_timestamp(result["verified_at"]),
+            message="Code verified successfully",
+        ))
+
+    success_count = sum(1 for item in items if item.success)
+    return VerifyBatchResponse(
+        items=items,
+        success_count=success_count,
+        failed_count=len(items) - success_count,
+    )
+
+
+def _import_codes(project_id: str, body_file, import_format: str) -> dict:
+    """在独立的同步会话中导入激活码（由线程池执行，解析与写入不阻塞事件循环）"""
+    with get_db_context() as import_db, body_file:
+        return CodeService.import_codes(import_db, project_id, body_file, import_format)
+
+
+@router.post("/projects/{project_id}/codes/import", response_model=CodeImportResponse)
+async def import_codes(
+    project_id: str,
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|json)$", description="文件格式（csv / json）"),
+    db: AsyncSession = Depends(get_async_db),
+    api_key: CachedApiKey = Depends(verify_sdk_auth),
+):
+    """
+    批量导入激活码
+
+    请求体为文件原始内容（Content-Type: application/octet-stream），签名中的请求体哈希
+    为文件内容的 SHA256；认证时请求体已流式暂存，不整体读入内存。
+    需要 SDK API 认证（API Key + HMAC 签名）
+    """
+    # 验证项目 ID 匹配
+    if api_key.project_id != project_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Project ID in path does not match API Key's project"
         )
 
+    # 检查项目是否存在
+    project = await db.run_sync(ProjectService.get_by_id, project_id=project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # 检查项目状态
+    if not project.status:
+        raise HTTPException(status_code=401, detail="Project is disabled")
+
+    body_file = getattr(request.state, "body_file", None)
+    if body_file is None:
+        raise HTTPException(status_code=400, detail="Request body must be sent as application/octet-stream")
+
+    try:
+        return await run_in_threadpool(_import_codes, project_id, body_file, format)
+    except ProjectNotFoundError:
+        raise HTTPException(status_code=404, detail="Project not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 class ReactivateRequest(BaseModel):
     """重新激活请求"""
@@ -498,8 +666,8 @@ async def reactivate_code(
     project_id: str,
     request: Request,
     reactivate_request: ReactivateRequest,
-    db: Session = Depends(get_db),
-    api_key: ApiKey = Depends(verify_sdk_auth),
+    db: AsyncSession = Depends(get_async_db),
+    api_key: CachedApiKey = Depends(verify_sdk_auth),
 ):
     """
     重新激活激活码
@@ -514,7 +682,7 @@ async def reactivate_code(
         )
 
     # 检查项目是否存在
-    project = ProjectService.get_by_id(db=db, project_id=project_id)
+    project = await db.run_sync(ProjectService.get_by_id, project_id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -528,7 +696,7 @@ async def reactivate_code(
         )
 
     # 查询激活码
-    code = CodeService.get_by_code(db=db, code=reactivate_request.code)
+    code = await db.run_sync(CodeService.get_by_code, code=reactivate_request.code)
     if not code:
         return ReactivateResponse(
             success=False,
@@ -576,7 +744,7 @@ async def reactivate_code(
     code.verified_at = None
     code.verified_by = None
 
-    updated_code = CodeService.update(db=db, code=code)
+    updated_code = await db.run_sync(CodeService.update, code=code)
 
     # 记录核销日志（重新激活）
     from datetime import datetime
@@ -595,8 +763,8 @@ async def reactivate_code(
         result="reactivated",
         reason=reactivate_request.reason,
     )
-    VerificationRepository.create(db, log)
-    db.commit()
+    await db.run_sync(VerificationRepository.create, log)
+    await db.commit()
 
     return ReactivateResponse(
         success=True,
@@ -623,8 +791,8 @@ class StatisticsResponse(BaseModel):
 async def get_statistics(
     project_id: str,
     request: Request,
-    db: Session = Depends(get_db),
-    api_key: ApiKey = Depends(verify_sdk_auth),
+    db: AsyncSession = Depends(get_async_db),
+    api_key: CachedApiKey = Depends(verify_sdk_auth),
 ):
     """
     获取项目统计信息
@@ -639,7 +807,7 @@ async def get_statistics(
         )
 
     # 检查项目是否存在
-    project = ProjectService.get_by_id(db=db, project_id=project_id)
+    project = await db.run_sync(ProjectService.get_by_id, project_id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -648,13 +816,13 @@ async def get_statistics(
         raise HTTPException(status_code=401, detail="Project is disabled")
 
     # 获取统计信息
-    stats = ProjectService.get_code_stats(db=db, project_id=project_id)
+    stats = await db.run_sync(ProjectService.get_code_stats, project_id=project_id)
 
     total = stats.get("total", 0)
     used = stats.get("verified", 0)
     unused = stats.get("unverified", 0)
     expired = stats.get("expired", 0)
-    disabled = 0  # 需要单独统计
+    disabled = stats.get("disabled", 0)
 
     # 计算使用率
     usage_rate = (used / total) if total > 0 else 0.0
@@ -675,7 +843,7 @@ async def get_statistics(
         .order_by(desc(InvitationCode.verified_at))
         .limit(10)
     )
-    recent_codes = db.execute(recent_codes_query).scalars().all()
+    recent_codes = (await db.execute(recent_codes_query)).scalars().all()
 
     recent_verifications = [
         {
@@ -696,3 +864,48 @@ async def get_statistics(
         usage_rate=round(usage_rate, 4),
         recent_verifications=recent_verifications,
     )
+
+
+@router.get("/projects/{project_id}/statistics/verifications", response_model=VerificationSeriesResponse)
+async def get_verification_series(
+    project_id: str,
+    request: Request,
+    granularity: str = Query("hour", description="时间粒度（hour/day）"),
+    start_time: Optional[int] = Query(None, description="开始时间（UTC时间戳，秒级，默认 24 小时/30 天前）"),
+    end_time: Optional[int] = Query(None, description="结束时间（UTC时间戳，秒级，默认当前时间）"),
+    db: AsyncSession = Depends(get_async_db),
+    api_key: CachedApiKey = Depends(verify_sdk_auth),
+):
+    """
+    获取项目核销成功/失败次数的时间序列（按小时或按天）
+
+    需要 SDK API 认证（API Key + HMAC 签名）
+    """
+    # 验证项目 ID 匹配
+    if api_key.project_id != project_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Project ID in path does not match API Key's project"
+        )
+
+    # 检查项目是否存在
+    project = await db.run_sync(ProjectService.get_by_id, project_id=project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # 检查项目状态
+    if not project.status:
+        raise HTTPException(status_code=401, detail="Project is disabled")
+
+    try:
+        items = await db.run_sync(
+            VerificationService.get_series,
+            project_id=project_id,
+            start_time=start_time,
+            end_time=end_time,
+            granularity=granularity,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return VerificationSeriesResponse(project_id=project_id, granularity=granularity, items=items)
@@ -78,6 +78,50 @@ class Settings(BaseSettings):
     CORS_ORIGINS: list[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
     RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_PER_MINUTE: int = 60
+    RATE_LIMIT_MAX_KEYS: int = 100000  # 进程内限流最多跟踪的键数量（超过后按 LRU 淘汰）
+    # 限流存储：memory（各进程独立计数）| redis（多进程/多实例共享计数）
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    RATE_LIMIT_REDIS_TIMEOUT_SECONDS: float = 0.5  # Redis 读写/连接超时（超时或故障时改用进程内限流）
+    # SDK API 限流（每分钟）
+    SDK_RATE_LIMIT_PER_API_KEY: int = 60
+    SDK_RATE_LIMIT_PER_IP: int = 600
+
+    # SDK API Key 缓存配置
+    API_KEY_CACHE_TTL_SECONDS: int = 30  # 启用中 API Key 的缓存时间（0 表示不缓存）
+    API_KEY_NEGATIVE_CACHE_TTL_SECONDS: int = 5  # 无效 API Key 的负缓存时间
+    API_KEY_CACHE_MAX_ENTRIES: int = 10000
+    API_KEY_LAST_USED_FLUSH_SECONDS: int = 5  # last_used_at 批量写回间隔
+
+    # 项目概览缓存配置
+    DASHBOARD_CACHE_TTL_SECONDS: int = 10  # 概览快照缓存时间（0 表示不缓存）
+
+    # 内置定时任务（多 worker 之间通过数据库租约保证同一任务只运行一份）
+    JOB_SCHEDULER_ENABLED: bool = True
+    JOB_UPDATE_EXPIRED_INTERVAL_SECONDS: int = 3600  # 更新激活码过期状态（0 表示不运行）
+    JOB_CLEANUP_EXPIRED_INTERVAL_SECONDS: int = 0  # 清理过期项目（会删除数据，默认不运行）
+    JOB_LEASE_SECONDS: int = 3600  # SQLite 租约时长（应大于任务耗时；worker 异常退出后到期释放）
+    JOB_SHUTDOWN_TIMEOUT_SECONDS: int = 30  # 关闭时等待运行中任务的最长时间
+
+    # 激活码过期引擎（在截止时间到达时标记过期，定时任务作为兜底）
+    EXPIRY_ENGINE_ENABLED: bool = True
+    EXPIRY_ENGINE_HORIZON_SECONDS: int = 300  # 每次加载未来多长时间内的截止时间（其他 worker 写入的截止时间最长在此时间后发现）
+
+    # 核销日志 / 审计日志写入模式：
+    # buffered（请求提交后进入内存队列，由后台线程批量写入；进程异常退出时可能丢失未写入的日志）
+    # sync（在请求事务内同步写入，与业务数据一同提交）
+    LOG_WRITE_MODE: str = "buffered"
+    LOG_WRITER_QUEUE_SIZE: int = 10000  # 队列容量
+    LOG_WRITER_BATCH_SIZE: int = 500  # 累积到该条数时立即写入
+    LOG_WRITER_FLUSH_INTERVAL_MS: int = 200  # 最长写入间隔（毫秒）
+    LOG_WRITER_ENQUEUE_TIMEOUT_SECONDS: float = 1.0  # 队列满时同步请求在提交前的最长等待时间（提交时仍满则丢弃日志）
+
+    # 审计日志存储：database（audit_logs 表）| file（本地 JSON Lines 文件，按大小/时间轮转并压缩）
+    # | fanout（同时写入数据库与文件，从数据库读取）
+    AUDIT_SINK: str = "database"
+    AUDIT_FILE_DIR: str = "./audit_logs"
+    AUDIT_FILE_MAX_BYTES: int = 64 * 1024 * 1024  # 活动分段达到该大小后压缩轮转
+    AUDIT_FILE_ROTATE_SECONDS: int = 86400  # 活动分段最长写入时间（秒）
 
     # 文件上传配置
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
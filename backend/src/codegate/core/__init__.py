@@ -42,6 +42,8 @@ from .constants import (
     MAX_BATCH_GENERATE_COUNT,
     MAX_BATCH_DELETE_COUNT,
     MAX_BATCH_IMPORT_COUNT,
+    MAX_BATCH_VERIFY_COUNT,
+    CODE_INSERT_CHUNK_SIZE,
     DEFAULT_CLEANUP_RETENTION_DAYS,
 )
 
@@ -71,5 +73,7 @@ __all__ = [
     "MAX_BATCH_GENERATE_COUNT",
     "MAX_BATCH_DELETE_COUNT",
     "MAX_BATCH_IMPORT_COUNT",
+    "MAX_BATCH_VERIFY_COUNT",
+    "CODE_INSERT_CHUNK_SIZE",
     "DEFAULT_CLEANUP_RETENTION_DAYS",
 ]
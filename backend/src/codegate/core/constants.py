@@ -32,6 +32,8 @@ MIN_PAGE = 1
 MAX_BATCH_GENERATE_COUNT = 10000
 MAX_BATCH_DELETE_COUNT = 1000
 MAX_BATCH_IMPORT_COUNT = 50000
+MAX_BATCH_VERIFY_COUNT = 500
+CODE_INSERT_CHUNK_SIZE = 1000  # 批量写入激活码时每个 INSERT 分块的行数
 
 # 项目配置
 MAX_PROJECT_NAME_LENGTH = 100
@@ -44,6 +46,12 @@ MAX_CODE_SUFFIX_LENGTH = 10
 # 文件上传配置
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
 ALLOWED_IMPORT_FORMATS = ["csv", "json"]
+ALLOWED_EXPORT_FORMATS = ["csv", "ndjson"]
+EXPORT_BATCH_SIZE = 1000  # 导出时每批从数据库游标读取的行数
+
+# 核销统计配置
+ALLOWED_SERIES_GRANULARITIES = ["hour", "day"]
+MAX_SERIES_POINTS = 10000  # 单次查询的最大时间桶数量（按小时约 13 个月）
 
 # 验证配置
 MAX_VERIFICATION_ATTEMPTS = 5  # 同一IP的最大验证尝试次数
@@ -51,3 +59,6 @@ VERIFICATION_RATE_LIMIT_SECONDS = 60  # 验证频率限制（秒）
 
 # 数据清理配置
 DEFAULT_CLEANUP_RETENTION_DAYS = 90  # 默认保留天数
+DEFAULT_EXPIRY_BATCH_SIZE = 1000  # 过期状态更新任务每块更新的行数
+DEFAULT_PURGE_BATCH_SIZE = 1000  # 清除项目时每块删除的行数
+PROJECT_EXPIRY_INLINE_LIMIT = 10000  # 项目过期时间变更时在同一事务内重算的激活码上限（超过后分块后台重算）
@@ -25,6 +25,7 @@ from pathlib import Path
 from typing import Optional
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from .config import settings
 
@@ -38,6 +39,19 @@ except ImportError:
     _postgresql_available = False
     logger.warning("psycopg2 未安装，PostgreSQL 支持可能受限")
 
+# 异步驱动（可选，SDK API 使用）
+try:
+    import aiosqlite  # noqa: F401
+    _aiosqlite_available = True
+except ImportError:
+    _aiosqlite_available = False
+
+try:
+    import asyncpg  # noqa: F401
+    _asyncpg_available = True
+except ImportError:
+    _asyncpg_available = False
+
 
 def _build_database_url() -> str:
     """根据配置构建数据库连接 URL"""
@@ -130,6 +144,64 @@ else:
     raise ValueError(f"不支持的数据库类型: {db_type}")
 
 
+# 异步引擎（与同步引擎指向同一数据库，供 SDK API 使用，避免阻塞事件循环）
+async_engine = None
+AsyncSessionLocal = None
+
+
+def _build_async_database_url(url: str) -> Optional[str]:
+    """将同步连接 URL 转换为异步驱动 URL，驱动未安装时返回 None"""
+    if url.startswith("sqlite"):
+        if not _aiosqlite_available:
+            return None
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    if url.startswith("postgresql"):
+        if not _asyncpg_available:
+            return None
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    return None
+
+
+async_database_url = _build_async_database_url(database_url)
+
+if async_database_url is None:
+    logger.warning("异步数据库驱动未安装（aiosqlite / asyncpg），SDK API 不可用")
+
+elif db_type == "sqlite":
+    async_engine = create_async_engine(
+        async_database_url,
+        connect_args={"timeout": 30},
+        echo=settings.DATABASE_ECHO,
+        pool_pre_ping=True,
+    )
+
+    # 与同步引擎保持一致的 PRAGMA
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def set_async_sqlite_pragma(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+else:
+    async_engine = create_async_engine(
+        async_database_url,
+        echo=settings.DATABASE_ECHO,
+        pool_pre_ping=True,
+        pool_size=10,
+        max_overflow=20,
+    )
+
+if async_engine is not None:
+    # expire_on_commit=False：提交后仍可在协程中读取对象属性，不触发隐式 IO
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
 # 数据库基类
 
 
@@ -154,6 +226,22 @@ def get_db() -> Session:
         db.close()
 
 
+async def get_async_db() -> AsyncSession:
+    """
+    获取异步数据库会话（依赖注入）
+
+    同步的服务层函数可通过 ``await db.run_sync(func, ...)`` 在该会话上执行，
+    数据库 IO 不会阻塞事件循环。
+
+    Yields:
+        AsyncSession: 异步数据库会话
+    """
+    if AsyncSessionLocal is None:
+        raise RuntimeError("异步数据库驱动未安装，请安装 aiosqlite（SQLite）或 asyncpg（PostgreSQL）")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 @contextmanager
 def get_db_context():
     """
@@ -180,12 +268,24 @@ def init_db():
     # 使用 SQLAlchemy 创建表
     # 导入所有模型以确保表被注册
     from .models import Project, InvitationCode, VerificationLog, Admin, AuditLog, ApiKey
+    from .models.code_search import install_search_index
+    from .models.project_code_counter import install_code_counters
+    from .models.verification_rollup import install_verification_rollups
     from .services.auth import AuthService
     from .services.auth.auth_repository import AuthRepository
     from sqlalchemy import select
 
     Base.metadata.create_all(bind=engine)
 
+    # create_all 不会为已存在的表补建新增的索引，逐个检查后创建
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as connection:
+        install_search_index(connection)
+        install_code_counters(connection)
+        install_verification_rollups(connection)
+
     # 创建默认管理员账户（如果不存在）
     with get_db_context() as db:
         # 检查是否已存在管理员
@@ -15,195 +15,189 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, func, or_, select
 
 from ..database import get_db_context
 from ..models.project import Project
 from ..models.invitation_code import InvitationCode
 from ..models.verification_log import VerificationLog
-from ..core.constants import DEFAULT_CLEANUP_RETENTION_DAYS
+from ..services.code import CodeRepository
+from ..services.project import CodeCounterRepository, ProjectPurgeService
+from ..core.constants import DEFAULT_CLEANUP_RETENTION_DAYS, DEFAULT_EXPIRY_BATCH_SIZE, DEFAULT_PURGE_BATCH_SIZE
+from ..core.exceptions import ProjectNotFoundError
 
 
 def cleanup_expired_codes(
     retention_days: int = DEFAULT_CLEANUP_RETENTION_DAYS,
     dry_run: bool = False,
+    batch_size: int = DEFAULT_PURGE_BATCH_SIZE,
+    throttle_seconds: float = 0.0,
 ) -> dict:
     """
     清理过期项目的激活码和日志
 
+    过期超过保留期的项目登记清除任务后按块删除（见 ProjectPurgeService），
+    同时继续此前中断的清除任务（包括管理端删除项目时未完成的清除）。
+
     Args:
         retention_days: 保留天数（过期项目在过期后保留多少天）
-        dry_run: 是否仅模拟运行（不实际删除）
+        dry_run: 是否仅模拟运行（只统计数量，不实际删除）
+        batch_size: 每块删除的行数
+        throttle_seconds: 每块提交后的休眠时间
 
     Returns:
         dict: 清理统计信息
     """
+    began = time.perf_counter()
     cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
 
     stats = {
         "projects_deleted": 0,
         "codes_deleted": 0,
         "logs_deleted": 0,
+        "chunks": 0,
+        "elapsed_seconds": 0.0,
         "dry_run": dry_run,
     }
 
     with get_db_context() as db:
-        # 查找所有已过期且超过保留期的项目
-        expired_projects = db.query(Project).filter(
-            and_(
+        # 查找所有已过期且超过保留期的项目，以及未完成的清除任务
+        expired_ids = db.execute(
+            select(Project.id).where(
                 Project.expires_at.isnot(None),
                 Project.expires_at < cutoff_date,
             )
-        ).all()
-
-        for project in expired_projects:
-            # 统计该项目的激活码和日志数量
-            code_count = db.query(InvitationCode).filter(
-                InvitationCode.project_id == project.id
-            ).count()
-
-            log_count = db.query(VerificationLog).join(InvitationCode).filter(
-                InvitationCode.project_id == project.id
-            ).count()
-
-            if not dry_run:
-                # 删除项目（级联删除激活码和日志）
-                db.delete(project)
-                db.commit()
-
-            stats["projects_deleted"] += 1
-            stats["codes_deleted"] += code_count
-            stats["logs_deleted"] += log_count
-
+        ).scalars().all()
+        project_ids = list(dict.fromkeys([*ProjectPurgeService.list_pending(db), *expired_ids]))
+
+        if dry_run:
+            if project_ids:
+                # 激活码数量读计数器，日志数量一次聚合查询
+                stats["codes_deleted"] = sum(
+                    CodeCounterRepository.get_stats(db, project_id)["total"] for project_id in project_ids
+                )
+                stats["logs_deleted"] = db.execute(
+                    select(func.count(VerificationLog.id))
+                    .join(InvitationCode, InvitationCode.id == VerificationLog.code_id)
+                    .where(InvitationCode.project_id.in_(project_ids))
+                ).scalar()
+            stats["projects_deleted"] = len(project_ids)
+        else:
+            for project_id in project_ids:
+                try:
+                    result = ProjectPurgeService.purge(db, project_id, batch_size, throttle_seconds)
+                except ProjectNotFoundError:
+                    # 已被并发的删除请求清除
+                    continue
+                stats["projects_deleted"] += 1
+                stats["codes_deleted"] += result["codes_deleted"]
+                stats["logs_deleted"] += result["logs_deleted"]
+                stats["chunks"] += result["chunks"]
+
+    stats["elapsed_seconds"] = round(time.perf_counter() - began, 3)
     return stats
 
 
-def update_expired_status(dry_run: bool = False) -> dict:
+def update_expired_status(
+    dry_run: bool = False,
+    batch_size: int = DEFAULT_EXPIRY_BATCH_SIZE,
+    throttle_seconds: float = 0.0,
+) -> dict:
     """
     更新激活码的过期状态（定时任务）
 
     根据设计文档 code_status_logic.md 的要求：
     - 定时任务自动更新：定时任务（如每小时）检查所有激活码
-    - 如果 expires_at 已过且 is_expired=False，则设置 is_expired=True
+    - 如果 expires_at 已过且 is_expired=False，则设置 is_expired=True（仅未使用且未禁用的激活码，状态互斥）
     - 如果 expires_at 未到且 is_expired=True（可能被延长），则设置 is_expired=False
+    - 修复违反状态互斥的旧数据（code_status_logic.md 7.2）
+
+    每类更新按主键顺序分块执行 UPDATE ... WHERE id IN (...)，每块单独提交，
+    不把激活码加载为 ORM 对象，也不会长时间持有写锁。
 
     Args:
-        dry_run: 是否仅模拟运行（不实际更新）
+        dry_run: 是否仅模拟运行（只统计数量，不实际更新）
+        batch_size: 每块更新的行数
+        throttle_seconds: 每块提交后的休眠时间（降低对在线请求的影响）
 
     Returns:
-        dict: 更新统计信息
+        dict: 更新统计信息（含分块数与耗时）
     """
+    began = time.perf_counter()
     now = datetime.utcnow()
     stats = {
         "expired_updated": 0,
         "unexpired_updated": 0,
         "inconsistent_fixed": 0,
+        "chunks": 0,
+        "elapsed_seconds": 0.0,
         "dry_run": dry_run,
     }
 
-    with get_db_context() as db:
-        # 查找所有需要更新过期状态的激活码
-        # 1. 已过期但 is_expired=False 的激活码
-        codes_to_expire = db.query(InvitationCode).filter(
+    # 项目有效期：激活码没有自己的过期时间时使用
+    project_expired = select(Project.id).where(Project.expires_at.isnot(None), Project.expires_at < now)
+    project_not_expired = select(Project.id).where(or_(Project.expires_at.is_(None), Project.expires_at >= now))
+
+    # (统计项, 条件, 更新值)
+    updates = [
+        (
+            "expired_updated",
             and_(
                 InvitationCode.is_expired == False,
+                InvitationCode.status == False,
+                InvitationCode.is_disabled == False,
                 or_(
                     # 激活码自己的过期时间已过
-                    and_(
-                        InvitationCode.expires_at.isnot(None),
-                        InvitationCode.expires_at < now
-                    ),
+                    and_(InvitationCode.expires_at.isnot(None), InvitationCode.expires_at < now),
                     # 或项目过期时间已过（激活码没有自己的过期时间）
-                    and_(
-                        InvitationCode.expires_at.is_(None),
-                        Project.expires_at.isnot(None),
-                        Project.expires_at < now
-                    )
-                )
-            )
-        ).join(Project).all()
-
-        # 2. 未过期但 is_expired=True 的激活码（可能被延长了有效期）
-        codes_to_unexpire = db.query(InvitationCode).filter(
+                    and_(InvitationCode.expires_at.is_(None), InvitationCode.project_id.in_(project_expired)),
+                ),
+            ),
+            {"is_expired": True},
+        ),
+        (
+            "unexpired_updated",
             and_(
                 InvitationCode.is_expired == True,
                 or_(
                     # 激活码自己的过期时间未到
-                    and_(
-                        InvitationCode.expires_at.isnot(None),
-                        InvitationCode.expires_at >= now
-                    ),
+                    and_(InvitationCode.expires_at.isnot(None), InvitationCode.expires_at >= now),
                     # 或项目过期时间未到（激活码没有自己的过期时间）
-                    and_(
-                        InvitationCode.expires_at.is_(None),
-                        or_(
-                            Project.expires_at.is_(None),
-                            Project.expires_at >= now
-                        )
-                    )
-                )
-            )
-        ).join(Project).all()
-
-        if not dry_run:
-            # 更新已过期的激活码
-            for code in codes_to_expire:
-                code.is_expired = True
-                stats["expired_updated"] += 1
-
-            # 更新未过期的激活码（延长了有效期）
-            for code in codes_to_unexpire:
-                code.is_expired = False
-                stats["unexpired_updated"] += 1
-
-            # 状态一致性修复（code_status_logic.md 7.2）
-            inconsistent_codes = (
-                db.query(InvitationCode)
-                .filter(
-                    or_(
-                        and_(InvitationCode.status == True, InvitationCode.is_expired == True),
-                        and_(InvitationCode.is_disabled == True, InvitationCode.is_expired == True),
-                        and_(InvitationCode.status == True, InvitationCode.is_disabled == True),
-                    )
-                )
-                .all()
-            )
-            for code in inconsistent_codes:
-                fixed = False
-                if code.status and code.is_expired:
-                    code.is_expired = False
-                    fixed = True
-                if code.is_disabled and code.is_expired:
-                    code.is_expired = False
-                    fixed = True
-                if code.status and code.is_disabled:
-                    code.is_disabled = False
-                    fixed = True
-                if fixed:
-                    stats["inconsistent_fixed"] += 1
-
-            db.commit()
-
-        else:
-            stats["expired_updated"] = len(codes_to_expire)
-            stats["unexpired_updated"] = len(codes_to_unexpire)
-            stats["inconsistent_fixed"] = (
-                len(
-                    db.query(InvitationCode)
-                    .filter(
-                        or_(
-                            and_(InvitationCode.status == True, InvitationCode.is_expired == True),
-                            and_(InvitationCode.is_disabled == True, InvitationCode.is_expired == True),
-                            and_(InvitationCode.status == True, InvitationCode.is_disabled == True),
-                        )
-                    )
-                    .all()
-                )
-            )
+                    and_(InvitationCode.expires_at.is_(None), InvitationCode.project_id.in_(project_not_expired)),
+                ),
+            ),
+            {"is_expired": False},
+        ),
+        # 状态一致性修复：已使用/已禁用的激活码不标记过期，已使用的激活码不标记禁用
+        (
+            "inconsistent_fixed",
+            and_(
+                InvitationCode.is_expired == True,
+                or_(InvitationCode.status == True, InvitationCode.is_disabled == True),
+            ),
+            {"is_expired": False},
+        ),
+        (
+            "inconsistent_fixed",
+            and_(InvitationCode.status == True, InvitationCode.is_disabled == True),
+            {"is_disabled": False},
+        ),
+    ]
 
+    with get_db_context() as db:
+        for key, condition, values in updates:
+            if dry_run:
+                stats[key] += db.execute(select(func.count()).where(condition)).scalar()
+                continue
+            updated, chunks = CodeRepository.update_in_chunks(db, condition, values, batch_size, throttle_seconds)
+            stats[key] += updated
+            stats["chunks"] += chunks
+
+    stats["elapsed_seconds"] = round(time.perf_counter() - began, 3)
     return stats
 
 
@@ -223,16 +217,54 @@ if __name__ == "__main__":
         action="store_true",
         help="仅模拟运行，不实际删除",
     )
+    parser.add_argument(
+        "--update-expired",
+        action="store_true",
+        help="更新激活码过期状态（而不是清理过期激活码）",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help=f"每块的行数（默认: 清理 {DEFAULT_PURGE_BATCH_SIZE}，更新过期状态 {DEFAULT_EXPIRY_BATCH_SIZE}）",
+    )
+    parser.add_argument(
+        "--throttle",
+        type=float,
+        default=0.0,
+        help="每块之间的休眠秒数（默认: 0）",
+    )
 
     args = parser.parse_args()
 
+    if args.update_expired:
+        batch_size = args.batch_size or DEFAULT_EXPIRY_BATCH_SIZE
+        print(f"开始更新激活码过期状态（每块: {batch_size}，模拟运行: {args.dry_run}）...")
+        stats = update_expired_status(
+            dry_run=args.dry_run,
+            batch_size=batch_size,
+            throttle_seconds=args.throttle,
+        )
+
+        print(f"更新完成:")
+        print(f"  标记过期: {stats['expired_updated']}")
+        print(f"  取消过期: {stats['unexpired_updated']}")
+        print(f"  修复不一致状态: {stats['inconsistent_fixed']}")
+        print(f"  分块数: {stats['chunks']}")
+        print(f"  耗时: {stats['elapsed_seconds']} 秒")
+        raise SystemExit(0)
+
     print(f"开始清理过期激活码（保留天数: {args.retention_days}，模拟运行: {args.dry_run}）...")
     stats = cleanup_expired_codes(
         retention_days=args.retention_days,
         dry_run=args.dry_run,
+        batch_size=args.batch_size or DEFAULT_PURGE_BATCH_SIZE,
+        throttle_seconds=args.throttle,
     )
 
     print(f"清理完成:")
     print(f"  删除项目数: {stats['projects_deleted']}")
     print(f"  删除激活码数: {stats['codes_deleted']}")
     print(f"  删除日志数: {stats['logs_deleted']}")
+    print(f"  分块数: {stats['chunks']}")
+    print(f"  耗时: {stats['elapsed_seconds']} 秒")
@@ -0,0 +1,102 @@
+"""
+项目激活码计数器对账任务
+
+按激活码表重新统计每个项目的数量，与 project_code_counters 比较并报告偏差；
+指定 fix 时重建存在偏差的项目计数。
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from typing import Optional
+
+from ..database import get_db_context
+from ..services.project import CodeCounterRepository
+
+_EMPTY_STATS = {"total": 0, "verified": 0, "unverified": 0, "disabled": 0, "expired": 0}
+
+
+def reconcile_code_counters(fix: bool = False, project_id: Optional[str] = None) -> dict:
+    """
+    对账项目激活码计数器
+
+    先在一次全表扫描中找出可能存在偏差的项目，再逐个项目在独立事务中锁定计数行后复核，
+    排除扫描期间并发写入造成的假偏差；fix 为 True 时在同一事务内重建该项目的计数。
+
+    Args:
+        fix: 是否修复偏差
+        project_id: 仅对账指定项目（为空时对账全部项目）
+
+    Returns:
+        dict: projects_checked, drifted（每项含 project_id, stored, actual）, fixed, fix
+    """
+    stats = {
+        "projects_checked": 0,
+        "drifted": [],
+        "fixed": 0,
+        "fix": fix,
+    }
+
+    with get_db_context() as db:
+        stored = CodeCounterRepository.get_all_stats(db)
+        actual = CodeCounterRepository.recount_all(db)
+
+    project_ids = {project_id} if project_id else set(stored) | set(actual)
+    stats["projects_checked"] = len(project_ids)
+
+    for pid in sorted(project_ids):
+        if stored.get(pid, _EMPTY_STATS) == actual.get(pid, _EMPTY_STATS):
+            continue
+        with get_db_context() as db:
+            before, rebuilt = CodeCounterRepository.rebuild(db, pid)
+            if before == rebuilt:
+                # 扫描期间的并发写入，复核时已一致
+                db.rollback()
+                continue
+            stats["drifted"].append({"project_id": pid, "stored": before, "actual": rebuilt})
+            if fix:
+                db.commit()
+                stats["fixed"] += 1
+            else:
+                db.rollback()
+
+    return stats
+
+
+if __name__ == "__main__":
+    """命令行运行对账任务"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="对账项目激活码计数器")
+    parser.add_argument(
+        "--fix",
+        action="store_true",
+        help="重建存在偏差的项目计数（默认仅报告）",
+    )
+    parser.add_argument(
+        "--project-id",
+        default=None,
+        help="仅对账指定项目",
+    )
+
+    args = parser.parse_args()
+
+    print(f"开始对账激活码计数器（修复: {args.fix}）...")
+    stats = reconcile_code_counters(fix=args.fix, project_id=args.project_id)
+
+    print(f"对账完成:")
+    print(f"  检查项目数: {stats['projects_checked']}")
+    print(f"  存在偏差的项目数: {len(stats['drifted'])}")
+    for item in stats["drifted"]:
+        print(f"    {item['project_id']}: 计数 {item['stored']} / 实际 {item['actual']}")
+    print(f"  已修复: {stats['fixed']}")
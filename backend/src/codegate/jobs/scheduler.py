@@ -0,0 +1,263 @@
+"""
+内置定时任务调度器
+
+在应用启动时创建，每个 uvicorn worker 各运行一份调度循环；任务是否运行由数据库租约决定，
+同一任务在所有 worker 中同一时刻只运行一次，且按间隔计算的每个周期只运行一次：
+
+- PostgreSQL：运行期间在独立连接上持有 advisory lock，worker 异常退出时随连接释放
+- SQLite：scheduled_jobs 中的租约行（条件 UPDATE 抢占），worker 异常退出后租约到期释放
+
+任务本身是同步函数，在调度器自己的线程池中执行，不阻塞事件循环。
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import or_, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.scheduled_job import ScheduledJob
+from .cleanup_expired_codes import cleanup_expired_codes, update_expired_status
+
+logger = logging.getLogger(__name__)
+
+# 调度循环检查任务是否到期的最长间隔（秒）
+_MAX_POLL_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class Job:
+    """已注册的定时任务"""
+    name: str
+    func: Callable[[], Optional[dict]]
+    interval_seconds: int
+
+
+class JobScheduler:
+    """asyncio 定时任务调度器（租约见模块说明）"""
+
+    def __init__(self, engine: Engine, lease_seconds: int = 3600, shutdown_timeout_seconds: float = 30):
+        self._engine = engine
+        self._lease_seconds = lease_seconds
+        self._shutdown_timeout_seconds = shutdown_timeout_seconds
+        self._jobs: dict[str, Job] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def register(self, name: str, func: Callable[[], Optional[dict]], interval_seconds: int) -> None:
+        """
+        注册任务（interval_seconds <= 0 时忽略）
+
+        Args:
+            name: 任务名称（各 worker 必须一致）
+            func: 同步任务函数，返回的统计字典记录到 last_result
+            interval_seconds: 运行间隔（秒）
+        """
+        if interval_seconds <= 0:
+            return
+        self._jobs[name] = Job(name, func, interval_seconds)
+
+    @property
+    def jobs(self) -> list[Job]:
+        """已注册的任务"""
+        return list(self._jobs.values())
+
+    def start(self) -> None:
+        """启动调度循环（需在事件循环中调用）"""
+        if self._tasks or not self._jobs:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=len(self._jobs), thread_name_prefix="codegate-job")
+        self._tasks = [asyncio.create_task(self._loop(job)) for job in self._jobs.values()]
+        logger.info("定时任务调度器已启动（%s）：%s", self.owner, ", ".join(self._jobs))
+
+    async def stop(self) -> None:
+        """停止调度循环，并在超时时间内等待运行中的任务结束（任务结束后释放租约）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            try:
+                await asyncio.wait_for(
+                    asyncio.to_thread(executor.shutdown, wait=True),
+                    timeout=self._shutdown_timeout_seconds,
+                )
+            except asyncio.TimeoutError:
+                logger.warning("等待运行中的定时任务超时，租约将在任务结束或到期后释放")
+
+    async def _loop(self, job: Job) -> None:
+        """单个任务的调度循环"""
+        loop = asyncio.get_running_loop()
+        poll_seconds = min(job.interval_seconds, _MAX_POLL_SECONDS)
+        while True:
+            try:
+                await loop.run_in_executor(self._executor, self.run_if_due, job.name)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("定时任务 %s 调度失败", job.name)
+            await asyncio.sleep(poll_seconds)
+
+    def run_if_due(self, name: str) -> Optional[dict]:
+        """
+        到期且取得租约时运行一次任务（同步，供调度循环与测试调用）
+
+        Args:
+            name: 任务名称
+
+        Returns:
+            Optional[dict]: 本次运行的统计信息；未到期或其他 worker 持有租约时返回 None
+        """
+        job = self._jobs[name]
+        with self._engine.connect() as connection:
+            _ensure_row(connection, job)
+            if not self._acquire(connection, job):
+                return None
+
+            began = time.perf_counter()
+            status, result, error = "success", None, None
+            try:
+                logger.info("开始运行定时任务 %s", job.name)
+                result = job.func()
+            except Exception as exc:
+                logger.exception("定时任务 %s 运行失败", job.name)
+                status, error = "failed", str(exc)
+            finally:
+                duration = round(time.perf_counter() - began, 3)
+                self._release(connection, job, duration, status, result, error)
+            logger.info("定时任务 %s 运行结束（%s，耗时 %.3f 秒）", job.name, status, duration)
+            return {"status": status, "duration_seconds": duration, "result": result, "error": error}
+
+    def _acquire(self, connection: Connection, job: Job) -> bool:
+        """取得任务租约并登记开始时间（未到期或已被占用时返回 False）"""
+        is_postgresql = connection.dialect.name == "postgresql"
+        if is_postgresql:
+            locked = connection.execute(
+                text("SELECT pg_try_advisory_lock(hashtext(:key))"), {"key": f"codegate.job.{job.name}"}
+            ).scalar()
+            connection.commit()
+            if not locked:
+                return False
+
+        now = datetime.utcnow()
+        stmt = update(ScheduledJob).where(
+            ScheduledJob.name == job.name,
+            or_(
+                ScheduledJob.last_started_at.is_(None),
+                ScheduledJob.last_started_at <= now - timedelta(seconds=job.interval_seconds),
+            ),
+        )
+        if not is_postgresql:
+            # SQLite 没有会话级锁，以未过期的租约互斥
+            stmt = stmt.where(or_(ScheduledJob.lease_until.is_(None), ScheduledJob.lease_until < now))
+        acquired = connection.execute(
+            stmt.values(
+                lease_owner=self.owner,
+                lease_until=now + timedelta(seconds=self._lease_seconds),
+                last_started_at=now,
+            )
+        ).rowcount == 1
+        connection.commit()
+
+        if not acquired and is_postgresql:
+            _advisory_unlock(connection, job)
+        return acquired
+
+    def _release(
+        self,
+        connection: Connection,
+        job: Job,
+        duration: float,
+        status: str,
+        result: Optional[dict],
+        error: Optional[str],
+    ) -> None:
+        """记录运行结果并释放租约"""
+        try:
+            connection.rollback()
+            connection.execute(
+                update(ScheduledJob)
+                .where(ScheduledJob.name == job.name, ScheduledJob.lease_owner == self.owner)
+                .values(
+                    lease_owner=None,
+                    lease_until=None,
+                    last_finished_at=datetime.utcnow(),
+                    last_duration_seconds=duration,
+                    last_status=status,
+                    last_result=json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                    last_error=error,
+                )
+            )
+            connection.commit()
+        finally:
+            if connection.dialect.name == "postgresql":
+                # advisory lock 属于连接，归还连接池前必须释放
+                _advisory_unlock(connection, job)
+
+
+def _ensure_row(connection: Connection, job: Job) -> None:
+    """确保任务状态行存在，并同步运行间隔"""
+    table = ScheduledJob.__table__
+    values = {"name": job.name, "interval_seconds": job.interval_seconds}
+    if connection.dialect.name == "postgresql":
+        stmt = postgresql.insert(table).values(values).on_conflict_do_nothing(index_elements=["name"])
+    else:
+        stmt = sqlite.insert(table).values(values).on_conflict_do_nothing(index_elements=["name"])
+    connection.execute(stmt)
+    connection.execute(
+        update(ScheduledJob)
+        .where(ScheduledJob.name == job.name, ScheduledJob.interval_seconds != job.interval_seconds)
+        .values(interval_seconds=job.interval_seconds)
+    )
+    connection.commit()
+
+
+def _advisory_unlock(connection: Connection, job: Job) -> None:
+    """释放任务的 advisory lock（PostgreSQL）"""
+    connection.rollback()
+    connection.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": f"codegate.job.{job.name}"})
+    connection.commit()
+
+
+def get_job_status(db: Session) -> list[ScheduledJob]:
+    """读取所有定时任务的运行状态（按名称排序）"""
+    return list(db.execute(select(ScheduledJob).order_by(ScheduledJob.name)).scalars())
+
+
+def create_scheduler(engine: Engine) -> JobScheduler:
+    """按配置创建调度器并注册内置任务"""
+    scheduler = JobScheduler(
+        engine,
+        lease_seconds=settings.JOB_LEASE_SECONDS,
+        shutdown_timeout_seconds=settings.JOB_SHUTDOWN_TIMEOUT_SECONDS,
+    )
+    scheduler.register("update_expired_status", update_expired_status, settings.JOB_UPDATE_EXPIRED_INTERVAL_SECONDS)
+    scheduler.register("cleanup_expired_codes", cleanup_expired_codes, settings.JOB_CLEANUP_EXPIRED_INTERVAL_SECONDS)
+    return scheduler
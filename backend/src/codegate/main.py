@@ -15,6 +15,7 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
@@ -22,9 +23,14 @@ import logging
 from pathlib import Path
 
 from .config import settings
-from .database import init_db
-from .api import projects, codes, verify, auth, dashboard, verification_logs, audit_logs, api_keys, docs
+from .database import init_db, engine, async_engine
+from .api import projects, codes, verify, auth, dashboard, verification_logs, audit_logs, api_keys, docs, jobs
 from .api.sdk import router as sdk_api_router
+from .services.api_key.api_key_cache import api_key_usage
+from .services.code.expiry_engine import expiry_engine
+from .services.audit.log_writer import log_writer
+from .services.audit.audit_sink import audit_sink
+from .jobs.scheduler import create_scheduler
 
 
 def configure_logging() -> None:
@@ -74,6 +80,7 @@ app.include_router(verify.router)
 app.include_router(verification_logs.router)
 app.include_router(audit_logs.router)
 app.include_router(api_keys.router)
+app.include_router(jobs.router)
 app.include_router(docs.router)
 app.include_router(sdk_api_router)  # SDK API 路由
 
@@ -85,6 +92,44 @@ async def startup_event():
     # 初始化数据库
     init_db()
     logger.info("数据库初始化完成")
+    # 启动核销日志 / 审计日志批量写入线程（sync 模式下日志随请求事务同步写入）
+    if settings.LOG_WRITE_MODE == "buffered":
+        log_writer.start()
+    # 启动 API Key last_used_at 批量写回任务
+    app.state.api_key_usage_task = asyncio.create_task(
+        api_key_usage.run_periodic_flush(settings.API_KEY_LAST_USED_FLUSH_SECONDS)
+    )
+    # 启动激活码过期引擎
+    if settings.EXPIRY_ENGINE_ENABLED:
+        app.state.expiry_engine_task = asyncio.create_task(expiry_engine.run())
+    # 启动内置定时任务（各 worker 通过数据库租约保证同一任务只运行一份）
+    if settings.JOB_SCHEDULER_ENABLED:
+        app.state.job_scheduler = create_scheduler(engine)
+        app.state.job_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭事件"""
+    # 停止定时任务调度器（等待运行中的任务结束并释放租约）
+    scheduler = getattr(app.state, "job_scheduler", None)
+    if scheduler is not None:
+        await scheduler.stop()
+    # 停止过期引擎与批量写回任务（写回任务取消时会执行最后一次写回）
+    for name in ("expiry_engine_task", "api_key_usage_task"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    # 停止日志写入线程并写入队列中剩余的日志
+    await asyncio.to_thread(log_writer.stop)
+    # 压缩审计日志文件的活动分段
+    await asyncio.to_thread(audit_sink.close)
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
 @app.get("/")
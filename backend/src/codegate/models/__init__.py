@@ -21,5 +21,10 @@ from .verification_log import VerificationLog
 from .admin import Admin
 from .audit_log import AuditLog
 from .api_key import ApiKey
+from .project_code_counter import ProjectCodeCounter
+from .verification_rollup import VerificationRollup
+from .project_purge import ProjectPurge
+from .scheduled_job import ScheduledJob
+from . import code_search  # noqa: F401  注册激活码搜索索引的建表/删表事件
 
-__all__ = ["Project", "InvitationCode", "VerificationLog", "Admin", "AuditLog", "ApiKey"]
+__all__ = ["Project", "InvitationCode", "VerificationLog", "Admin", "AuditLog", "ApiKey", "ProjectCodeCounter", "VerificationRollup", "ProjectPurge", "ScheduledJob"]
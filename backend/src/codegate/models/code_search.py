@@ -0,0 +1,174 @@
+"""
+激活码子串搜索索引
+
+- PostgreSQL：pg_trgm 扩展 + code 列上的 GIN 三元组索引，LIKE '%term%' / 'term%' 直接走索引
+- SQLite：FTS5 trigram 影子表，由 invitation_codes 上的触发器同步
+
+SQLite 影子表结构：invitation_code_search 以 INTEGER PRIMARY KEY 映射激活码 ID
+（rowid 在 VACUUM 后保持不变），FTS5 表以其为外部内容表，只保存三元组索引。
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import column, event, select, table
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+
+from .invitation_code import InvitationCode
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "invitation_code_search"
+SEARCH_FTS_TABLE = "invitation_code_search_fts"
+POSTGRESQL_TRGM_INDEX = "idx_code_code_trgm"
+# 三元组索引至少需要 3 个字符，更短的关键词直接 LIKE 扫描
+MIN_INDEXED_SEARCH_LENGTH = 3
+
+search_table = table(SEARCH_TABLE, column("id"), column("code_id"), column("code"))
+search_fts_table = table(SEARCH_FTS_TABLE, column("rowid"), column("code"))
+
+_SQLITE_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+        id INTEGER PRIMARY KEY,
+        code_id VARCHAR(32) NOT NULL UNIQUE,
+        code VARCHAR(100) NOT NULL
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_FTS_TABLE} USING fts5(
+        code, content='{SEARCH_TABLE}', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    # 影子表 -> FTS5 索引
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON {SEARCH_TABLE} BEGIN
+        INSERT INTO {SEARCH_FTS_TABLE}(rowid, code) VALUES (new.id, new.code);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON {SEARCH_TABLE} BEGIN
+        INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, code) VALUES ('delete', old.id, old.code);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF code ON {SEARCH_TABLE} BEGIN
+        INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, code) VALUES ('delete', old.id, old.code);
+        INSERT INTO {SEARCH_FTS_TABLE}(rowid, code) VALUES (new.id, new.code);
+    END
+    """,
+    # 激活码表 -> 影子表（ON CONFLICT DO NOTHING 跳过的行不会触发）
+    f"""
+    CREATE TRIGGER IF NOT EXISTS invitation_codes_search_ai AFTER INSERT ON invitation_codes BEGIN
+        INSERT INTO {SEARCH_TABLE}(code_id, code) VALUES (new.id, new.code);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS invitation_codes_search_ad AFTER DELETE ON invitation_codes BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE code_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS invitation_codes_search_au AFTER UPDATE OF code ON invitation_codes BEGIN
+        UPDATE {SEARCH_TABLE} SET code = new.code WHERE code_id = old.id;
+    END
+    """,
+]
+
+
+def install_search_index(connection: Connection) -> None:
+    """
+    创建搜索索引（幂等，可在已有数据的库上执行）
+
+    SQLite 首次创建影子表时会从 invitation_codes 回填；PostgreSQL 无权限创建
+    pg_trgm 扩展时记录警告并跳过，搜索退化为 LIKE 扫描。
+
+    Args:
+        connection: 数据库连接
+    """
+    dialect_name = connection.dialect.name
+
+    if dialect_name == "sqlite":
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,)
+        ).first()
+        for statement in _SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+        if not exists:
+            connection.exec_driver_sql(
+                f"INSERT INTO {SEARCH_TABLE}(code_id, code) SELECT id, code FROM invitation_codes"
+            )
+        return
+
+    if dialect_name == "postgresql":
+        try:
+            with connection.begin_nested():
+                connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                connection.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS {POSTGRESQL_TRGM_INDEX} "
+                    "ON invitation_codes USING gin (code gin_trgm_ops)"
+                )
+        except DBAPIError as e:
+            logger.warning(f"无法创建 pg_trgm 搜索索引，激活码搜索将使用全表扫描: {e}")
+
+
+def drop_search_index(connection: Connection) -> None:
+    """删除 SQLite 影子表及同步触发器（PostgreSQL 索引随 invitation_codes 删除）"""
+    if connection.dialect.name == "sqlite":
+        for trigger in ("invitation_codes_search_ai", "invitation_codes_search_ad", "invitation_codes_search_au"):
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {SEARCH_FTS_TABLE}")
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+def project_search_conditions(dialect_name: str, project_id: str, search: Optional[str] = None) -> list:
+    """
+    构建项目 + 激活码子串搜索条件（语义与 project_id = ? AND code LIKE '%search%' 一致）
+
+    SQLite 走 FTS5 时项目条件写作 project_id || ''：否则规划器倾向于按
+    (project_id, created_at) 索引顺序扫描整个项目再逐行判断命中，大项目上退化为全量扫描；
+    改由三元组索引的命中结果驱动查询。
+
+    Args:
+        dialect_name: 数据库类型
+        project_id: 项目ID
+        search: 搜索关键词（为空时只有项目条件）
+
+    Returns:
+        list: SQLAlchemy 条件表达式列表
+    """
+    if not search:
+        return [InvitationCode.project_id == project_id]
+
+    if dialect_name == "sqlite" and len(search) >= MIN_INDEXED_SEARCH_LENGTH:
+        # FTS5 trigram 表上的 LIKE 由三元组索引完成（大小写不敏感，与 SQLite LIKE 一致）
+        matched = select(search_fts_table.c.rowid).where(search_fts_table.c.code.like(f"%{search}%"))
+        return [
+            InvitationCode.project_id.concat("") == project_id,
+            InvitationCode.id.in_(select(search_table.c.code_id).where(search_table.c.id.in_(matched))),
+        ]
+
+    # PostgreSQL 的 LIKE 由 pg_trgm GIN 索引完成
+    return [InvitationCode.project_id == project_id, InvitationCode.code.contains(search)]
+
+
+event.listen(
+    InvitationCode.__table__, "after_create", lambda target, connection, **kw: install_search_index(connection)
+)
+event.listen(
+    InvitationCode.__table__, "before_drop", lambda target, connection, **kw: drop_search_index(connection)
+)
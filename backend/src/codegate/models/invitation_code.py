@@ -60,6 +60,10 @@ class InvitationCode(Base):
     # 索引
     __table_args__ = (
         Index("idx_project_code", "project_id", "code"),
+        # 列表排序与游标分页：(project_id, created_at, id)
+        Index("idx_code_project_created", "project_id", "created_at", "id"),
+        # 项目统计：单次聚合只扫描索引（覆盖 status / is_disabled / is_expired）
+        Index("idx_code_project_state", "project_id", "status", "is_disabled", "is_expired"),
         Index("idx_code_status", "status"),
         Index("idx_code_disabled", "is_disabled"),
         Index("idx_code_expired", "is_expired"),
@@ -0,0 +1,271 @@
+"""
+项目激活码计数器模型
+
+按状态分组（未使用/已使用/已禁用/已过期，四者互斥）记录每个项目的激活码数量，
+由 invitation_codes 上的触发器在状态变更的同一事务内增量维护，统计读取不再扫描激活码表：
+
+- SQLite：行级触发器（单写者，计数写入 slot 0）
+- PostgreSQL：语句级触发器 + 过渡表，每条语句按 (project_id, slot) 聚合后只更新一次；
+  激活码按 ID 哈希分散到 COUNTER_SLOTS 个槽位，并发核销不会在同一计数行上排队
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from typing import Optional
+
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Integer,
+    String,
+    and_,
+    case,
+    delete,
+    event,
+    func,
+    insert,
+    literal_column,
+    not_,
+    select,
+)
+from sqlalchemy.engine import Connection
+
+from ..database import Base
+from .invitation_code import InvitationCode
+
+# PostgreSQL 每个项目的计数槽位数（2 的幂）
+COUNTER_SLOTS = 16
+COUNTER_FIELDS = ("unverified_count", "verified_count", "disabled_count", "expired_count")
+
+
+class ProjectCodeCounter(Base):
+    """项目激活码计数器（同一项目可有多个槽位，读取时求和）"""
+    __tablename__ = "project_code_counters"
+
+    project_id = Column(String(32), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True, comment="项目ID（UUID，去除连字符）")
+    slot = Column(Integer, primary_key=True, default=0, comment="计数槽位（SQLite 固定为 0）")
+    unverified_count = Column(Integer, default=0, nullable=False, comment="未使用数量")
+    verified_count = Column(Integer, default=0, nullable=False, comment="已使用数量")
+    disabled_count = Column(Integer, default=0, nullable=False, comment="已禁用数量")
+    expired_count = Column(Integer, default=0, nullable=False, comment="已过期数量")
+
+    def __repr__(self) -> str:
+        return f"<ProjectCodeCounter(project_id={self.project_id}, slot={self.slot})>"
+
+
+# 状态分组条件（受状态互斥约束保证，每个激活码恰好属于一个分组）
+def _bucket_conditions(status: str, is_disabled: str, is_expired: str) -> tuple[str, str, str, str]:
+    return (
+        f"(NOT {status} AND NOT {is_disabled} AND NOT {is_expired})",
+        f"({status} AND NOT {is_disabled} AND NOT {is_expired})",
+        f"({is_disabled})",
+        f"({is_expired} AND NOT {is_disabled})",
+    )
+
+
+def _sqlite_buckets(row: str) -> tuple[str, str, str, str]:
+    return _bucket_conditions(f"{row}.status", f"{row}.is_disabled", f"{row}.is_expired")
+
+
+def _sqlite_ddl() -> list[str]:
+    new, old = _sqlite_buckets("new"), _sqlite_buckets("old")
+    insert_values = ", ".join(new)
+    upsert = ", ".join(f"{field} = {field} + excluded.{field}" for field in COUNTER_FIELDS)
+    update_delta = ", ".join(f"{field} = {field} + {n} - {o}" for field, n, o in zip(COUNTER_FIELDS, new, old))
+    delete_delta = ", ".join(f"{field} = {field} - {o}" for field, o in zip(COUNTER_FIELDS, old))
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS invitation_codes_counter_ai AFTER INSERT ON invitation_codes BEGIN
+            INSERT INTO project_code_counters(project_id, slot, {", ".join(COUNTER_FIELDS)})
+            VALUES (new.project_id, 0, {insert_values})
+            ON CONFLICT(project_id, slot) DO UPDATE SET {upsert};
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS invitation_codes_counter_au
+        AFTER UPDATE OF status, is_disabled, is_expired ON invitation_codes
+        WHEN old.status IS NOT new.status OR old.is_disabled IS NOT new.is_disabled OR old.is_expired IS NOT new.is_expired
+        BEGIN
+            UPDATE project_code_counters SET {update_delta} WHERE project_id = new.project_id AND slot = 0;
+        END
+        """,
+        # 删除只更新已有计数行：项目级联删除时计数行可能已先被删除
+        f"""
+        CREATE TRIGGER IF NOT EXISTS invitation_codes_counter_ad AFTER DELETE ON invitation_codes BEGIN
+            UPDATE project_code_counters SET {delete_delta} WHERE project_id = old.project_id AND slot = 0;
+        END
+        """,
+    ]
+
+
+_SQLITE_TRIGGERS = ("invitation_codes_counter_ai", "invitation_codes_counter_au", "invitation_codes_counter_ad")
+
+
+def _postgresql_changes(table: str, sign: str) -> str:
+    buckets = _bucket_conditions("status", "is_disabled", "is_expired")
+    values = ", ".join(f"{sign}({condition})::int AS {field}" for condition, field in zip(buckets, COUNTER_FIELDS))
+    return f"SELECT project_id, hashtext(id) & {COUNTER_SLOTS - 1} AS slot, {values} FROM {table}"
+
+
+def _postgresql_function(name: str, changes: str, apply: str) -> str:
+    sums = ", ".join(f"sum({field})::int AS {field}" for field in COUNTER_FIELDS)
+    nonzero = " OR ".join(f"sum({field}) <> 0" for field in COUNTER_FIELDS)
+    return f"""
+    CREATE OR REPLACE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        r record;
+    BEGIN
+        -- 按 (project_id, slot) 顺序加锁，避免并发语句互相死锁
+        FOR r IN
+            SELECT project_id, slot, {sums}
+            FROM ({changes}) AS changes
+            GROUP BY project_id, slot
+            HAVING {nonzero}
+            ORDER BY project_id, slot
+        LOOP
+            {apply}
+        END LOOP;
+        RETURN NULL;
+    END
+    $$
+    """
+
+
+def _postgresql_ddl() -> list[str]:
+    fields = ", ".join(COUNTER_FIELDS)
+    upsert = f"""
+            INSERT INTO project_code_counters AS c (project_id, slot, {fields})
+            VALUES (r.project_id, r.slot, {", ".join(f"r.{field}" for field in COUNTER_FIELDS)})
+            ON CONFLICT (project_id, slot) DO UPDATE SET
+                {", ".join(f"{field} = c.{field} + EXCLUDED.{field}" for field in COUNTER_FIELDS)};"""
+    # 更新/删除只更新已有计数行：项目级联删除时计数行可能已先被删除
+    update = f"""
+            UPDATE project_code_counters SET
+                {", ".join(f"{field} = {field} + r.{field}" for field in COUNTER_FIELDS)}
+            WHERE project_id = r.project_id AND slot = r.slot;"""
+    return [
+        _postgresql_function("project_code_counters_ins", _postgresql_changes("new_rows", ""), upsert),
+        _postgresql_function(
+            "project_code_counters_upd",
+            _postgresql_changes("new_rows", "") + " UNION ALL " + _postgresql_changes("old_rows", "-"),
+            update,
+        ),
+        _postgresql_function("project_code_counters_del", _postgresql_changes("old_rows", "-"), update),
+        """
+        CREATE TRIGGER invitation_codes_counter_ins AFTER INSERT ON invitation_codes
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION project_code_counters_ins()
+        """,
+        """
+        CREATE TRIGGER invitation_codes_counter_upd AFTER UPDATE ON invitation_codes
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION project_code_counters_upd()
+        """,
+        """
+        CREATE TRIGGER invitation_codes_counter_del AFTER DELETE ON invitation_codes
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION project_code_counters_del()
+        """,
+    ]
+
+
+_POSTGRESQL_TRIGGERS = ("invitation_codes_counter_ins", "invitation_codes_counter_upd", "invitation_codes_counter_del")
+_POSTGRESQL_FUNCTIONS = ("project_code_counters_ins", "project_code_counters_upd", "project_code_counters_del")
+
+
+def counter_slot(dialect_name: str):
+    """激活码所属计数槽位的 SQL 表达式（与触发器一致）"""
+    if dialect_name == "postgresql":
+        return func.hashtext(InvitationCode.id).op("&")(literal_column(str(COUNTER_SLOTS - 1)))
+    return literal_column("0")
+
+
+def recount_select(dialect_name: str, project_id: Optional[str] = None):
+    """
+    按 (project_id, slot) 重新统计激活码数量（全量扫描，仅用于回填与对账）
+
+    Returns:
+        Select: project_id, slot, unverified_count, verified_count, disabled_count, expired_count
+    """
+    status, is_disabled, is_expired = InvitationCode.status, InvitationCode.is_disabled, InvitationCode.is_expired
+    buckets = (
+        and_(not_(status), not_(is_disabled), not_(is_expired)),
+        and_(status, not_(is_disabled), not_(is_expired)),
+        is_disabled,
+        and_(is_expired, not_(is_disabled)),
+    )
+    slot = counter_slot(dialect_name)
+    stmt = select(
+        InvitationCode.project_id,
+        slot.label("slot"),
+        *(func.sum(case((condition, 1), else_=0)).label(field) for condition, field in zip(buckets, COUNTER_FIELDS)),
+    )
+    if project_id is not None:
+        stmt = stmt.where(InvitationCode.project_id == project_id)
+    if dialect_name == "postgresql":
+        return stmt.group_by(InvitationCode.project_id, slot)
+    return stmt.group_by(InvitationCode.project_id)
+
+
+def _triggers_installed(connection: Connection) -> bool:
+    if connection.dialect.name == "sqlite":
+        return connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (_SQLITE_TRIGGERS[0],)
+        ).first() is not None
+    return connection.exec_driver_sql(
+        "SELECT 1 FROM pg_trigger WHERE tgname = %(name)s AND tgrelid = 'invitation_codes'::regclass",
+        {"name": _POSTGRESQL_TRIGGERS[0]},
+    ).first() is not None
+
+
+def install_code_counters(connection: Connection) -> None:
+    """
+    创建计数触发器（幂等，可在已有数据的库上执行）
+
+    首次安装时按现有激活码回填计数表；PostgreSQL 回填期间锁定 invitation_codes 的写入。
+
+    Args:
+        connection: 数据库连接
+    """
+    dialect_name = connection.dialect.name
+    if dialect_name not in ("sqlite", "postgresql") or _triggers_installed(connection):
+        return
+
+    if dialect_name == "postgresql":
+        connection.exec_driver_sql("LOCK TABLE invitation_codes IN SHARE ROW EXCLUSIVE MODE")
+    for statement in _sqlite_ddl() if dialect_name == "sqlite" else _postgresql_ddl():
+        connection.exec_driver_sql(statement)
+
+    table = ProjectCodeCounter.__table__
+    connection.execute(delete(table))
+    connection.execute(
+        insert(table).from_select(["project_id", "slot", *COUNTER_FIELDS], recount_select(dialect_name))
+    )
+
+
+def drop_code_counters(connection: Connection) -> None:
+    """删除计数触发器（计数表随元数据删除）"""
+    if connection.dialect.name == "sqlite":
+        for trigger in _SQLITE_TRIGGERS:
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+    elif connection.dialect.name == "postgresql":
+        for trigger in _POSTGRESQL_TRIGGERS:
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger} ON invitation_codes")
+        for function in _POSTGRESQL_FUNCTIONS:
+            connection.exec_driver_sql(f"DROP FUNCTION IF EXISTS {function}()")
+
+
+# 触发器同时依赖 invitation_codes 与 project_code_counters，在全部表创建之后安装
+event.listen(Base.metadata, "after_create", lambda target, connection, **kw: install_code_counters(connection))
+event.listen(Base.metadata, "before_drop", lambda target, connection, **kw: drop_code_counters(connection))
@@ -0,0 +1,39 @@
+"""
+项目清除任务模型
+
+删除项目时先登记清除任务并禁用项目，再按块删除核销日志、激活码，最后删除项目；
+任务行随项目级联删除，进程中断后残留的任务行即为待续的清除任务。
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from datetime import datetime
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from ..database import Base
+
+
+class ProjectPurge(Base):
+    """项目清除任务（记录进度，项目删除后随之删除）"""
+    __tablename__ = "project_purges"
+
+    project_id = Column(String(32), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True, comment="项目ID（UUID，去除连字符）")
+    requested_at = Column(DateTime, default=datetime.utcnow, nullable=False, comment="登记时间")
+    requested_by = Column(String(32), nullable=True, comment="登记人ID（管理员ID，定时任务为空）")
+    logs_deleted = Column(Integer, default=0, nullable=False, comment="已删除核销日志数")
+    codes_deleted = Column(Integer, default=0, nullable=False, comment="已删除激活码数")
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False, comment="最近进度时间")
+
+    def __repr__(self) -> str:
+        return f"<ProjectPurge(project_id={self.project_id}, codes_deleted={self.codes_deleted})>"
@@ -0,0 +1,42 @@
+"""
+定时任务运行状态模型
+
+每个内置定时任务一行：既是多个 worker 之间的租约（同一时刻只有一个 worker 运行该任务），
+也记录最近一次运行的耗时与结果。
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from sqlalchemy import Column, DateTime, Float, Integer, String, Text
+
+from ..database import Base
+
+
+class ScheduledJob(Base):
+    """定时任务运行状态"""
+    __tablename__ = "scheduled_jobs"
+
+    name = Column(String(50), primary_key=True, comment="任务名称")
+    interval_seconds = Column(Integer, nullable=False, comment="运行间隔（秒）")
+    lease_owner = Column(String(100), nullable=True, comment="当前持有租约的 worker（为空表示未运行）")
+    lease_until = Column(DateTime, nullable=True, comment="租约到期时间（worker 异常退出后到期释放）")
+    last_started_at = Column(DateTime, nullable=True, comment="最近一次开始时间")
+    last_finished_at = Column(DateTime, nullable=True, comment="最近一次结束时间")
+    last_duration_seconds = Column(Float, nullable=True, comment="最近一次耗时（秒）")
+    last_status = Column(String(20), nullable=True, comment="最近一次结果（success/failed）")
+    last_result = Column(Text, nullable=True, comment="最近一次统计信息（JSON文本）")
+    last_error = Column(Text, nullable=True, comment="最近一次失败原因")
+
+    def __repr__(self) -> str:
+        return f"<ScheduledJob(name='{self.name}', last_status='{self.last_status}')>"
@@ -42,6 +42,8 @@ class VerificationLog(Base):
     # 索引
     __table_args__ = (
         Index("idx_code_verified_at", "code_id", "verified_at"),
+        # 概览最近核销记录：WHERE result = 'success' ORDER BY verified_at DESC
+        Index("idx_log_result_verified_at", "result", "verified_at"),
     )
 
     def __repr__(self) -> str:
@@ -0,0 +1,145 @@
+"""
+核销统计小时汇总模型
+
+按 (project_id, 小时, 核销结果) 记录核销次数，由 verification_logs 上的触发器在写入核销日志的
+同一事务内增量维护；按天统计时对小时汇总求和。汇总记录的是核销事件，删除激活码（及其日志）
+不会回减，项目删除时随项目删除。
+
+- SQLite：行级触发器（单写者，写入 slot 0）
+- PostgreSQL：语句级触发器 + 过渡表，槽位与 project_code_counters 一致（按激活码 ID 哈希）
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, event
+from sqlalchemy.engine import Connection
+
+from ..database import Base
+from .project_code_counter import COUNTER_SLOTS
+
+
+class VerificationRollup(Base):
+    """核销次数小时汇总（同一小时可有多个槽位，读取时求和）"""
+    __tablename__ = "verification_rollups"
+
+    project_id = Column(String(32), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True, comment="项目ID（UUID，去除连字符）")
+    bucket_start = Column(DateTime, primary_key=True, comment="小时起点（UTC）")
+    result = Column(String(20), primary_key=True, comment="核销结果（success/failed）")
+    slot = Column(Integer, primary_key=True, default=0, comment="槽位（SQLite 固定为 0）")
+    count = Column(Integer, default=0, nullable=False, comment="核销次数")
+
+    def __repr__(self) -> str:
+        return f"<VerificationRollup(project_id={self.project_id}, bucket_start={self.bucket_start}, result='{self.result}')>"
+
+
+_SQLITE_TRIGGER = "verification_logs_rollup_ai"
+_SQLITE_DDL = [
+    # SQLite 中 DateTime 以 'YYYY-MM-DD HH:MM:SS.ffffff' 文本存储，截断到小时后格式保持一致
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {_SQLITE_TRIGGER} AFTER INSERT ON verification_logs BEGIN
+        INSERT INTO verification_rollups(project_id, bucket_start, result, slot, count)
+        SELECT project_id, strftime('%Y-%m-%d %H:00:00.000000', new.verified_at), new.result, 0, 1
+        FROM invitation_codes WHERE id = new.code_id
+        ON CONFLICT(project_id, bucket_start, result, slot) DO UPDATE SET count = count + 1;
+    END
+    """,
+]
+_SQLITE_BACKFILL = """
+    INSERT INTO verification_rollups(project_id, bucket_start, result, slot, count)
+    SELECT c.project_id, strftime('%Y-%m-%d %H:00:00.000000', l.verified_at), l.result, 0, count(*)
+    FROM verification_logs l JOIN invitation_codes c ON c.id = l.code_id
+    GROUP BY 1, 2, 3
+"""
+
+_POSTGRESQL_TRIGGER = "verification_logs_rollup_ins"
+_POSTGRESQL_FUNCTION = "verification_rollups_ins"
+_POSTGRESQL_GROUPED = f"""
+    SELECT c.project_id, date_trunc('hour', l.verified_at) AS bucket_start, l.result,
+           hashtext(l.code_id) & {COUNTER_SLOTS - 1} AS slot, count(*)::int AS count
+    FROM {{logs}} l JOIN invitation_codes c ON c.id = l.code_id
+    GROUP BY 1, 2, 3, 4
+"""
+_POSTGRESQL_DDL = [
+    f"""
+    CREATE OR REPLACE FUNCTION {_POSTGRESQL_FUNCTION}() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        r record;
+    BEGIN
+        -- 按主键顺序加锁，避免并发语句互相死锁
+        FOR r IN {_POSTGRESQL_GROUPED.format(logs="new_rows")} ORDER BY 1, 2, 3, 4
+        LOOP
+            INSERT INTO verification_rollups AS v (project_id, bucket_start, result, slot, count)
+            VALUES (r.project_id, r.bucket_start, r.result, r.slot, r.count)
+            ON CONFLICT (project_id, bucket_start, result, slot) DO UPDATE SET count = v.count + EXCLUDED.count;
+        END LOOP;
+        RETURN NULL;
+    END
+    $$
+    """,
+    f"""
+    CREATE TRIGGER {_POSTGRESQL_TRIGGER} AFTER INSERT ON verification_logs
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {_POSTGRESQL_FUNCTION}()
+    """,
+]
+_POSTGRESQL_BACKFILL = (
+    "INSERT INTO verification_rollups(project_id, bucket_start, result, slot, count)"
+    + _POSTGRESQL_GROUPED.format(logs="verification_logs")
+)
+
+
+def install_verification_rollups(connection: Connection) -> None:
+    """
+    创建核销汇总触发器（幂等，可在已有数据的库上执行）
+
+    首次安装时按现有核销日志回填；PostgreSQL 回填期间锁定 verification_logs 的写入。
+
+    Args:
+        connection: 数据库连接
+    """
+    dialect_name = connection.dialect.name
+    if dialect_name == "sqlite":
+        if connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (_SQLITE_TRIGGER,)
+        ).first():
+            return
+        statements, backfill = _SQLITE_DDL, _SQLITE_BACKFILL
+    elif dialect_name == "postgresql":
+        if connection.exec_driver_sql(
+            "SELECT 1 FROM pg_trigger WHERE tgname = %(name)s AND tgrelid = 'verification_logs'::regclass",
+            {"name": _POSTGRESQL_TRIGGER},
+        ).first():
+            return
+        connection.exec_driver_sql("LOCK TABLE verification_logs IN SHARE ROW EXCLUSIVE MODE")
+        statements, backfill = _POSTGRESQL_DDL, _POSTGRESQL_BACKFILL
+    else:
+        return
+
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql("DELETE FROM verification_rollups")
+    connection.exec_driver_sql(backfill)
+
+
+def drop_verification_rollups(connection: Connection) -> None:
+    """删除核销汇总触发器（汇总表随元数据删除）"""
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {_SQLITE_TRIGGER}")
+    elif connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {_POSTGRESQL_TRIGGER} ON verification_logs")
+        connection.exec_driver_sql(f"DROP FUNCTION IF EXISTS {_POSTGRESQL_FUNCTION}()")
+
+
+event.listen(Base.metadata, "after_create", lambda target, connection, **kw: install_verification_rollups(connection))
+event.listen(Base.metadata, "before_drop", lambda target, connection, **kw: drop_verification_rollups(connection))
@@ -72,10 +72,11 @@ class InvitationCodeResponse(InvitationCodeBase):
 
 class InvitationCodeListResponse(BaseModel):
     """激活码列表响应模型"""
-    total: int
+    total: Optional[int] = Field(None, description="总数(include_total=False 时为空)")
     page: int
     page_size: int
     items: list[InvitationCodeResponse]
+    next_cursor: Optional[str] = Field(None, description="下一页游标(没有更多数据时为空)")
 
 
 class CodeGenerateRequest(BaseModel):
@@ -103,3 +104,19 @@ class BatchDisableUnusedResponse(BaseModel):
     success: bool = Field(True, description="是否成功")
     message: str = Field(..., description="提示信息")
     disabled_count: int = Field(..., description="禁用的数量")
+
+
+class CodeImportRejection(BaseModel):
+    """导入被拒绝的行"""
+    row: int = Field(..., description="行号(从1开始,不含表头)")
+    code: Optional[str] = Field(None, description="激活码")
+    error_code: str = Field(..., description="拒绝原因代码")
+    message: str = Field(..., description="拒绝原因")
+
+
+class CodeImportResponse(BaseModel):
+    """批量导入激活码响应模型"""
+    total: int = Field(..., description="文件中的记录数")
+    imported_count: int = Field(..., description="成功导入的数量")
+    rejected_count: int = Field(..., description="被拒绝的数量")
+    rejections: list[CodeImportRejection] = Field(default_factory=list, description="被拒绝的行(按行号排序)")
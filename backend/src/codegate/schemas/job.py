@@ -0,0 +1,60 @@
+"""
+定时任务相关的 Pydantic 模型
+
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import json
+from datetime import datetime
+from typing import Any, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from .utils import datetime_to_timestamp
+
+
+class ScheduledJobResponse(BaseModel):
+    """定时任务运行状态"""
+    name: str = Field(..., description="任务名称")
+    interval_seconds: int = Field(..., description="运行间隔（秒）")
+    running: bool = Field(..., description="是否有 worker 正在运行")
+    last_started_at: Optional[int] = Field(None, description="最近一次开始时间(UTC时间戳,秒级)")
+    last_finished_at: Optional[int] = Field(None, description="最近一次结束时间(UTC时间戳,秒级)")
+    last_duration_seconds: Optional[float] = Field(None, description="最近一次耗时（秒）")
+    last_status: Optional[str] = Field(None, description="最近一次结果（success/failed）")
+    last_result: Optional[dict[str, Any]] = Field(None, description="最近一次统计信息（各任务的处理行数等）")
+    last_error: Optional[str] = Field(None, description="最近一次失败原因")
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @field_validator("last_started_at", "last_finished_at", mode="before")
+    @classmethod
+    def convert_timestamps(cls, v: Any) -> Optional[int]:
+        """转换时间字段为时间戳"""
+        if isinstance(v, datetime):
+            return datetime_to_timestamp(v)
+        return v
+
+    @field_validator("last_result", mode="before")
+    @classmethod
+    def parse_result(cls, v: Any) -> Optional[dict[str, Any]]:
+        """解析 JSON 文本"""
+        if isinstance(v, str):
+            return json.loads(v)
+        return v
+
+
+class ScheduledJobListResponse(BaseModel):
+    """定时任务运行状态列表"""
+    items: list[ScheduledJobResponse]
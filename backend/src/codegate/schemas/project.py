@@ -65,6 +65,7 @@ class ProjectResponse(ProjectBase):
     code_count: Optional[int] = Field(None, description="激活码总数")
     verified_count: Optional[int] = Field(None, description="已核销数量")
     unverified_count: Optional[int] = Field(None, description="未核销数量")
+    disabled_count: Optional[int] = Field(None, description="已禁用数量")
     expired_count: Optional[int] = Field(None, description="已过期数量")
 
     @field_validator('id', mode='before')
@@ -91,6 +92,12 @@ class ProjectResponse(ProjectBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProjectUpdateResponse(ProjectResponse):
+    """更新项目响应模型"""
+    codes_expiry_updated: int = Field(0, description="随项目过期时间变更重算过期状态的激活码数量")
+    codes_expiry_pending: bool = Field(False, description="受影响的激活码较多，过期状态正在后台分块重算")
+
+
 class ProjectListResponse(BaseModel):
     """项目列表响应模型"""
     total: int
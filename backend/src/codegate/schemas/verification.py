@@ -60,3 +60,17 @@ class VerificationResponse(BaseModel):
         if isinstance(v, int):
             return v
         return None
+
+
+class VerificationSeriesPoint(BaseModel):
+    """核销时间序列数据点"""
+    bucket_start: int = Field(..., description="时间桶起点(UTC时间戳,秒级)")
+    success: int = Field(..., description="核销成功次数")
+    failed: int = Field(..., description="核销失败次数")
+
+
+class VerificationSeriesResponse(BaseModel):
+    """核销时间序列响应模型"""
+    project_id: str = Field(..., description="项目ID(UUID,去除连字符)")
+    granularity: str = Field(..., description="时间粒度(hour/day)")
+    items: list[VerificationSeriesPoint] = Field(default_factory=list, description="数据点(按时间升序)")
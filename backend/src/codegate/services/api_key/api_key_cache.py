@@ -0,0 +1,227 @@
+"""
+API Key 进程内缓存与最后使用时间合并写入
+
+- ApiKeyCache：按 api_key 缓存启用中的密钥（含未知密钥的负缓存），TTL + LRU 容量上限；
+  管理端修改在会话提交后失效缓存，查询期间发生失效的结果不写入缓存
+- ApiKeyUsageRecorder：在内存中合并 last_used_at，定期以一次批量 UPDATE 写回
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam, event, update
+from sqlalchemy.orm import Session, SessionTransaction
+
+from ...config import settings
+from ...database import get_db_context
+from ...models.api_key import ApiKey
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "api_key_cache_pending"
+
+
+@dataclass(frozen=True, slots=True)
+class CachedApiKey:
+    """API Key 只读快照（不绑定数据库会话，可跨请求共享）"""
+    id: str
+    project_id: str
+    api_key: str
+    secret: str
+
+    @classmethod
+    def from_model(cls, api_key: ApiKey) -> "CachedApiKey":
+        return cls(
+            id=api_key.id,
+            project_id=api_key.project_id,
+            api_key=api_key.api_key,
+            secret=api_key.secret,
+        )
+
+
+class ApiKeyCache:
+    """启用中 API Key 的 TTL 缓存（线程安全）"""
+
+    def __init__(self, ttl_seconds: int, negative_ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        # api_key -> (快照或 None（负缓存）, 过期时刻 monotonic)
+        self._entries: OrderedDict[str, tuple[Optional[CachedApiKey], float]] = OrderedDict()
+        # 每次失效递增，查询开始后发生失效的结果不写入缓存
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """当前失效代数（未命中时在查询数据库前读取，写入缓存时传回）"""
+        return self._generation
+
+    def get(self, api_key: str) -> tuple[bool, Optional[CachedApiKey]]:
+        """
+        查询缓存
+
+        Returns:
+            tuple[bool, Optional[CachedApiKey]]: (是否命中, 快照)；命中且快照为 None 表示已知无效的密钥
+        """
+        with self._lock:
+            entry = self._entries.get(api_key)
+            if entry is None:
+                return False, None
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[api_key]
+                return False, None
+            self._entries.move_to_end(api_key)
+            return True, value
+
+    def set(self, api_key: str, value: Optional[CachedApiKey], generation: Optional[int] = None) -> None:
+        """
+        写入缓存，value 为 None 时写入负缓存
+
+        Args:
+            api_key: API Key
+            value: 快照
+            generation: 查询数据库前读取的失效代数；期间发生过失效时不写入（读到的可能是旧数据）
+        """
+        ttl = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        if ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[api_key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(api_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_id(self, api_key_id: str) -> None:
+        """按 API Key ID 失效缓存"""
+        with self._lock:
+            self._generation += 1
+            for key in [k for k, (v, _) in self._entries.items() if v is not None and v.id == api_key_id]:
+                del self._entries[key]
+
+    def invalidate_key(self, api_key: str) -> None:
+        """按 API Key 失效缓存（含负缓存，如重新启用的密钥）"""
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(api_key, None)
+
+    def invalidate_project(self, project_id: str) -> None:
+        """失效项目下所有 API Key 的缓存"""
+        with self._lock:
+            self._generation += 1
+            for key in [k for k, (v, _) in self._entries.items() if v is not None and v.project_id == project_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def invalidate_id_on_commit(self, db: Session, api_key_id: str) -> None:
+        """会话提交后按 API Key ID 失效缓存（提交前失效会被并发请求以旧数据重新缓存）"""
+        db.info.setdefault(_PENDING_KEY, []).append((self.invalidate_id, api_key_id))
+
+    def invalidate_key_on_commit(self, db: Session, api_key: str) -> None:
+        """会话提交后按 API Key 失效缓存"""
+        db.info.setdefault(_PENDING_KEY, []).append((self.invalidate_key, api_key))
+
+    def invalidate_project_on_commit(self, db: Session, project_id: str) -> None:
+        """会话提交后失效项目下所有 API Key 的缓存"""
+        db.info.setdefault(_PENDING_KEY, []).append((self.invalidate_project, project_id))
+
+
+class ApiKeyUsageRecorder:
+    """last_used_at 合并写入缓冲"""
+
+    def __init__(self):
+        self._pending: dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    def record(self, api_key_id: str, used_at: Optional[datetime] = None) -> None:
+        """记录一次使用（同一密钥只保留最新时间）"""
+        used_at = used_at or datetime.utcnow()
+        with self._lock:
+            previous = self._pending.get(api_key_id)
+            if previous is None or used_at > previous:
+                self._pending[api_key_id] = used_at
+
+    def flush(self, db: Session) -> int:
+        """
+        将缓冲的 last_used_at 以一次批量 UPDATE 写回（调用方负责提交）
+
+        Returns:
+            int: 写回的 API Key 数量
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            # 按 Core executemany 执行：期间被删除的密钥匹配 0 行，直接忽略
+            db.execute(
+                update(ApiKey.__table__)
+                .where(ApiKey.__table__.c.id == bindparam("api_key_id"))
+                .values(last_used_at=bindparam("used_at")),
+                [{"api_key_id": api_key_id, "used_at": used_at} for api_key_id, used_at in pending.items()],
+            )
+        except Exception:
+            # 写回失败时放回缓冲，等待下次重试
+            with self._lock:
+                for api_key_id, used_at in pending.items():
+                    current = self._pending.get(api_key_id)
+                    if current is None or used_at > current:
+                        self._pending[api_key_id] = used_at
+            raise
+        return len(pending)
+
+    def flush_now(self) -> int:
+        """使用独立会话写回并提交"""
+        with get_db_context() as db:
+            return self.flush(db)
+
+    async def run_periodic_flush(self, interval_seconds: float) -> None:
+        """后台任务：按固定间隔写回，取消时执行最后一次写回"""
+        try:
+            while True:
+                await asyncio.sleep(interval_seconds)
+                try:
+                    await asyncio.to_thread(self.flush_now)
+                except Exception:
+                    logger.exception("写回 API Key last_used_at 失败")
+        finally:
+            try:
+                await asyncio.to_thread(self.flush_now)
+            except Exception:
+                logger.exception("关闭时写回 API Key last_used_at 失败")
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    for invalidate, value in session.info.pop(_PENDING_KEY, []):
+        invalidate(value)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_on_end(session: Session, transaction: SessionTransaction) -> None:
+    # 提交时已在 after_commit 中取走；SAVEPOINT 回滚不丢弃外层事务登记的失效
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+# 全局实例
+api_key_cache = ApiKeyCache(
+    ttl_seconds=settings.API_KEY_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.API_KEY_NEGATIVE_CACHE_TTL_SECONDS,
+    max_entries=settings.API_KEY_CACHE_MAX_ENTRIES,
+)
+api_key_usage = ApiKeyUsageRecorder()
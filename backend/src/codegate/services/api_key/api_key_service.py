@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 
 from ...models.api_key import ApiKey
 from .api_key_repository import ApiKeyRepository
+from .api_key_cache import api_key_cache
 
 
 class ApiKeyService:
@@ -21,6 +22,7 @@ class ApiKeyService:
         """
         # 删除旧记录
         ApiKeyRepository.delete_by_project(db, project_id)
+        api_key_cache.invalidate_project_on_commit(db, project_id)
 
         # 创建新记录
         api_key = ApiKey(
@@ -46,11 +48,15 @@ class ApiKeyService:
         if not api_key:
             raise ValueError("API Key 不存在")
         api_key.is_active = is_active
+        # 禁用期间的请求以密钥字符串写入负缓存，按 ID 失效不会清除
+        api_key_cache.invalidate_id_on_commit(db, api_key_id)
+        api_key_cache.invalidate_key_on_commit(db, api_key.api_key)
         return api_key
 
     @staticmethod
     def delete(db: Session, api_key_id: str) -> None:
         """删除 API Key"""
         deleted = ApiKeyRepository.delete_by_id(db, api_key_id)
+        api_key_cache.invalidate_id_on_commit(db, api_key_id)
         if deleted == 0:
             raise ValueError("API Key 不存在")
@@ -20,6 +20,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import select, and_, func
 
 from ...models.audit_log import AuditLog
+from .log_writer import log_writer
 
 
 class AuditRepository:
@@ -37,7 +38,7 @@ class AuditRepository:
         Returns:
             AuditLog: 创建的审计日志
         """
-        db.add(log)
+        log_writer.add(db, log)
         return log
 
     @staticmethod
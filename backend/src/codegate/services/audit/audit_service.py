@@ -23,7 +23,7 @@ from ...models.audit_log import AuditLog
 from ...models.admin import Admin
 from ...models.project import Project
 from ...models.invitation_code import InvitationCode
-from .audit_repository import AuditRepository
+from .audit_sink import audit_sink
 
 
 class AuditService:
@@ -43,7 +43,7 @@ class AuditService:
         details: Optional[Dict[str, Any]] = None,
     ) -> AuditLog:
         """
-        记录审计日志
+        记录审计日志（写入 AUDIT_SINK 配置的存储）
 
         Args:
             db: 数据库会话
@@ -71,7 +71,8 @@ class AuditService:
             user_agent=user_agent,
             details=json.dumps(details, ensure_ascii=False) if details else None,
         )
-        return AuditRepository.create(db, log)
+        audit_sink.write(db, log)
+        return log
 
     @staticmethod
     def get_logs(
@@ -87,7 +88,7 @@ class AuditService:
         page_size: int = 20,
     ) -> tuple[list[AuditLog], int]:
         """
-        获取审计日志列表
+        获取审计日志列表（从 AUDIT_SINK 配置的存储读取）
 
         Args:
             db: 数据库会话
@@ -104,7 +105,7 @@ class AuditService:
         Returns:
             tuple[list[AuditLog], int]: (日志列表, 总数)
         """
-        return AuditRepository.get_list(
+        return audit_sink.query(
             db=db,
             actor_id=actor_id,
             resource_type=resource_type,
@@ -0,0 +1,337 @@
+"""
+审计日志存储（sink）
+
+- DatabaseAuditSink：写入 audit_logs 表（经由日志批量写入器），默认实现
+- FileAuditSink：追加写入本地 JSON Lines 文件，按大小/时间轮转并以 gzip 压缩；
+  index.jsonl 记录每个已压缩分段的时间范围，按时间范围查询时跳过不相交的分段
+- FanoutAuditSink：同时写入多个 sink，从第一个 sink 读取
+
+审计日志与请求事务一致：文件 sink 在会话提交后才追加写入，事务回滚时丢弃。
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import gzip
+import heapq
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Iterator, Optional, Protocol
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+
+from ...config import settings
+from ...models.audit_log import AuditLog
+from ...utils.uuid_utils import generate_uuid
+from .audit_repository import AuditRepository
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "audit_sink_pending"
+_INDEX_FILE = "index.jsonl"
+_ACTIVE_SUFFIX = ".jsonl"
+_COMPRESSED_SUFFIX = ".jsonl.gz"
+_FIELDS = (
+    "id", "action", "actor_id", "actor_type", "resource_type", "resource_id",
+    "result", "ip_address", "user_agent", "details",
+)
+
+
+class AuditSink(Protocol):
+    def write(self, db: Session, log: AuditLog) -> None: ...
+
+    def query(
+        self,
+        db: Session,
+        actor_id: Optional[str] = None,
+        resource_type: Optional[str] = None,
+        resource_id: Optional[str] = None,
+        action: Optional[str] = None,
+        result: Optional[str] = None,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        page: int = 1,
+        page_size: int = 20,
+    ) -> tuple[list[AuditLog], int]: ...
+
+    def close(self) -> None: ...
+
+
+class DatabaseAuditSink:
+    """写入 audit_logs 表"""
+
+    def write(self, db: Session, log: AuditLog) -> None:
+        AuditRepository.create(db, log)
+
+    def query(self, db: Session, **filters: Any) -> tuple[list[AuditLog], int]:
+        return AuditRepository.get_list(db, **filters)
+
+    def close(self) -> None:
+        pass
+
+
+def _format_time(value: datetime) -> str:
+    # 固定位数的 ISO 格式，字符串顺序与时间顺序一致
+    return value.isoformat(timespec="microseconds")
+
+
+class FileAuditSink:
+    """
+    本地 JSON Lines 文件存储（追加写入，线程安全）
+
+    每个进程写入各自的活动分段 audit-<开始时间>-<pid>.jsonl，达到 max_bytes 或 rotate_seconds 后
+    压缩为 .jsonl.gz 并在 index.jsonl 追加一行 {"segment", "start", "end", "count"}。
+    查询时读取时间范围相交的已压缩分段，以及所有尚未压缩的分段（含其他进程的活动分段）。
+    """
+
+    def __init__(self, directory: str, max_bytes: int, rotate_seconds: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self._lock = threading.Lock()
+        self._file: Optional[IO[str]] = None
+        self._path: Optional[Path] = None
+        self._opened_at = 0.0
+        self._start: Optional[str] = None
+        self._end: Optional[str] = None
+        self._count = 0
+
+    def write(self, db: Session, log: AuditLog) -> None:
+        """登记一条审计日志，会话提交后追加写入"""
+        if not log.id:
+            log.id = generate_uuid()
+        if log.created_at is None:
+            log.created_at = datetime.utcnow()
+        if log.actor_type is None:
+            log.actor_type = "admin"
+        if log.result is None:
+            log.result = "success"
+        record = {field: getattr(log, field) for field in _FIELDS}
+        record["created_at"] = _format_time(log.created_at)
+        db.info.setdefault(_PENDING_KEY, []).append((self, record))
+
+    def append(self, records: list[dict[str, Any]]) -> None:
+        """追加写入已提交的审计日志（必要时先轮转）"""
+        if not records:
+            return
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self._lock:
+            if self._file is not None and (
+                self._file.tell() >= self.max_bytes
+                or time.monotonic() - self._opened_at >= self.rotate_seconds
+            ):
+                self._rotate()
+            if self._file is None:
+                self._open()
+            self._file.write(lines)
+            self._file.flush()
+            created = [record["created_at"] for record in records]
+            self._start = min([self._start, *created]) if self._start else min(created)
+            self._end = max([self._end, *created]) if self._end else max(created)
+            self._count += len(records)
+
+    def close(self) -> None:
+        """压缩当前活动分段"""
+        with self._lock:
+            self._rotate()
+
+    def _open(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"audit-{datetime.utcnow():%Y%m%dT%H%M%S%f}-{os.getpid()}{_ACTIVE_SUFFIX}"
+        self._path = self.directory / name
+        self._file = open(self._path, "a", encoding="utf-8")
+        self._opened_at = time.monotonic()
+        self._start = self._end = None
+        self._count = 0
+
+    def _rotate(self) -> None:
+        """压缩活动分段：写入 .gz → 追加索引 → 删除原文件（读取方据索引跳过已压缩的原文件）"""
+        if self._file is None:
+            return
+        self._file.close()
+        path, self._file = self._path, None
+        if not self._count:
+            path.unlink(missing_ok=True)
+            return
+        compressed = path.with_name(path.name[: -len(_ACTIVE_SUFFIX)] + _COMPRESSED_SUFFIX)
+        tmp = compressed.with_name(compressed.name + ".tmp")
+        with open(path, "rb") as source, gzip.open(tmp, "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.replace(tmp, compressed)
+        entry = {"segment": compressed.name, "start": self._start, "end": self._end, "count": self._count}
+        with open(self.directory / _INDEX_FILE, "a", encoding="utf-8") as index:
+            index.write(json.dumps(entry) + "\n")
+        path.unlink()
+
+    def _segments(self, start: Optional[str], end: Optional[str]) -> list[Path]:
+        """与时间范围相交的已压缩分段，以及尚未压缩的分段"""
+        indexed: set[str] = set()
+        segments: list[Path] = []
+        index_path = self.directory / _INDEX_FILE
+        if index_path.exists():
+            with open(index_path, encoding="utf-8") as index:
+                for line in index:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 写入中的最后一行
+                        continue
+                    indexed.add(entry["segment"])
+                    if (start is None or entry["end"] >= start) and (end is None or entry["start"] <= end):
+                        segments.append(self.directory / entry["segment"])
+        if self.directory.exists():
+            for path in self.directory.glob(f"audit-*{_ACTIVE_SUFFIX}"):
+                if path.name[: -len(_ACTIVE_SUFFIX)] + _COMPRESSED_SUFFIX not in indexed:
+                    segments.append(path)
+        return segments
+
+    @staticmethod
+    def _read(path: Path) -> Iterator[dict[str, Any]]:
+        opener = gzip.open if path.name.endswith(_COMPRESSED_SUFFIX) else open
+        try:
+            with opener(path, "rt", encoding="utf-8") as segment:
+                for line in segment:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # 活动分段中尚未写完的行
+                        continue
+        except FileNotFoundError:
+            # 读取期间被压缩（已压缩分段在下次查询时通过索引读取）
+            return
+
+    def query(
+        self,
+        db: Session,
+        actor_id: Optional[str] = None,
+        resource_type: Optional[str] = None,
+        resource_id: Optional[str] = None,
+        action: Optional[str] = None,
+        result: Optional[str] = None,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        page: int = 1,
+        page_size: int = 20,
+    ) -> tuple[list[AuditLog], int]:
+        """
+        按条件查询审计日志（按创建时间倒序分页）
+
+        只保留到当前页为止的最新记录，内存占用与 page * page_size 成正比。
+        """
+        start = _format_time(datetime.utcfromtimestamp(start_time)) if start_time is not None else None
+        end = _format_time(datetime.utcfromtimestamp(end_time)) if end_time is not None else None
+        filters = {
+            "actor_id": actor_id,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "action": action,
+            "result": result,
+        }
+        filters = {key: value for key, value in filters.items() if value is not None}
+
+        keep = page * page_size
+        top: list[tuple[str, str, dict[str, Any]]] = []
+        total = 0
+        for path in self._segments(start, end):
+            for record in self._read(path):
+                created_at = record["created_at"]
+                if (start is not None and created_at < start) or (end is not None and created_at > end):
+                    continue
+                if any(record.get(key) != value for key, value in filters.items()):
+                    continue
+                total += 1
+                item = (created_at, record["id"], record)
+                if len(top) < keep:
+                    heapq.heappush(top, item)
+                elif item[:2] > top[0][:2]:
+                    heapq.heapreplace(top, item)
+
+        newest = sorted(top, key=lambda item: item[:2], reverse=True)[(page - 1) * page_size:]
+        logs = [
+            AuditLog(
+                **{field: record.get(field) for field in _FIELDS},
+                created_at=datetime.fromisoformat(record["created_at"]),
+            )
+            for _, _, record in newest
+        ]
+        return logs, total
+
+
+class FanoutAuditSink:
+    """同时写入多个 sink，从第一个 sink 读取"""
+
+    def __init__(self, sinks: list[AuditSink]):
+        self.sinks = sinks
+
+    def write(self, db: Session, log: AuditLog) -> None:
+        for sink in self.sinks:
+            sink.write(db, log)
+
+    def query(self, db: Session, **filters: Any) -> tuple[list[AuditLog], int]:
+        return self.sinks[0].query(db, **filters)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+@event.listens_for(Session, "after_commit")
+def _append_on_commit(session: Session) -> None:
+    pending: list[tuple[FileAuditSink, dict[str, Any]]] = session.info.pop(_PENDING_KEY, [])
+    grouped: dict[FileAuditSink, list[dict[str, Any]]] = {}
+    for sink, record in pending:
+        grouped.setdefault(sink, []).append(record)
+    for sink, records in grouped.items():
+        try:
+            sink.append(records)
+        except Exception:
+            logger.exception("写入审计日志文件失败（%d 条）", len(records))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_on_end(session: Session, transaction: SessionTransaction) -> None:
+    # 提交时已在 after_commit 中取走；剩余的来自回滚或未提交即关闭的事务
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def get_audit_sink(settings) -> AuditSink:
+    """根据配置返回审计日志存储实现"""
+    backend = (settings.AUDIT_SINK or "database").lower()
+
+    if backend in ("file", "fanout"):
+        file_sink = FileAuditSink(
+            settings.AUDIT_FILE_DIR,
+            max_bytes=settings.AUDIT_FILE_MAX_BYTES,
+            rotate_seconds=settings.AUDIT_FILE_ROTATE_SECONDS,
+        )
+        if backend == "file":
+            logger.info(f"审计日志写入本地文件：{settings.AUDIT_FILE_DIR}")
+            return file_sink
+        logger.info(f"审计日志同时写入数据库与本地文件：{settings.AUDIT_FILE_DIR}（从数据库读取）")
+        return FanoutAuditSink([DatabaseAuditSink(), file_sink])
+
+    if backend != "database":
+        logger.warning(f"未知的 AUDIT_SINK={settings.AUDIT_SINK}，使用数据库存储")
+    return DatabaseAuditSink()
+
+
+# 全局实例
+audit_sink = get_audit_sink(settings)
@@ -0,0 +1,275 @@
+"""
+核销日志与审计日志批量写入（write-behind）
+
+- LogWriter：请求事务提交后将日志行放入有界内存队列，由后台线程每隔 FLUSH_INTERVAL 或累积
+  BATCH_SIZE 条时以批量 INSERT 写入；事务回滚（或未提交即关闭）时丢弃本事务产生的日志
+- 背压在提交前施加：队列满时，线程池中的同步请求在记录日志时等待写入线程腾出空间；
+  事件循环线程（AsyncSession.run_sync）不等待。提交钩子从不阻塞，提交时队列仍满则丢弃并计数
+- LOG_WRITE_MODE=sync 或写入线程未启动时，日志在请求事务内同步写入（原有行为）
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, ContextManager, Optional
+
+from sqlalchemy import Table, event, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, SessionTransaction
+
+from ...config import settings
+from ...database import get_db_context
+from ...models.verification_log import VerificationLog
+from ...utils.uuid_utils import generate_uuid
+from ..dashboard.overview_cache import mark_dirty
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "log_writer_pending"
+
+# 丢弃日志时告警的最短间隔（秒）
+_DROP_WARNING_INTERVAL_SECONDS = 10
+
+LogRow = tuple[Table, dict[str, Any]]
+
+
+def _row_values(obj: Any) -> dict[str, Any]:
+    """由 ORM 日志对象构造 INSERT 参数（提前生成主键，按提交日志的时间填充列默认值）"""
+    if not obj.id:
+        obj.id = generate_uuid()
+    values = {}
+    for column in obj.__table__.columns:
+        value = getattr(obj, column.key)
+        default = column.default
+        if value is None and default is not None:
+            value = default.arg(None) if default.is_callable else default.arg
+            setattr(obj, column.key, value)
+        values[column.key] = value
+    return values
+
+
+class LogWriter:
+    """日志批量写入器（线程安全）"""
+
+    def __init__(
+        self,
+        max_queue_size: int,
+        batch_size: int,
+        flush_interval_seconds: float,
+        enqueue_timeout_seconds: float,
+        session_factory: Callable[[], ContextManager[Session]] = get_db_context,
+    ):
+        self.max_queue_size = max(max_queue_size, 1)
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.enqueue_timeout_seconds = enqueue_timeout_seconds
+        self.session_factory = session_factory
+        self._queue: deque[LogRow] = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._dropped = 0
+        self._dropped_warned_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        """写入线程是否在运行"""
+        return self._thread is not None and self._thread.is_alive() and not self._stopping
+
+    @property
+    def dropped(self) -> int:
+        """因队列已满丢弃的日志条数（累计）"""
+        return self._dropped
+
+    def add(self, db: Session, obj: Any) -> None:
+        """
+        记录一条日志（替代 db.add）
+
+        写入线程运行时，日志在会话提交后进入队列；否则加入会话，随请求事务同步写入。
+        队列已满时在此处（提交前）施加背压，见 _wait_for_capacity。
+
+        Args:
+            db: 数据库会话
+            obj: 日志对象（VerificationLog / AuditLog）
+        """
+        if not self.running:
+            db.add(obj)
+            return
+        self._wait_for_capacity()
+        pending: dict[LogWriter, list[LogRow]] = db.info.setdefault(_PENDING_KEY, {})
+        pending.setdefault(self, []).append((obj.__table__, _row_values(obj)))
+
+    def _wait_for_capacity(self) -> None:
+        """
+        队列已满时等待写入线程腾出空间（最长 enqueue_timeout_seconds）
+
+        只在线程池中的同步请求里等待；事件循环线程上（AsyncSession.run_sync）等待会阻塞
+        所有请求，直接返回。
+        """
+        try:
+            asyncio.get_running_loop()
+            return
+        except RuntimeError:
+            pass
+        deadline = time.monotonic() + self.enqueue_timeout_seconds
+        with self._condition:
+            while self.running and len(self._queue) >= self.max_queue_size:
+                self._condition.notify_all()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self._condition.wait(remaining)
+
+    def enqueue(self, rows: list[LogRow]) -> None:
+        """
+        将已提交事务的日志放入队列（在提交钩子中调用，从不阻塞）
+
+        队列已满时丢弃超出部分并计数。
+        """
+        if not rows:
+            return
+        with self._condition:
+            accepted = rows[: max(self.max_queue_size - len(self._queue), 0)]
+            self._queue.extend(accepted)
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify_all()
+            dropped = len(rows) - len(accepted)
+            if not dropped:
+                return
+            self._dropped += dropped
+            now = time.monotonic()
+            warn = now - self._dropped_warned_at >= _DROP_WARNING_INTERVAL_SECONDS
+            if warn:
+                self._dropped_warned_at = now
+        if warn:
+            logger.warning("日志队列已满，丢弃 %d 条日志（累计 %d 条）", dropped, self._dropped)
+
+    def flush(self) -> int:
+        """
+        立即写入队列中的全部日志
+
+        Returns:
+            int: 写入的日志条数
+        """
+        written = 0
+        while True:
+            rows = self._take(self.batch_size)
+            if not rows:
+                return written
+            written += self._write(rows)
+
+    def start(self) -> None:
+        """启动写入线程"""
+        if self.running:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="codegate-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止写入线程并写入队列中剩余的日志（之后提交的日志改为同步写入）"""
+        thread = self._thread
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+        self.flush()
+
+    def _take(self, limit: int) -> list[LogRow]:
+        with self._condition:
+            rows = [self._queue.popleft() for _ in range(min(limit, len(self._queue)))]
+            if rows:
+                # 唤醒等待队列空间的提交方
+                self._condition.notify_all()
+            return rows
+
+    def _run(self) -> None:
+        """写入线程：累积到 batch_size 条或等待 flush_interval_seconds 后写入一批"""
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + self.flush_interval_seconds
+                while not self._stopping and len(self._queue) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                stopping = self._stopping
+            rows = self._take(self.batch_size)
+            if rows:
+                self._write(rows)
+            elif stopping:
+                return
+
+    def _write(self, rows: list[LogRow]) -> int:
+        """按表批量写入；整批失败时逐条重试，丢弃无法写入的日志（如激活码已被删除）"""
+        try:
+            self._insert(rows)
+            return len(rows)
+        except IntegrityError:
+            logger.info("批量写入 %d 条日志违反约束，改为逐条写入", len(rows))
+        except Exception:
+            logger.exception("批量写入 %d 条日志失败，改为逐条写入", len(rows))
+
+        written = 0
+        for row in rows:
+            try:
+                self._insert([row])
+                written += 1
+            except IntegrityError:
+                # 关联的激活码已被删除（其日志本应随之级联删除）
+                logger.info("丢弃违反约束的日志: %s %s", row[0].name, row[1].get("id"))
+            except Exception:
+                logger.warning("丢弃无法写入的日志: %s %s", row[0].name, row[1].get("id"), exc_info=True)
+        return written
+
+    def _insert(self, rows: list[LogRow]) -> None:
+        grouped: dict[Table, list[dict[str, Any]]] = {}
+        for table, values in rows:
+            grouped.setdefault(table, []).append(values)
+        with self.session_factory() as db:
+            for table, values in grouped.items():
+                db.execute(insert(table), values)
+            # 只有成功的核销记录出现在概览中；失败记录的批次（如暴力尝试）不失效概览快照
+            verification_logs = grouped.get(VerificationLog.__table__, [])
+            if any(values["result"] == "success" for values in verification_logs):
+                mark_dirty(db)
+            db.commit()
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_on_commit(session: Session) -> None:
+    for writer, rows in session.info.pop(_PENDING_KEY, {}).items():
+        writer.enqueue(rows)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_on_end(session: Session, transaction: SessionTransaction) -> None:
+    # 提交时已在 after_commit 中取走；剩余的来自回滚或未提交即关闭的事务
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+# 全局实例（由应用启动时按 LOG_WRITE_MODE 决定是否启动写入线程）
+log_writer = LogWriter(
+    max_queue_size=settings.LOG_WRITER_QUEUE_SIZE,
+    batch_size=settings.LOG_WRITER_BATCH_SIZE,
+    flush_interval_seconds=settings.LOG_WRITER_FLUSH_INTERVAL_MS / 1000,
+    enqueue_timeout_seconds=settings.LOG_WRITER_ENQUEUE_TIMEOUT_SECONDS,
+)
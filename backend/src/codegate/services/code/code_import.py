@@ -0,0 +1,234 @@
+"""
+激活码导入文件解析
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Iterator, Optional
+
+from ...utils.validators import validate_code_format
+from ...schemas.utils import timestamp_to_datetime
+
+# 单条 JSON 记录的最大长度（字符），超过视为文件格式错误，避免缓冲区无限增长
+MAX_JSON_RECORD_SIZE = 64 * 1024
+_READ_CHUNK_SIZE = 64 * 1024
+
+_TRUE_VALUES = {"true", "1", "yes", "used"}
+_FALSE_VALUES = {"false", "0", "no", "unused", ""}
+
+
+class ImportRowError(Exception):
+    """导入行校验失败（仅拒绝该行，不中断导入）"""
+
+    def __init__(self, error_code: str, message: str):
+        self.error_code = error_code
+        self.message = message
+        super().__init__(message)
+
+
+def iter_import_records(stream: BinaryIO, import_format: str) -> Iterator[tuple[int, Any]]:
+    """
+    逐条解析导入文件（按块读取，内存占用与文件大小无关）
+
+    - csv：首行为表头，至少包含 code 列（与 fixtures/sample_codes.csv 一致）
+    - json：对象数组，或每行一个对象（JSON Lines）
+
+    Args:
+        stream: 二进制文件对象（UTF-8，可带 BOM）
+        import_format: 文件格式（csv / json）
+
+    Yields:
+        tuple[int, Any]: (行号，从 1 开始，不含表头；原始记录)
+
+    Raises:
+        ValueError: 文件格式错误
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        if import_format == "csv":
+            yield from _iter_csv(text)
+        elif import_format == "json":
+            yield from _iter_json(text)
+        else:
+            raise ValueError(f"不支持的导入格式: {import_format}")
+    except UnicodeDecodeError:
+        raise ValueError("文件编码必须为 UTF-8")
+    finally:
+        # 不随包装对象一起关闭底层文件
+        text.detach()
+
+
+def _iter_csv(text: io.TextIOWrapper) -> Iterator[tuple[int, Any]]:
+    """逐行解析 CSV"""
+    reader = csv.DictReader(text)
+    if not reader.fieldnames or "code" not in reader.fieldnames:
+        raise ValueError("CSV 表头缺少 code 列")
+    try:
+        for row_number, row in enumerate(reader, start=1):
+            yield row_number, row
+    except csv.Error as e:
+        raise ValueError(f"CSV 格式错误: {e}")
+
+
+def _iter_json(text: io.TextIOWrapper) -> Iterator[tuple[int, Any]]:
+    """增量解析 JSON 数组或 JSON Lines"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    in_array: Optional[bool] = None
+    closed = False
+    row_number = 0
+
+    while True:
+        # 跳过空白与数组分隔符，必要时读取下一块
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            chunk = text.read(_READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+
+        if pos >= len(buffer):
+            break
+
+        char = buffer[pos]
+        if closed:
+            raise ValueError("JSON 格式错误: 数组结束后存在多余内容")
+        if in_array is None:
+            in_array = char == "["
+            if in_array:
+                pos += 1
+                continue
+        if in_array and char == "]":
+            closed = True
+            pos += 1
+            continue
+        if in_array and char == ",":
+            pos += 1
+            continue
+
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ValueError(f"JSON 格式错误: {e}")
+            if len(buffer) - pos > MAX_JSON_RECORD_SIZE:
+                raise ValueError(f"JSON 记录过大（超过 {MAX_JSON_RECORD_SIZE} 字符）")
+            chunk = text.read(_READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        pos = end
+        row_number += 1
+        yield row_number, record
+
+    if in_array and not closed:
+        raise ValueError("JSON 格式错误: 数组未结束")
+
+
+def parse_import_record(record: Any) -> dict[str, Any]:
+    """
+    校验并规范化一条导入记录
+
+    支持字段：code（必填）、status、verified_at、verified_by、expires_at；
+    project_id 等其他字段忽略（导入目标项目由接口路径指定）。
+    时间字段可为 UTC 秒级时间戳或 ISO 8601 字符串（无时区视为 UTC）。
+
+    Args:
+        record: 原始记录（CSV 行字典或 JSON 对象）
+
+    Returns:
+        dict: code, status, verified_at, verified_by, expires_at
+
+    Raises:
+        ImportRowError: 记录无效
+    """
+    if not isinstance(record, dict):
+        raise ImportRowError("INVALID_ROW", "记录必须是对象")
+
+    code = record.get("code")
+    code = code.strip() if isinstance(code, str) else code
+    if not validate_code_format(code):
+        raise ImportRowError("INVALID_CODE", "激活码必须为 1-100 位字母、数字、连字符或下划线")
+
+    status = _parse_bool(record.get("status"))
+    if status is None:
+        raise ImportRowError("INVALID_STATUS", "status 必须为 true/false")
+
+    verified_at = _parse_datetime(record.get("verified_at"), "verified_at")
+    expires_at = _parse_datetime(record.get("expires_at"), "expires_at")
+
+    verified_by = record.get("verified_by")
+    if verified_by is not None and not isinstance(verified_by, str):
+        raise ImportRowError("INVALID_VERIFIED_BY", "verified_by 必须是字符串")
+    verified_by = (verified_by.strip() or None) if verified_by else None
+    if verified_by is not None and len(verified_by) > 100:
+        raise ImportRowError("INVALID_VERIFIED_BY", "verified_by 不能超过 100 个字符")
+
+    if not status and (verified_at is not None or verified_by is not None):
+        raise ImportRowError("INCONSISTENT_STATUS", "未核销的激活码不能包含核销时间或核销用户")
+
+    return {
+        "code": code,
+        "status": status,
+        "verified_at": verified_at,
+        "verified_by": verified_by,
+        "expires_at": expires_at,
+    }
+
+
+def _parse_bool(value: Any) -> Optional[bool]:
+    """解析布尔值，无法识别返回 None"""
+    if value is None or isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, str):
+        normalized = value.strip().lower()
+        if normalized in _TRUE_VALUES:
+            return True
+        if normalized in _FALSE_VALUES:
+            return False
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    return None
+
+
+def _parse_datetime(value: Any, field: str) -> Optional[datetime]:
+    """解析时间戳或 ISO 8601 字符串为 UTC naive datetime"""
+    if isinstance(value, str):
+        value = value.strip()
+    if value is None or value == "":
+        return None
+    try:
+        if isinstance(value, bool):
+            raise ValueError
+        if isinstance(value, (int, float)):
+            return timestamp_to_datetime(value)
+        if isinstance(value, str):
+            if value.isdigit():
+                return timestamp_to_datetime(int(value))
+            parsed = datetime.fromisoformat(value)
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            return parsed
+    except (ValueError, OverflowError, OSError):
+        pass
+    raise ImportRowError(f"INVALID_{field.upper()}", f"{field} 必须是 UTC 秒级时间戳或 ISO 8601 时间")
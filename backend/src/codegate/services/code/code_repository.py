@@ -15,15 +15,83 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
-from typing import Optional
+import time
+from datetime import datetime
+from typing import Any, Iterator, Optional
+from sqlalchemy import and_, case, exists, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import ColumnElement
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
+from ...models.code_search import project_search_conditions
 from ...models.invitation_code import InvitationCode
+from ...models.project import Project
+
+
+# 激活码所属项目的过期时间（相关子查询，按主键查找）
+_PROJECT_EXPIRES_AT = (
+    select(Project.expires_at).where(Project.id == InvitationCode.project_id).scalar_subquery()
+)
 
 
 class CodeRepository:
     """激活码数据访问层"""
 
+    @staticmethod
+    def effective_is_expired(project_expires_at: Optional[ColumnElement] = None) -> ColumnElement[bool]:
+        """
+        激活码实际的过期状态（SQL 表达式，读取路径使用，不依赖 is_expired 字段是否已刷新）
+
+        未使用、未禁用且过期时间（激活码自身的，否则项目的）已过时为 True（状态互斥）。
+
+        Args:
+            project_expires_at: 项目过期时间表达式（默认按 project_id 相关子查询）
+        """
+        if project_expires_at is None:
+            project_expires_at = _PROJECT_EXPIRES_AT
+        deadline = func.coalesce(InvitationCode.expires_at, project_expires_at)
+        return case(
+            (
+                and_(
+                    InvitationCode.status == False,
+                    InvitationCode.is_disabled == False,
+                    deadline.is_not(None),
+                    deadline < datetime.utcnow(),
+                ),
+                True,
+            ),
+            else_=False,
+        )
+
+    @staticmethod
+    def _with_effective_expiry(rows) -> list[InvitationCode]:
+        """以实际过期状态填充 is_expired（作为已加载值，不会在 flush 时写回）"""
+        codes = []
+        for code, is_expired in rows:
+            set_committed_value(code, "is_expired", bool(is_expired))
+            codes.append(code)
+        return codes
+
+    @staticmethod
+    def find_for_read(db: Session, *conditions: ColumnElement[bool]) -> Optional[InvitationCode]:
+        """
+        读取单个激活码，is_expired 为实际过期状态（只读，不写回）
+
+        Args:
+            db: 数据库会话
+            conditions: 筛选条件
+
+        Returns:
+            Optional[InvitationCode]: 激活码对象，不存在返回 None
+        """
+        row = db.execute(
+            select(InvitationCode, CodeRepository.effective_is_expired()).where(*conditions).limit(1)
+        ).first()
+        return CodeRepository._with_effective_expiry([row])[0] if row else None
+
     @staticmethod
     def create_batch(db: Session, codes: list[InvitationCode]) -> list[InvitationCode]:
         """
@@ -40,6 +108,75 @@ class CodeRepository:
         db.flush()  # 确保主键等默认值被填充
         return codes
 
+    @staticmethod
+    def insert_ignore_conflicts(db: Session, rows: list[dict[str, Any]]) -> set[str]:
+        """
+        批量插入激活码，激活码已存在（任意项目）的行被跳过
+
+        使用 INSERT ... ON CONFLICT (code) DO NOTHING，冲突不会中断事务。
+        行数据需包含 id、created_at 等全部字段（Core 插入，不经过 ORM 事件与默认值）。
+
+        - SQLite：executemany，影响行数与输入一致时无需回查；有冲突时按 id 回查实际插入的行
+        - PostgreSQL：多行 VALUES + RETURNING，一次往返得到实际插入的行
+        - 其他数据库：见 _insert_skipping_violations
+
+        Args:
+            db: 数据库会话
+            rows: 激活码行数据列表
+
+        Returns:
+            set[str]: 实际插入的激活码集合
+        """
+        if not rows:
+            return set()
+
+        table = InvitationCode.__table__
+        dialect_name = db.get_bind().dialect.name
+
+        if dialect_name == "sqlite":
+            stmt = sqlite.insert(table).on_conflict_do_nothing(index_elements=["code"])
+            result = db.execute(stmt, rows)
+            if result.rowcount == len(rows):
+                return {row["code"] for row in rows}
+            ids = [row["id"] for row in rows]
+            return set(db.execute(select(table.c.code).where(table.c.id.in_(ids))).scalars().all())
+
+        if dialect_name == "postgresql":
+            stmt = (
+                postgresql.insert(table)
+                .on_conflict_do_nothing(index_elements=["code"])
+                .returning(table.c.code)
+            )
+            return set(db.execute(stmt, rows).scalars().all())
+
+        return CodeRepository._insert_skipping_violations(db, rows)
+
+    @staticmethod
+    def _insert_skipping_violations(db: Session, rows: list[dict[str, Any]]) -> set[str]:
+        """
+        通用实现（不支持 ON CONFLICT 的数据库）：整块在 SAVEPOINT 中插入，
+        违反约束时回滚该 SAVEPOINT 并逐行重试，跳过违反约束的行
+
+        无法区分冲突的约束，违反任意约束的行均被跳过。
+        """
+        table = InvitationCode.__table__
+        try:
+            with db.begin_nested():
+                db.execute(insert(table), rows)
+            return {row["code"] for row in rows}
+        except IntegrityError:
+            pass
+
+        inserted = set()
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(table), row)
+                inserted.add(row["code"])
+            except IntegrityError:
+                continue
+        return inserted
+
     @staticmethod
     def get_by_id(db: Session, code_id: str) -> Optional[InvitationCode]:
         """
@@ -52,7 +189,8 @@ class CodeRepository:
         Returns:
             Optional[InvitationCode]: 激活码对象，不存在返回 None
         """
-        return db.query(InvitationCode).filter(InvitationCode.id == code_id).first()
+        # 覆盖会话中读取路径填充的 is_expired，写路径基于存储值判断
+        return db.query(InvitationCode).filter(InvitationCode.id == code_id).populate_existing().first()
 
     @staticmethod
     def get_by_code(db: Session, code: str) -> Optional[InvitationCode]:
@@ -68,6 +206,133 @@ class CodeRepository:
         """
         return db.query(InvitationCode).filter(InvitationCode.code == code).first()
 
+    @staticmethod
+    def redeem(
+        db: Session,
+        code: str,
+        verified_by: Optional[str],
+        now: datetime,
+    ) -> Optional[InvitationCode]:
+        """
+        以单条条件 UPDATE（compare-and-set）核销激活码
+
+        仅当激活码未使用、未禁用、未过期且所属项目启用且未过期时才会更新成功；
+        并发请求中只有一个能命中条件，其余请求影响行数为 0。
+
+        Args:
+            db: 数据库会话
+            code: 激活码字符串
+            verified_by: 核销用户
+            now: 核销时间（UTC）
+
+        Returns:
+            Optional[InvitationCode]: 核销成功的激活码对象，条件不满足返回 None
+        """
+        project_active = exists().where(
+            Project.id == InvitationCode.project_id,
+            Project.status.is_(True),
+            or_(Project.expires_at.is_(None), Project.expires_at > now),
+        )
+        stmt = (
+            update(InvitationCode)
+            .where(
+                and_(
+                    InvitationCode.code == code,
+                    InvitationCode.status.is_(False),
+                    InvitationCode.is_disabled.is_(False),
+                    # 激活码自身有效期；为空时由 project_active 中的项目有效期兜底
+                    or_(InvitationCode.expires_at.is_(None), InvitationCode.expires_at > now),
+                    project_active,
+                )
+            )
+            # is_expired 可能是过期的旧值（有效期被延长），一并纠正以满足状态互斥约束
+            .values(status=True, verified_at=now, verified_by=verified_by, is_expired=False)
+        )
+
+        if db.get_bind().dialect.update_returning:
+            return db.execute(
+                stmt.returning(InvitationCode),
+                execution_options={"synchronize_session": False, "populate_existing": True},
+            ).scalar_one_or_none()
+
+        # 不支持 RETURNING 的数据库：以影响行数判定结果
+        result = db.execute(stmt, execution_options={"synchronize_session": False})
+        if result.rowcount != 1:
+            return None
+        return db.execute(
+            select(InvitationCode)
+            .where(InvitationCode.code == code)
+            .execution_options(populate_existing=True)
+        ).scalar_one()
+
+    @staticmethod
+    def get_by_codes(db: Session, project_id: str, codes: list[str]) -> list[InvitationCode]:
+        """
+        根据激活码字符串批量获取项目下的激活码（单条 IN 查询）
+
+        Args:
+            db: 数据库会话
+            project_id: 项目ID
+            codes: 激活码字符串列表
+
+        Returns:
+            list[InvitationCode]: 存在的激活码列表（顺序不保证）
+        """
+        if not codes:
+            return []
+        stmt = select(InvitationCode).where(
+            InvitationCode.project_id == project_id,
+            InvitationCode.code.in_(codes),
+        )
+        return list(db.execute(stmt).scalars().all())
+
+    @staticmethod
+    def redeem_batch(
+        db: Session,
+        code_ids: list[str],
+        verified_by: Optional[str],
+        now: datetime,
+    ) -> set[str]:
+        """
+        以单条条件 UPDATE 批量核销激活码
+
+        条件与 redeem 一致，调用方需保证 code_ids 所属项目启用且未过期。
+
+        Args:
+            db: 数据库会话
+            code_ids: 激活码ID列表
+            verified_by: 核销用户
+            now: 核销时间（UTC）
+
+        Returns:
+            set[str]: 实际核销成功的激活码ID集合
+        """
+        if not code_ids:
+            return set()
+        conditions = and_(
+            InvitationCode.id.in_(code_ids),
+            InvitationCode.status.is_(False),
+            InvitationCode.is_disabled.is_(False),
+            or_(InvitationCode.expires_at.is_(None), InvitationCode.expires_at > now),
+        )
+        stmt = (
+            update(InvitationCode)
+            .where(conditions)
+            .values(status=True, verified_at=now, verified_by=verified_by, is_expired=False)
+            .execution_options(synchronize_session=False)
+        )
+
+        if db.get_bind().dialect.update_returning:
+            return set(db.execute(stmt.returning(InvitationCode.id)).scalars().all())
+
+        # 不支持 RETURNING 的数据库：以本次写入的核销时间识别命中的行
+        db.execute(stmt)
+        redeemed = select(InvitationCode.id).where(
+            InvitationCode.id.in_(code_ids),
+            InvitationCode.verified_at == now,
+        )
+        return set(db.execute(redeemed).scalars().all())
+
     @staticmethod
     def get_list(
         db: Session,
@@ -78,10 +343,17 @@ class CodeRepository:
         is_disabled: Optional[bool] = None,
         is_expired: Optional[bool] = None,
         search: Optional[str] = None,
-    ) -> tuple[list[InvitationCode], int]:
+        after: Optional[tuple[datetime, str]] = None,
+        with_total: bool = True,
+        limit: Optional[int] = None,
+    ) -> tuple[list[InvitationCode], Optional[int]]:
         """
         获取激活码列表
 
+        按 (created_at, id) 倒序，与 idx_code_project_created 索引一致。
+        传入 after 时使用键集分页（WHERE (created_at, id) < after），忽略 page，
+        深页查询不再扫描并丢弃前面的行。is_expired 的筛选与返回值均为实际过期状态。
+
         Args:
             db: 数据库会话
             project_id: 项目ID
@@ -91,51 +363,106 @@ class CodeRepository:
             is_disabled: 是否禁用筛选（True=已禁用, False=未禁用）
             is_expired: 是否过期筛选（True=已过期, False=未过期）
             search: 搜索关键词（激活码）
+            after: 上一页最后一行的 (created_at, id)
+            with_total: 是否统计总数（为 False 时不执行 COUNT，总数返回 None）
+            limit: 读取行数（默认 page_size，调用方可多取一行判断是否有下一页）
 
         Returns:
-            tuple[list[InvitationCode], int]: (激活码列表, 总数)
+            tuple[list[InvitationCode], Optional[int]]: (激活码列表, 总数)
         """
-        query = db.query(InvitationCode).filter(InvitationCode.project_id == project_id)
+        conditions = CodeRepository._list_conditions(db, project_id, status, is_disabled, is_expired, search)
+
+        # 总数
+        total = db.query(InvitationCode).filter(*conditions).count() if with_total else None
+
+        # 分页（is_expired 为实际过期状态，只读）
+        query = (
+            db.query(InvitationCode, CodeRepository.effective_is_expired())
+            .filter(*conditions)
+            .order_by(InvitationCode.created_at.desc(), InvitationCode.id.desc())
+        )
+        if after is not None:
+            query = query.filter(tuple_(InvitationCode.created_at, InvitationCode.id) < tuple_(*after))
+        else:
+            query = query.offset((page - 1) * page_size)
+        codes = CodeRepository._with_effective_expiry(query.limit(limit or page_size).all())
+
+        return codes, total
+
+    @staticmethod
+    def _list_conditions(
+        db: Session,
+        project_id: str,
+        status: Optional[bool] = None,
+        is_disabled: Optional[bool] = None,
+        is_expired: Optional[bool] = None,
+        search: Optional[str] = None,
+        project_expires_at: Optional[ColumnElement] = None,
+    ) -> list:
+        """构建激活码列表筛选条件（列表与导出共用，is_expired 按实际过期状态筛选）"""
+        # 项目与搜索筛选（搜索走子串搜索索引）
+        conditions = project_search_conditions(db.get_bind().dialect.name, project_id, search)
 
         # 状态筛选
         if status is not None:
-            query = query.filter(InvitationCode.status == status)
+            conditions.append(InvitationCode.status == status)
 
         # 禁用状态筛选
         if is_disabled is not None:
-            query = query.filter(InvitationCode.is_disabled == is_disabled)
+            conditions.append(InvitationCode.is_disabled == is_disabled)
 
         # 过期状态筛选
         if is_expired is not None:
-            query = query.filter(InvitationCode.is_expired == is_expired)
-
-        # 搜索筛选
-        if search:
-            query = query.filter(InvitationCode.code.contains(search))
-
-        # 总数
-        total = query.count()
+            conditions.append(CodeRepository.effective_is_expired(project_expires_at) == is_expired)
 
-        # 分页
-        offset = (page - 1) * page_size
-        codes = query.order_by(InvitationCode.created_at.desc()).offset(offset).limit(page_size).all()
-
-        return codes, total
+        return conditions
 
     @staticmethod
-    def get_existing_codes(db: Session, project_id: str) -> set[str]:
+    def iter_export_rows(
+        db: Session,
+        project_id: str,
+        project_expires_at: Optional[datetime],
+        status: Optional[bool] = None,
+        is_disabled: Optional[bool] = None,
+        is_expired: Optional[bool] = None,
+        search: Optional[str] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Row]:
         """
-        获取项目下已存在的激活码集合
+        流式读取导出用的激活码行（按批次从游标读取，内存占用与总行数无关）
+
+        PostgreSQL 使用服务端游标；is_expired 按激活码/项目过期时间在 SQL 中计算。
 
         Args:
             db: 数据库会话
             project_id: 项目ID
+            project_expires_at: 项目过期时间（激活码未设置过期时间时使用）
+            status / is_disabled / is_expired / search: 与 get_list 相同的筛选条件
+            batch_size: 每批读取的行数
 
-        Returns:
-            set[str]: 已存在的激活码集合
+        Yields:
+            Row: id, code, status, is_disabled, is_expired, expires_at, verified_at, verified_by, created_at
         """
-        codes = db.query(InvitationCode.code).filter(InvitationCode.project_id == project_id).all()
-        return {code[0] for code in codes}
+        project_deadline = literal(project_expires_at, type_=InvitationCode.expires_at.type)
+        stmt = (
+            select(
+                InvitationCode.id,
+                InvitationCode.code,
+                InvitationCode.status,
+                InvitationCode.is_disabled,
+                CodeRepository.effective_is_expired(project_deadline).label("is_expired"),
+                InvitationCode.expires_at,
+                InvitationCode.verified_at,
+                InvitationCode.verified_by,
+                InvitationCode.created_at,
+            )
+            .where(*CodeRepository._list_conditions(
+                db, project_id, status, is_disabled, is_expired, search, project_deadline
+            ))
+            .order_by(InvitationCode.created_at.desc(), InvitationCode.id.desc())
+            .execution_options(yield_per=batch_size)
+        )
+        yield from db.execute(stmt)
 
     @staticmethod
     def update(db: Session, code: InvitationCode) -> InvitationCode:
@@ -177,6 +504,115 @@ class CodeRepository:
         count = db.query(InvitationCode).filter(InvitationCode.id.in_(code_ids)).delete(synchronize_session=False)
         return count
 
+    @staticmethod
+    def update_in_chunks(
+        db: Session,
+        condition: ColumnElement[bool],
+        values: dict[str, Any],
+        batch_size: int,
+        throttle_seconds: float = 0.0,
+    ) -> tuple[int, int]:
+        """
+        按主键顺序分块更新满足条件的激活码，每块提交一次
+
+        每块先按 id 游标取出下一批命中的 id，再以同一条件 UPDATE（期间被并发修改的行不会被误更新）。
+
+        Args:
+            db: 数据库会话
+            condition: 筛选条件
+            values: 更新的字段
+            batch_size: 每块的行数
+            throttle_seconds: 每块提交后的休眠时间
+
+        Returns:
+            tuple[int, int]: (更新行数, 分块数)
+        """
+        updated = 0
+        chunks = 0
+        last_id = ""
+        while True:
+            ids = db.execute(
+                select(InvitationCode.id)
+                .where(condition, InvitationCode.id > last_id)
+                .order_by(InvitationCode.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            result = db.execute(
+                update(InvitationCode)
+                .where(InvitationCode.id.in_(ids), condition)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            updated += result.rowcount
+            chunks += 1
+            last_id = ids[-1]
+            if len(ids) < batch_size:
+                break
+            if throttle_seconds > 0:
+                time.sleep(throttle_seconds)
+        return updated, chunks
+
+    @staticmethod
+    def inherited_expiry_changes(
+        project_id: str,
+        project_expires_at: Optional[datetime],
+        now: datetime,
+    ) -> tuple[ColumnElement[bool], dict[str, Any]]:
+        """
+        跟随项目过期时间（自身 expires_at 为空）的激活码中，过期状态需要改变的行
+
+        项目已过期时标记未使用、未禁用的激活码为已过期（状态互斥）；否则取消过期标记。
+
+        Returns:
+            tuple: (筛选条件, 更新的字段)
+        """
+        inherited = and_(InvitationCode.project_id == project_id, InvitationCode.expires_at.is_(None))
+        if project_expires_at is not None and now > project_expires_at:
+            condition = and_(
+                inherited,
+                InvitationCode.is_expired == False,
+                InvitationCode.status == False,
+                InvitationCode.is_disabled == False,
+            )
+            return condition, {"is_expired": True}
+        return and_(inherited, InvitationCode.is_expired == True), {"is_expired": False}
+
+    @staticmethod
+    def recompute_inherited_expiry(
+        db: Session,
+        project_id: str,
+        project_expires_at: Optional[datetime],
+        limit: int,
+    ) -> Optional[int]:
+        """
+        以一条 UPDATE 重新计算跟随项目过期时间的激活码（不提交）
+
+        Args:
+            db: 数据库会话
+            project_id: 项目ID
+            project_expires_at: 项目的新过期时间
+            limit: 单条 UPDATE 最多更新的行数
+
+        Returns:
+            Optional[int]: 更新的行数；需要更新的行数超过 limit 时不更新并返回 None
+        """
+        condition, values = CodeRepository.inherited_expiry_changes(project_id, project_expires_at, datetime.utcnow())
+        affected = db.execute(
+            select(func.count()).select_from(
+                select(InvitationCode.id).where(condition).limit(limit + 1).subquery()
+            )
+        ).scalar()
+        if affected > limit:
+            return None
+        if affected == 0:
+            return 0
+        return db.execute(
+            update(InvitationCode).where(condition).values(**values).execution_options(synchronize_session=False)
+        ).rowcount
+
     @staticmethod
     def batch_disable_unused(
         db: Session,
@@ -199,16 +635,13 @@ class CodeRepository:
             int: 禁用的数量
         """
         query = db.query(InvitationCode).filter(
-            InvitationCode.project_id == project_id,
+            # 项目与搜索筛选（搜索走子串搜索索引）
+            *project_search_conditions(db.get_bind().dialect.name, project_id, search),
             InvitationCode.status == False,  # 仅未使用的激活码
             InvitationCode.is_disabled == False,  # 仅未禁用的激活码
             InvitationCode.is_expired == False,  # 仅未过期的激活码（根据设计文档 code_status_logic.md 第 6.1 节）
         )
 
-        # 应用搜索筛选条件
-        if search:
-            query = query.filter(InvitationCode.code.contains(search))
-
         # 批量更新
         count = query.update({"is_disabled": True}, synchronize_session=False)
         return count
@@ -229,11 +662,9 @@ class CodeRepository:
         - 可选：按 code 模糊搜索
         """
         query = db.query(InvitationCode).filter(
-            InvitationCode.project_id == project_id,
+            *project_search_conditions(db.get_bind().dialect.name, project_id, search),
             InvitationCode.status == False,
             InvitationCode.is_disabled == False,
             InvitationCode.is_expired == False,
         )
-        if search:
-            query = query.filter(InvitationCode.code.contains(search))
         return query.count()
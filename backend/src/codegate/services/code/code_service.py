@@ -15,18 +15,54 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
-from typing import Optional
+import csv
+import io
+import json
+import zlib
+from typing import Any, BinaryIO, Iterator, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
 from ...models.invitation_code import InvitationCode
 from ...schemas.invitation_code import CodeGenerateRequest, CodeUpdateRequest
 from ...core.exceptions import ProjectNotFoundError, CodeNotFoundError
-from ...core.constants import MAX_BATCH_GENERATE_COUNT
+from ...core.constants import (
+    ALLOWED_EXPORT_FORMATS,
+    ALLOWED_IMPORT_FORMATS,
+    CODE_INSERT_CHUNK_SIZE,
+    EXPORT_BATCH_SIZE,
+    MAX_BATCH_GENERATE_COUNT,
+    MAX_BATCH_IMPORT_COUNT,
+)
 from ...utils.code_generator import generate_codes
-from ...schemas.utils import timestamp_to_datetime
+from ...utils.cursor import decode_cursor, encode_cursor
+from ...utils.uuid_utils import generate_uuid
+from ...schemas.utils import datetime_to_timestamp, timestamp_to_datetime
 from ..project.project_repository import ProjectRepository
+from .code_import import ImportRowError, iter_import_records, parse_import_record
 from .code_repository import CodeRepository
+from .expiry_engine import expiry_engine
+
+
+# 导出字段（CSV 表头 / NDJSON 键），时间字段为 UTC 秒级时间戳
+EXPORT_FIELDS = [
+    "id",
+    "code",
+    "status",
+    "is_disabled",
+    "is_expired",
+    "expires_at",
+    "verified_at",
+    "verified_by",
+    "created_at",
+]
+_EXPORT_TIMESTAMP_FIELDS = {"expires_at", "verified_at", "created_at"}
+
+
+def _import_rejection(row: int, code: Optional[str], error_code: str, message: str) -> dict[str, Any]:
+    """构造导入拒绝项"""
+    return {"row": row, "code": code, "error_code": error_code, "message": message}
 
 
 class CodeService:
@@ -62,18 +98,6 @@ class CodeService:
         if request.count > MAX_BATCH_GENERATE_COUNT:
             raise ValueError(f"生成数量不能超过 {MAX_BATCH_GENERATE_COUNT}")
 
-        # 获取已存在的激活码
-        existing_codes = CodeRepository.get_existing_codes(db, project_id)
-
-        # 生成新的激活码
-        new_codes = generate_codes(
-            count=request.count,
-            length=request.length,
-            prefix=request.prefix,
-            suffix=request.suffix,
-            existing_codes=existing_codes,
-        )
-
         # 转换过期时间
         expires_at_datetime = None
         if request.expires_at is not None:
@@ -87,29 +111,165 @@ class CodeService:
         elif project.expires_at is not None:
             initial_is_expired = now > project.expires_at
 
-        # 创建激活码对象
-        invitation_codes = [
-            InvitationCode(
-                project_id=project_id,
-                code=code,
-                status=False,
-                is_disabled=False,
-                is_expired=initial_is_expired,
-                expires_at=expires_at_datetime,
+        # 分块生成并插入：与已有激活码（任意项目）冲突的行由数据库跳过，只为被跳过的部分重新生成，
+        # 不需要预先加载项目下的全部激活码
+        created_rows: list[dict] = []
+        generated: set[str] = set()
+        stalled_rounds = 0
+        while len(created_rows) < request.count:
+            candidates = generate_codes(
+                count=min(CODE_INSERT_CHUNK_SIZE, request.count - len(created_rows)),
+                length=request.length,
+                prefix=request.prefix,
+                suffix=request.suffix,
+                existing_codes=generated,
             )
-            for code in new_codes
-        ]
+            generated.update(candidates)
+
+            rows = [
+                {
+                    "id": generate_uuid(),
+                    "project_id": project_id,
+                    "code": code,
+                    "status": False,
+                    "is_disabled": False,
+                    "is_expired": initial_is_expired,
+                    "expires_at": expires_at_datetime,
+                    "created_at": now,
+                }
+                for code in candidates
+            ]
+            inserted = CodeRepository.insert_ignore_conflicts(db, rows)
+            created_rows.extend(row for row in rows if row["code"] in inserted)
+
+            stalled_rounds = 0 if inserted else stalled_rounds + 1
+            if stalled_rounds >= 10:
+                db.rollback()
+                raise ValueError("无法生成足够数量的唯一激活码，请调整长度、前缀或后缀后重试")
 
-        created = CodeRepository.create_batch(db, invitation_codes)
         db.commit()
-        for code in created:
-            db.refresh(code)
+        expiry_engine.schedule(expires_at_datetime)
+
+        # ID 与时间戳均已在写入前确定，直接由行数据构造返回对象，无需回查；
+        # project 以已加载值设置，不触发反向关系 Project.invitation_codes 的加载
+        created: list[InvitationCode] = []
+        for row in created_rows:
+            code = InvitationCode(**row, verified_at=None, verified_by=None)
+            set_committed_value(code, "project", project)
+            created.append(code)
         return created
 
+    @staticmethod
+    def import_codes(
+        db: Session,
+        project_id: str,
+        stream: BinaryIO,
+        import_format: str,
+        chunk_size: int = CODE_INSERT_CHUNK_SIZE,
+    ) -> dict[str, Any]:
+        """
+        从 CSV / JSON 文件批量导入激活码
+
+        边解析边按块写入（INSERT ... ON CONFLICT DO NOTHING），文件不会整体读入内存；
+        无效行、文件内重复行及数据库中已存在的激活码被拒绝并记入报告，不影响其余行。
+        全部行处理完成后一次提交；文件格式错误或行数超限时整体回滚。
+
+        Args:
+            db: 数据库会话
+            project_id: 项目ID
+            stream: 二进制文件对象
+            import_format: 文件格式（csv / json）
+            chunk_size: 每个 INSERT 分块的行数
+
+        Returns:
+            dict: total, imported_count, rejected_count,
+                rejections（每项含 row, code, error_code, message，按行号排序）
+
+        Raises:
+            ProjectNotFoundError: 项目不存在
+            ValueError: 不支持的格式、文件格式错误或行数超过限制
+        """
+        if import_format not in ALLOWED_IMPORT_FORMATS:
+            raise ValueError(f"不支持的导入格式: {import_format}")
+        project = ProjectRepository.get_by_id(db, project_id)
+        if not project:
+            raise ProjectNotFoundError(project_id)
+
+        now = datetime.utcnow()
+        total = 0
+        imported = 0
+        rejections: list[dict[str, Any]] = []
+        seen: set[str] = set()
+        deadlines: set[datetime] = set()
+        pending: list[tuple[int, dict[str, Any]]] = []
+
+        def flush() -> None:
+            nonlocal imported
+            inserted = CodeRepository.insert_ignore_conflicts(db, [row for _, row in pending])
+            imported += len(inserted)
+            for row_number, row in pending:
+                if row["code"] not in inserted:
+                    rejections.append(_import_rejection(row_number, row["code"], "CODE_EXISTS", "激活码已存在"))
+            pending.clear()
+
+        try:
+            for row_number, record in iter_import_records(stream, import_format):
+                total += 1
+                if total > MAX_BATCH_IMPORT_COUNT:
+                    raise ValueError(f"导入数量不能超过 {MAX_BATCH_IMPORT_COUNT}")
+                try:
+                    parsed = parse_import_record(record)
+                except ImportRowError as e:
+                    raw_code = record.get("code") if isinstance(record, dict) else None
+                    rejections.append(_import_rejection(
+                        row_number, raw_code if isinstance(raw_code, str) else None, e.error_code, e.message
+                    ))
+                    continue
+
+                code = parsed["code"]
+                if code in seen:
+                    rejections.append(_import_rejection(row_number, code, "DUPLICATE_IN_FILE", "文件内激活码重复"))
+                    continue
+                seen.add(code)
+
+                # 已核销的激活码不再标记过期（状态互斥约束）
+                expires_at = parsed["expires_at"] or project.expires_at
+                if parsed["expires_at"] is not None and not parsed["status"]:
+                    deadlines.add(parsed["expires_at"])
+                pending.append((row_number, {
+                    "id": generate_uuid(),
+                    "project_id": project_id,
+                    "code": code,
+                    "status": parsed["status"],
+                    "is_disabled": False,
+                    "is_expired": not parsed["status"] and expires_at is not None and now > expires_at,
+                    "expires_at": parsed["expires_at"],
+                    "verified_at": parsed["verified_at"],
+                    "verified_by": parsed["verified_by"],
+                    "created_at": now,
+                }))
+                if len(pending) >= chunk_size:
+                    flush()
+            flush()
+        except Exception:
+            db.rollback()
+            raise
+
+        db.commit()
+        for deadline in deadlines:
+            expiry_engine.schedule(deadline)
+        rejections.sort(key=lambda item: item["row"])
+        return {
+            "total": total,
+            "imported_count": imported,
+            "rejected_count": len(rejections),
+            "rejections": rejections,
+        }
+
     @staticmethod
     def get_by_id(db: Session, code_id: str) -> Optional[InvitationCode]:
         """
-        根据ID获取激活码
+        根据ID获取激活码（只读：is_expired 为 SQL 计算的实际过期状态，不写回）
 
         Args:
             db: 数据库会话
@@ -118,18 +278,12 @@ class CodeService:
         Returns:
             Optional[InvitationCode]: 激活码对象，不存在返回 None
         """
-        code = CodeRepository.get_by_id(db, code_id)
-        if code:
-            changed = CodeService.refresh_expired_state(code)
-            if changed:
-                db.commit()
-                db.refresh(code)
-        return code
+        return CodeRepository.find_for_read(db, InvitationCode.id == code_id)
 
     @staticmethod
     def get_by_code(db: Session, code: str) -> Optional[InvitationCode]:
         """
-        根据激活码字符串获取激活码
+        根据激活码字符串获取激活码（只读：is_expired 为 SQL 计算的实际过期状态，不写回）
 
         Args:
             db: 数据库会话
@@ -138,13 +292,7 @@ class CodeService:
         Returns:
             Optional[InvitationCode]: 激活码对象，不存在返回 None
         """
-        code_obj = CodeRepository.get_by_code(db, code)
-        if code_obj:
-            changed = CodeService.refresh_expired_state(code_obj)
-            if changed:
-                db.commit()
-                db.refresh(code_obj)
-        return code_obj
+        return CodeRepository.find_for_read(db, InvitationCode.code == code)
 
     @staticmethod
     def get_list(
@@ -156,35 +304,126 @@ class CodeService:
         is_disabled: Optional[bool] = None,
         is_expired: Optional[bool] = None,
         search: Optional[str] = None,
-    ) -> tuple[list[InvitationCode], int]:
+        cursor: Optional[str] = None,
+        with_total: bool = True,
+    ) -> tuple[list[InvitationCode], Optional[int], Optional[str]]:
         """
         获取激活码列表
 
         Args:
             db: 数据库会话
             project_id: 项目ID
-            page: 页码
+            page: 页码（传入 cursor 时忽略）
             page_size: 每页数量
             status: 状态筛选（True=已核销, False=未核销）
             is_disabled: 是否禁用筛选（True=已禁用, False=未禁用）
             is_expired: 是否过期筛选（True=已过期, False=未过期）
             search: 搜索关键词（激活码）
+            cursor: 上一页返回的 next_cursor，传入时按游标取下一页
+            with_total: 是否统计总数
 
         Returns:
-            tuple[list[InvitationCode], int]: (激活码列表, 总数)
+            tuple[list[InvitationCode], Optional[int], Optional[str]]:
+                (激活码列表, 总数（with_total=False 时为 None）, 下一页游标（没有更多数据时为 None）)
+
+        Raises:
+            ValueError: 游标无效
         """
+        after = decode_cursor(cursor) if cursor else None
+        # 多取一行判断是否还有下一页，无需依赖总数
         codes, total = CodeRepository.get_list(
-            db, project_id, page, page_size, status, is_disabled, is_expired, search
+            db, project_id, page, page_size, status, is_disabled, is_expired, search,
+            after=after, with_total=with_total, limit=page_size + 1,
+        )
+        next_cursor = None
+        if len(codes) > page_size:
+            codes = codes[:page_size]
+            next_cursor = encode_cursor(codes[-1].created_at, codes[-1].id)
+        return codes, total, next_cursor
+
+    @staticmethod
+    def iter_export(
+        db: Session,
+        project_id: str,
+        export_format: str = "csv",
+        compress: bool = False,
+        status: Optional[bool] = None,
+        is_disabled: Optional[bool] = None,
+        is_expired: Optional[bool] = None,
+        search: Optional[str] = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> Iterator[bytes]:
+        """
+        流式导出激活码（CSV / NDJSON，可选 gzip）
+
+        按批次从数据库游标读取并编码，每批产出一段字节，内存占用与导出总量无关。
+        会话需在迭代期间保持打开。
+
+        Args:
+            db: 数据库会话
+            project_id: 项目ID
+            export_format: 导出格式（csv / ndjson）
+            compress: 是否 gzip 压缩
+            status / is_disabled / is_expired / search: 与 get_list 相同的筛选条件
+            batch_size: 每批读取的行数
+
+        Yields:
+            bytes: 导出内容片段
+
+        Raises:
+            ProjectNotFoundError: 项目不存在
+            ValueError: 不支持的导出格式
+        """
+        if export_format not in ALLOWED_EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {export_format}")
+        project = ProjectRepository.get_by_id(db, project_id)
+        if not project:
+            raise ProjectNotFoundError(project_id)
+
+        rows = CodeRepository.iter_export_rows(
+            db, project_id, project.expires_at, status, is_disabled, is_expired, search, batch_size
         )
-        changed = False
-        for code in codes:
-            if CodeService.refresh_expired_state(code):
-                changed = True
-        if changed:
-            db.commit()
-            for code in codes:
-                db.refresh(code)
-        return codes, total
+        return CodeService._encode_export(rows, export_format, compress, batch_size)
+
+    @staticmethod
+    def _encode_export(rows, export_format: str, compress: bool, batch_size: int) -> Iterator[bytes]:
+        """将导出行编码为 CSV / NDJSON 字节片段"""
+        compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31：gzip 格式
+        buffer = io.StringIO()
+        writer = None
+        if export_format == "csv":
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_FIELDS)
+
+        def drain() -> bytes:
+            data = buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            return compressor.compress(data) if compressor else data
+
+        pending = 0
+        for row in rows:
+            values = [
+                datetime_to_timestamp(value) if field in _EXPORT_TIMESTAMP_FIELDS and value else value
+                for field, value in zip(EXPORT_FIELDS, row)
+            ]
+            if writer is not None:
+                writer.writerow(["" if v is None else str(v).lower() if isinstance(v, bool) else v for v in values])
+            else:
+                buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, values)), ensure_ascii=False))
+                buffer.write("\n")
+            pending += 1
+            if pending >= batch_size:
+                chunk = drain()
+                pending = 0
+                if chunk:
+                    yield chunk
+
+        chunk = drain()
+        if compressor:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
 
     @staticmethod
     def delete(db: Session, code_id: str) -> bool:
@@ -281,6 +520,8 @@ class CodeService:
                 pass
 
             code.is_disabled = update_data.is_disabled
+            # 启用已过期的激活码后变为已过期（状态互斥）
+            CodeService.refresh_expired_state(code)
 
         # 更新过期时间
         if update_data.expires_at is not None:
@@ -299,6 +540,7 @@ class CodeService:
         updated = CodeRepository.update(db, code)
         db.commit()
         db.refresh(updated)
+        expiry_engine.schedule(updated.expires_at)
         return updated
 
     @staticmethod
@@ -340,18 +582,20 @@ class CodeService:
         db.commit()
         return disabled
 
-    # 内部工具：基于 expires_at / project.expires_at 计算并刷新 is_expired
+    # 内部工具：基于 expires_at / project.expires_at 计算并刷新 is_expired（仅写路径使用）
     @staticmethod
     def refresh_expired_state(code: InvitationCode) -> bool:
         """
         依据激活码自身/项目的过期时间，刷新 is_expired 字段。
 
+        已使用/已禁用的激活码不标记过期（状态互斥，见 code_status_logic.md）。
+
         Returns:
             bool: 是否发生状态变更
         """
         now = datetime.utcnow()
         expires_at = code.expires_at or (code.project.expires_at if code.project else None)
-        should_expire = bool(expires_at and now > expires_at)
+        should_expire = bool(not code.status and not code.is_disabled and expires_at and now > expires_at)
         if code.is_expired != should_expire:
             code.is_expired = should_expire
             return True
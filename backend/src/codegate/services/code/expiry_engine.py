@@ -0,0 +1,199 @@
+"""
+激活码过期引擎
+
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import asyncio
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, ContextManager, Optional
+
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+
+from ...config import settings
+from ...core.constants import DEFAULT_EXPIRY_BATCH_SIZE
+from ...database import get_db_context
+from ...models.invitation_code import InvitationCode
+from ...models.project import Project
+from .code_repository import CodeRepository
+
+logger = logging.getLogger(__name__)
+
+# 到期处理时向前多覆盖的时间：截止时间前后仍在提交中的写入不会被漏掉
+_COMMIT_GRACE = timedelta(seconds=5)
+
+# 可被标记为过期的激活码：未使用、未禁用、未过期（状态互斥）
+_PENDING = and_(
+    InvitationCode.is_expired == False,
+    InvitationCode.status == False,
+    InvitationCode.is_disabled == False,
+)
+
+
+class ExpiryEngine:
+    """
+    按截止时间触发的激活码过期引擎
+
+    用最小堆保存未来 horizon 秒内的过期截止时间（激活码与项目的 expires_at 去重），
+    由 idx_code_expires_at / idx_project_expires_at 按时间窗口惰性加载；每到一个截止时间，
+    只更新截止时间落在 [上次处理时间, 现在] 内的激活码（分块 UPDATE），不扫描全表。
+
+    本进程写入的新截止时间通过 schedule() 立即入堆；其他 worker 写入的截止时间在下一次
+    加载窗口时发现。多个 worker 同时处理同一截止时间是安全的（条件 UPDATE 幂等）。
+    定时任务 update_expired_status 仍作为兜底（进程停止期间到期的激活码等）。
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], ContextManager[Session]] = get_db_context,
+        horizon_seconds: float = 300,
+        max_deadlines: int = 1000,
+        batch_size: int = DEFAULT_EXPIRY_BATCH_SIZE,
+    ):
+        self._session_factory = session_factory
+        self._horizon = timedelta(seconds=horizon_seconds)
+        self._max_deadlines = max_deadlines
+        self._batch_size = batch_size
+        self._heap: list[datetime] = []
+        self._scheduled: set[datetime] = set()
+        # 截止时间早于 _watermark 的激活码均已处理；堆中包含 [_watermark, _loaded_until) 内的全部截止时间
+        self._watermark: Optional[datetime] = None
+        self._loaded_until: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def schedule(self, deadline: Optional[datetime]) -> None:
+        """
+        登记新的截止时间（写入激活码/项目的过期时间并提交后调用，线程安全）
+
+        窗口外的截止时间忽略，由之后的窗口加载发现。
+        """
+        if deadline is None:
+            return
+        with self._lock:
+            if self._loaded_until is None or deadline >= self._loaded_until:
+                return
+            if self._watermark is not None and deadline < self._watermark:
+                return
+            self._push(deadline)
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _push(self, deadline: datetime) -> None:
+        if deadline not in self._scheduled:
+            self._scheduled.add(deadline)
+            heapq.heappush(self._heap, deadline)
+
+    def _load(self, db: Session, now: datetime) -> None:
+        """加载窗口内的截止时间（达到 max_deadlines 时窗口截止到最后一个截止时间）"""
+        start = self._watermark or now
+        end = now + self._horizon
+        deadlines = set(db.execute(
+            select(InvitationCode.expires_at)
+            .where(InvitationCode.expires_at >= start, InvitationCode.expires_at < end, _PENDING)
+            .distinct()
+            .order_by(InvitationCode.expires_at)
+            .limit(self._max_deadlines)
+        ).scalars())
+        if len(deadlines) >= self._max_deadlines:
+            end = max(deadlines)
+        deadlines.update(db.execute(
+            select(Project.expires_at)
+            .where(Project.expires_at >= start, Project.expires_at < end)
+            .order_by(Project.expires_at)
+            .limit(self._max_deadlines)
+        ).scalars())
+        with self._lock:
+            for deadline in deadlines:
+                if deadline < end:
+                    self._push(deadline)
+            self._loaded_until = end
+
+    def _expire_due(self, db: Session, now: datetime) -> dict[str, int]:
+        """标记截止时间落在 [上次处理时间 - 宽限, now] 内的激活码为已过期"""
+        code_due = InvitationCode.expires_at <= now
+        project_due = Project.expires_at <= now
+        if self._watermark is not None:
+            code_due = and_(InvitationCode.expires_at >= self._watermark - _COMMIT_GRACE, code_due)
+            project_due = and_(Project.expires_at >= self._watermark - _COMMIT_GRACE, project_due)
+        stats = {"expired_updated": 0, "chunks": 0}
+        for condition in (
+            and_(_PENDING, code_due),
+            # 没有自己的过期时间、跟随项目过期的激活码
+            and_(
+                _PENDING,
+                InvitationCode.expires_at.is_(None),
+                InvitationCode.project_id.in_(select(Project.id).where(project_due)),
+            ),
+        ):
+            updated, chunks = CodeRepository.update_in_chunks(db, condition, {"is_expired": True}, self._batch_size)
+            stats["expired_updated"] += updated
+            stats["chunks"] += chunks
+        with self._lock:
+            self._watermark = now
+            while self._heap and self._heap[0] <= now:
+                self._scheduled.discard(heapq.heappop(self._heap))
+        return stats
+
+    def run_pending(self, now: Optional[datetime] = None) -> float:
+        """
+        处理已到期的截止时间并按需加载下一个窗口（同步，供后台任务与测试调用）
+
+        首次运行时处理所有已过截止时间的激活码（补齐进程启动前到期的部分）。
+
+        Returns:
+            float: 距下一个截止时间或窗口结束的秒数
+        """
+        now = now or datetime.utcnow()
+        with self._session_factory() as db:
+            if self._loaded_until is None or now >= self._loaded_until:
+                self._load(db, now)
+            with self._lock:
+                due = self._watermark is None or bool(self._heap and self._heap[0] <= now)
+            if due:
+                stats = self._expire_due(db, now)
+                if stats["expired_updated"]:
+                    logger.info("过期引擎：已标记 %d 个激活码过期", stats["expired_updated"])
+        with self._lock:
+            next_at = min(self._heap[0], self._loaded_until) if self._heap else self._loaded_until
+        return max((next_at - now).total_seconds(), 0.0)
+
+    async def run(self) -> None:
+        """后台任务：在截止时间到达时处理，新截止时间登记时提前唤醒"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                self._wakeup.clear()
+                try:
+                    timeout = await asyncio.to_thread(self.run_pending)
+                except Exception:
+                    logger.exception("过期引擎处理失败")
+                    timeout = self._horizon.total_seconds()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._loop = None
+            self._wakeup = None
+
+
+expiry_engine = ExpiryEngine(horizon_seconds=settings.EXPIRY_ENGINE_HORIZON_SECONDS)
@@ -0,0 +1,21 @@
+"""
+项目概览服务模块
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from .dashboard_service import DashboardService
+from .overview_cache import OverviewCache, overview_cache
+
+__all__ = ["DashboardService", "OverviewCache", "overview_cache"]
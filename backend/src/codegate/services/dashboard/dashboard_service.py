@@ -0,0 +1,100 @@
+"""
+项目概览服务层
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ...models.invitation_code import InvitationCode
+from ...models.project import Project
+from ...models.verification_log import VerificationLog
+from ...schemas.dashboard import DashboardOverviewResponse, RecentVerification
+from ..project.code_counter_repository import CodeCounterRepository
+from .overview_cache import overview_cache
+
+
+class DashboardService:
+    """项目概览服务"""
+
+    @staticmethod
+    def get_overview(db: Session) -> DashboardOverviewResponse:
+        """
+        获取项目概览（读取快照缓存，未命中时重新计算）
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            DashboardOverviewResponse: 项目概览
+        """
+        return overview_cache.get(lambda: DashboardService.compute_overview(db))
+
+    @staticmethod
+    def compute_overview(db: Session) -> DashboardOverviewResponse:
+        """
+        计算项目概览
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            DashboardOverviewResponse: 项目概览
+        """
+        # 统计项目总数
+        project_count_stmt = select(func.count(Project.id))
+        project_count = db.execute(project_count_stmt).scalar() or 0
+
+        # 统计激活码总数、已使用数量、未使用数量（读取项目计数器，不扫描激活码表）
+        code_stats = CodeCounterRepository.get_stats(db)
+
+        # 获取最近10条核销记录（idx_log_result_verified_at 倒序扫描）
+        recent_logs_stmt = (
+            select(
+                VerificationLog.code_id,
+                InvitationCode.code,
+                InvitationCode.project_id,
+                Project.name.label("project_name"),
+                VerificationLog.verified_at,
+                VerificationLog.verified_by,
+            )
+            .join(InvitationCode, VerificationLog.code_id == InvitationCode.id)
+            .join(Project, InvitationCode.project_id == Project.id)
+            .where(VerificationLog.result == "success")
+            .order_by(VerificationLog.verified_at.desc())
+            .limit(10)
+        )
+
+        recent_logs = db.execute(recent_logs_stmt).all()
+
+        recent_verifications = [
+            RecentVerification(
+                code_id=log.code_id,
+                code=log.code,
+                project_id=log.project_id,
+                project_name=log.project_name,
+                verified_at=log.verified_at,
+                verified_by=log.verified_by,
+            )
+            for log in recent_logs
+        ]
+
+        return DashboardOverviewResponse(
+            project_count=project_count,
+            code_count=code_stats["total"],
+            verified_count=code_stats["verified"],
+            unverified_count=code_stats["unverified"],
+            recent_verifications=recent_verifications,
+        )
@@ -0,0 +1,150 @@
+"""
+项目概览快照缓存
+
+- OverviewCache：缓存概览响应快照，TTL 到期或失效后由单个请求重新计算（single-flight），
+  并发未命中的请求等待同一次计算结果
+- 会话提交时若写入过项目、激活码或成功核销记录，失效本进程的快照；
+  多进程/多实例部署时其他进程最长在 TTL 后刷新
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import threading
+import time
+from itertools import chain
+from typing import Callable, Generic, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session, SessionTransaction
+
+from ...config import settings
+from ...models.invitation_code import InvitationCode
+from ...models.project import Project
+from ...models.verification_log import VerificationLog
+
+T = TypeVar("T")
+
+# 影响概览数据的表
+_OVERVIEW_TABLES = {Project.__tablename__, InvitationCode.__tablename__, VerificationLog.__tablename__}
+_DIRTY_KEY = "dashboard_overview_dirty"
+
+
+class OverviewCache(Generic[T]):
+    """单值快照缓存（线程安全，TTL + single-flight + 失效）"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._value: Optional[T] = None
+        self._expires_at = 0.0
+        # 每次失效递增，计算开始后发生失效的结果不写入缓存
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def _cached(self) -> Optional[T]:
+        if self._value is not None and time.monotonic() < self._expires_at:
+            return self._value
+        return None
+
+    def get(self, loader: Callable[[], T]) -> T:
+        """
+        读取快照，未命中时调用 loader 计算
+
+        同一时刻只有一个线程执行 loader，其余未命中的线程等待后直接使用其结果。
+
+        Args:
+            loader: 计算快照的函数
+
+        Returns:
+            T: 快照
+        """
+        if self.ttl_seconds <= 0:
+            return loader()
+
+        with self._lock:
+            value = self._cached()
+        if value is not None:
+            return value
+
+        with self._refresh_lock:
+            with self._lock:
+                value = self._cached()
+                generation = self._generation
+            if value is not None:
+                return value
+
+            value = loader()
+            with self._lock:
+                if generation == self._generation:
+                    self._value = value
+                    self._expires_at = time.monotonic() + self.ttl_seconds
+            return value
+
+    def invalidate(self) -> None:
+        """失效快照"""
+        with self._lock:
+            self._generation += 1
+            self._value = None
+
+
+def _affects_overview(obj) -> bool:
+    if isinstance(obj, VerificationLog):
+        # 失败的核销记录不出现在概览中
+        return obj.result == "success"
+    return isinstance(obj, (Project, InvitationCode))
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_dirty_on_flush(session: Session, flush_context) -> None:
+    """ORM 写入（新增/修改/删除对象）"""
+    if any(_affects_overview(obj) for obj in chain(session.new, session.dirty, session.deleted)):
+        mark_dirty(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_dirty_on_execute(orm_execute_state: ORMExecuteState) -> None:
+    """
+    通过会话执行的 INSERT / UPDATE / DELETE 语句（批量写入、条件核销等）
+
+    核销日志的 INSERT 来自日志批量写入器，其中多为失败记录，由写入器按批次内容调用 mark_dirty。
+    """
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table_name = getattr(getattr(orm_execute_state.statement, "table", None), "name", None)
+    if orm_execute_state.is_insert and table_name == VerificationLog.__tablename__:
+        return
+    if table_name in _OVERVIEW_TABLES:
+        mark_dirty(orm_execute_state.session)
+
+
+def mark_dirty(session: Session) -> None:
+    """标记会话中的写入影响概览，提交后失效快照"""
+    session.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop(_DIRTY_KEY, False):
+        overview_cache.invalidate()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _reset_on_end(session: Session, transaction: SessionTransaction) -> None:
+    # 提交时已在 after_commit 中取走；SAVEPOINT 回滚不丢弃外层事务中已标记的写入
+    if transaction.parent is None:
+        session.info.pop(_DIRTY_KEY, None)
+
+
+# 全局实例
+overview_cache: OverviewCache = OverviewCache(ttl_seconds=settings.DASHBOARD_CACHE_TTL_SECONDS)
@@ -17,5 +17,7 @@ limitations under the License.
 """
 from .project_service import ProjectService
 from .project_repository import ProjectRepository
+from .code_counter_repository import CodeCounterRepository
+from .project_purge_service import ProjectPurgeService
 
-__all__ = ["ProjectService", "ProjectRepository"]
+__all__ = ["ProjectService", "ProjectRepository", "CodeCounterRepository", "ProjectPurgeService"]
@@ -0,0 +1,110 @@
+"""
+项目激活码计数器数据访问层
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from typing import Optional
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from ...models.project_code_counter import COUNTER_FIELDS, ProjectCodeCounter, recount_select
+
+
+def _stats(unverified: int, verified: int, disabled: int, expired: int) -> dict[str, int]:
+    """由四个互斥分组构造统计字典（与 ProjectService.get_code_stats 的返回一致）"""
+    return {
+        "total": unverified + verified + disabled + expired,
+        "verified": verified,
+        "unverified": unverified,
+        "disabled": disabled,
+        "expired": expired,
+    }
+
+
+class CodeCounterRepository:
+    """项目激活码计数器数据访问层（计数由数据库触发器维护，这里只读取与对账）"""
+
+    @staticmethod
+    def get_stats(db: Session, project_id: Optional[str] = None) -> dict[str, int]:
+        """
+        读取激活码统计（对项目的计数槽位求和）
+
+        Args:
+            db: 数据库会话
+            project_id: 项目ID（为空时统计全部项目）
+
+        Returns:
+            dict: total, verified, unverified, disabled, expired
+        """
+        stmt = select(*(func.coalesce(func.sum(getattr(ProjectCodeCounter, field)), 0) for field in COUNTER_FIELDS))
+        if project_id is not None:
+            stmt = stmt.where(ProjectCodeCounter.project_id == project_id)
+        return _stats(*(int(value) for value in db.execute(stmt).one()))
+
+    @staticmethod
+    def get_all_stats(db: Session) -> dict[str, dict[str, int]]:
+        """
+        读取每个项目的计数（按项目汇总槽位）
+
+        Returns:
+            dict[str, dict]: project_id -> 统计字典
+        """
+        stmt = select(
+            ProjectCodeCounter.project_id,
+            *(func.sum(getattr(ProjectCodeCounter, field)) for field in COUNTER_FIELDS),
+        ).group_by(ProjectCodeCounter.project_id)
+        return {row[0]: _stats(*(int(value) for value in row[1:])) for row in db.execute(stmt)}
+
+    @staticmethod
+    def recount_all(db: Session) -> dict[str, dict[str, int]]:
+        """
+        按激活码表重新统计每个项目的数量（全表扫描）
+
+        Returns:
+            dict[str, dict]: project_id -> 统计字典
+        """
+        recount = recount_select(db.get_bind().dialect.name).subquery()
+        stmt = select(
+            recount.c.project_id,
+            *(func.sum(recount.c[field]) for field in COUNTER_FIELDS),
+        ).group_by(recount.c.project_id)
+        return {row[0]: _stats(*(int(value) for value in row[1:])) for row in db.execute(stmt)}
+
+    @staticmethod
+    def rebuild(db: Session, project_id: str) -> tuple[dict[str, int], dict[str, int]]:
+        """
+        按激活码表重建项目的计数（调用方负责提交或回滚）
+
+        先锁定项目已有的计数行，使并发写入在本事务提交后再叠加增量；
+        SQLite 上这一步同时取得写锁，随后的重新统计读到的是最新数据。
+
+        Args:
+            db: 数据库会话
+            project_id: 项目ID
+
+        Returns:
+            tuple[dict, dict]: (重建前的计数, 重建后的计数)
+        """
+        db.execute(
+            update(ProjectCodeCounter)
+            .where(ProjectCodeCounter.project_id == project_id)
+            .values(slot=ProjectCodeCounter.slot)
+        )
+        stored = CodeCounterRepository.get_stats(db, project_id)
+        rows = db.execute(recount_select(db.get_bind().dialect.name, project_id)).all()
+        db.execute(delete(ProjectCodeCounter).where(ProjectCodeCounter.project_id == project_id))
+        if rows:
+            db.execute(insert(ProjectCodeCounter), [row._asdict() for row in rows])
+        return stored, _stats(*(sum(getattr(row, field) for row in rows) for field in COUNTER_FIELDS))
@@ -0,0 +1,166 @@
+"""
+项目清除服务
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Optional
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from ...models.project import Project
+from ...models.invitation_code import InvitationCode
+from ...models.verification_log import VerificationLog
+from ...models.project_purge import ProjectPurge
+from ...core.constants import DEFAULT_PURGE_BATCH_SIZE
+from ...core.exceptions import ProjectNotFoundError
+from ..api_key.api_key_cache import api_key_cache
+
+logger = logging.getLogger(__name__)
+
+
+class ProjectPurgeService:
+    """
+    项目清除服务
+
+    删除大项目时不经过 ORM 级联（会把全部激活码和日志加载进会话），而是在数据库侧按块删除：
+    先删核销日志，再删激活码，最后删除项目；每块单独提交，块之间可休眠，不长时间持有写锁。
+    进度记录在 project_purges 中，中断后再次执行会从剩余数据继续。
+    """
+
+    @staticmethod
+    def request(db: Session, project_id: str, requested_by: Optional[str] = None) -> ProjectPurge:
+        """
+        登记项目清除任务并禁用项目（调用方负责提交）
+
+        项目禁用后不再接受核销；已登记的项目重复登记时返回原任务。
+
+        Args:
+            db: 数据库会话
+            project_id: 项目ID
+            requested_by: 登记人ID
+
+        Returns:
+            ProjectPurge: 清除任务
+
+        Raises:
+            ProjectNotFoundError: 项目不存在
+        """
+        if db.execute(
+            update(Project).where(Project.id == project_id).values(status=False)
+        ).rowcount == 0:
+            raise ProjectNotFoundError(project_id)
+
+        purge = db.get(ProjectPurge, project_id)
+        if purge is None:
+            purge = ProjectPurge(project_id=project_id, requested_by=requested_by)
+            db.add(purge)
+            db.flush()
+        api_key_cache.invalidate_project_on_commit(db, project_id)
+        return purge
+
+    @staticmethod
+    def list_pending(db: Session) -> list[str]:
+        """获取尚未完成的清除任务（按登记时间排序）"""
+        return list(db.execute(
+            select(ProjectPurge.project_id).order_by(ProjectPurge.requested_at)
+        ).scalars())
+
+    @staticmethod
+    def purge(
+        db: Session,
+        project_id: str,
+        batch_size: int = DEFAULT_PURGE_BATCH_SIZE,
+        throttle_seconds: float = 0.0,
+        on_progress: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        """
+        按块清除项目（每块提交一次，未登记的项目先登记）
+
+        Args:
+            db: 数据库会话
+            project_id: 项目ID
+            batch_size: 每块删除的行数
+            throttle_seconds: 每块提交后的休眠时间（降低对在线核销的影响）
+            on_progress: 每块提交后的回调，参数为当前进度
+
+        Returns:
+            dict: project_id, logs_deleted, codes_deleted（含此前中断前的进度）, chunks, elapsed_seconds
+
+        Raises:
+            ProjectNotFoundError: 项目不存在
+        """
+        began = time.perf_counter()
+        purge = ProjectPurgeService.request(db, project_id)
+        db.commit()
+        progress = {
+            "project_id": project_id,
+            "logs_deleted": purge.logs_deleted,
+            "codes_deleted": purge.codes_deleted,
+            "chunks": 0,
+            "elapsed_seconds": 0.0,
+        }
+
+        project_codes = select(InvitationCode.id).where(InvitationCode.project_id == project_id)
+        phases = [
+            (
+                "logs_deleted",
+                VerificationLog,
+                select(VerificationLog.id).where(VerificationLog.code_id.in_(project_codes)),
+            ),
+            ("codes_deleted", InvitationCode, project_codes),
+        ]
+        for key, model, ids in phases:
+            while True:
+                deleted = db.execute(
+                    delete(model)
+                    .where(model.id.in_(ids.limit(batch_size).scalar_subquery()))
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if deleted == 0:
+                    db.rollback()
+                    break
+                progress[key] += deleted
+                progress["chunks"] += 1
+                db.execute(
+                    update(ProjectPurge)
+                    .where(ProjectPurge.project_id == project_id)
+                    .values(
+                        logs_deleted=progress["logs_deleted"],
+                        codes_deleted=progress["codes_deleted"],
+                        updated_at=datetime.utcnow(),
+                    )
+                )
+                db.commit()
+                logger.info(
+                    "清除项目 %s：已删除核销日志 %d，激活码 %d",
+                    project_id, progress["logs_deleted"], progress["codes_deleted"],
+                )
+                if on_progress is not None:
+                    on_progress(dict(progress))
+                if deleted < batch_size:
+                    break
+                if throttle_seconds > 0:
+                    time.sleep(throttle_seconds)
+
+        # 剩余的 API Key、计数器、汇总和清除任务由外键级联删除
+        db.execute(delete(Project).where(Project.id == project_id).execution_options(synchronize_session=False))
+        db.commit()
+        api_key_cache.invalidate_project(project_id)
+
+        progress["elapsed_seconds"] = round(time.perf_counter() - began, 3)
+        return progress
@@ -17,9 +17,10 @@ limitations under the License.
 """
 from typing import Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import exists, or_
 
 from ...models.project import Project
+from ...models.project_purge import ProjectPurge
 
 
 class ProjectRepository:
@@ -89,7 +90,8 @@ class ProjectRepository:
         Returns:
             tuple[list[Project], int]: (项目列表, 总数)
         """
-        query = db.query(Project)
+        # 正在清除的项目不再列出
+        query = db.query(Project).filter(~exists().where(ProjectPurge.project_id == Project.id))
 
         # 搜索筛选
         if search:
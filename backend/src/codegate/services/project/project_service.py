@@ -15,16 +15,19 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
-from typing import Optional
+from typing import Any, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from ...models.project import Project
-from ...models.invitation_code import InvitationCode
 from ...schemas.project import ProjectCreate, ProjectUpdate
+from ...core.constants import DEFAULT_EXPIRY_BATCH_SIZE, PROJECT_EXPIRY_INLINE_LIMIT
 from ...core.exceptions import ProjectNotFoundError, ProjectAlreadyExistsError
 from .project_repository import ProjectRepository
+from .code_counter_repository import CodeCounterRepository
+from .project_purge_service import ProjectPurgeService
+from ..code.code_repository import CodeRepository
+from ..code.expiry_engine import expiry_engine
 
 
 class ProjectService:
@@ -64,6 +67,7 @@ class ProjectService:
         created = ProjectRepository.create(db, project)
         db.commit()
         db.refresh(created)
+        expiry_engine.schedule(created.expires_at)
         return created
 
     @staticmethod
@@ -104,17 +108,21 @@ class ProjectService:
         return ProjectRepository.get_list(db, page, page_size, search, status)
 
     @staticmethod
-    def update(db: Session, project_id: str, project_data: ProjectUpdate) -> Optional[Project]:
+    def update(db: Session, project_id: str, project_data: ProjectUpdate) -> tuple[Project, dict[str, Any]]:
         """
         更新项目
 
+        过期时间变更时，跟随项目过期时间的激活码在同一事务内以一条 UPDATE 重算 is_expired；
+        需要重算的激活码超过 PROJECT_EXPIRY_INLINE_LIMIT 时标记为 deferred，
+        由调用方在提交后执行 recompute_code_expiry 分块重算。
+
         Args:
             db: 数据库会话
             project_id: 项目ID
             project_data: 项目更新数据
 
         Returns:
-            Optional[Project]: 更新后的项目，不存在返回 None
+            tuple[Project, dict]: (更新后的项目, 激活码过期状态重算结果 {"updated": 行数, "deferred": 是否需后台重算})
 
         Raises:
             ProjectNotFoundError: 项目不存在
@@ -123,6 +131,7 @@ class ProjectService:
         if not project:
             raise ProjectNotFoundError(project_id)
 
+        expires_at_changed = False
         if project_data.name is not None:
             # 检查新名称是否与其他项目冲突
             existing = ProjectRepository.get_by_name(db, project_data.name)
@@ -133,26 +142,44 @@ class ProjectService:
             project.description = project_data.description
         if project_data.expires_at is not None:
             # 转换时间戳为datetime
-            project.expires_at = datetime.utcfromtimestamp(project_data.expires_at)
+            expires_at = datetime.utcfromtimestamp(project_data.expires_at)
+            expires_at_changed = expires_at != project.expires_at
+            project.expires_at = expires_at
         if project_data.status is not None:
             project.status = project_data.status
 
         updated = ProjectRepository.update(db, project)
+        expiry = {"updated": 0, "deferred": False}
+        if expires_at_changed:
+            db.flush()
+            count = CodeRepository.recompute_inherited_expiry(
+                db, project_id, updated.expires_at, PROJECT_EXPIRY_INLINE_LIMIT
+            )
+            if count is None:
+                expiry["deferred"] = True
+            else:
+                expiry["updated"] = count
         db.commit()
         db.refresh(updated)
-        return updated
+        expiry_engine.schedule(updated.expires_at)
+        return updated, expiry
 
     @staticmethod
-    def delete(db: Session, project_id: str) -> bool:
+    def recompute_code_expiry(
+        db: Session,
+        project_id: str,
+        batch_size: int = DEFAULT_EXPIRY_BATCH_SIZE,
+    ) -> int:
         """
-        删除项目
+        按项目当前的过期时间分块重算跟随项目的激活码过期状态（每块提交）
 
         Args:
             db: 数据库会话
             project_id: 项目ID
+            batch_size: 每块的行数
 
         Returns:
-            bool: 是否删除成功
+            int: 更新的行数
 
         Raises:
             ProjectNotFoundError: 项目不存在
@@ -160,59 +187,55 @@ class ProjectService:
         project = ProjectRepository.get_by_id(db, project_id)
         if not project:
             raise ProjectNotFoundError(project_id)
+        condition, values = CodeRepository.inherited_expiry_changes(project_id, project.expires_at, datetime.utcnow())
+        db.rollback()
+        updated, _ = CodeRepository.update_in_chunks(db, condition, values, batch_size)
+        return updated
 
-        ProjectRepository.delete(db, project)
-        db.commit()
+    @staticmethod
+    def request_delete(db: Session, project_id: str, requested_by: Optional[str] = None) -> None:
+        """
+        登记删除项目（禁用项目并登记清除任务，调用方负责提交后执行 ProjectPurgeService.purge）
+
+        Args:
+            db: 数据库会话
+            project_id: 项目ID
+            requested_by: 登记人ID
+
+        Raises:
+            ProjectNotFoundError: 项目不存在
+        """
+        ProjectPurgeService.request(db, project_id, requested_by)
+
+    @staticmethod
+    def delete(db: Session, project_id: str) -> bool:
+        """
+        删除项目（按块删除核销日志和激活码，每块单独提交）
+
+        Args:
+            db: 数据库会话
+            project_id: 项目ID
+
+        Returns:
+            bool: 是否删除成功
+
+        Raises:
+            ProjectNotFoundError: 项目不存在
+        """
+        ProjectPurgeService.purge(db, project_id)
         return True
 
     @staticmethod
     def get_code_stats(db: Session, project_id: str) -> dict[str, int]:
         """
-        计算项目下激活码的统计数据（总数/已使用/未使用/已过期）
+        计算项目下激活码的统计数据（总数/已使用/未使用/已禁用/已过期）
 
         统计口径遵循 docs/design/logic/code_status_logic.md：
         - 未使用：status=False 且 is_disabled=False 且 is_expired=False
         - 已使用：status=True 且 is_disabled=False 且 is_expired=False
+        - 已禁用：is_disabled=True（独立状态）
         - 已过期：is_expired=True（独立状态）
-        """
-        base_query = db.query(InvitationCode).filter(InvitationCode.project_id == project_id)
-
-        total = base_query.count()
-        verified = (
-            db.query(func.count(InvitationCode.id))
-            .filter(
-                InvitationCode.project_id == project_id,
-                InvitationCode.status.is_(True),
-                InvitationCode.is_disabled.is_(False),
-                InvitationCode.is_expired.is_(False),
-            )
-            .scalar()
-            or 0
-        )
-        expired = (
-            db.query(func.count(InvitationCode.id))
-            .filter(
-                InvitationCode.project_id == project_id,
-                InvitationCode.is_expired.is_(True),
-            )
-            .scalar()
-            or 0
-        )
-        unverified = (
-            db.query(func.count(InvitationCode.id))
-            .filter(
-                InvitationCode.project_id == project_id,
-                InvitationCode.status.is_(False),
-                InvitationCode.is_disabled.is_(False),
-                InvitationCode.is_expired.is_(False),
-            )
-            .scalar()
-            or 0
-        )
 
-        return {
-            "total": total,
-            "verified": verified,
-            "unverified": unverified,
-            "expired": expired,
-        }
+        读取由触发器增量维护的 project_code_counters，与项目下的激活码数量无关。
+        """
+        return CodeCounterRepository.get_stats(db, project_id)
@@ -15,10 +15,14 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+from datetime import datetime
 from typing import Optional
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from ...models.verification_log import VerificationLog
+from ...models.verification_rollup import VerificationRollup
+from ..audit.log_writer import log_writer
 
 
 class VerificationRepository:
@@ -36,7 +40,7 @@ class VerificationRepository:
         Returns:
             VerificationLog: 创建的核销日志
         """
-        db.add(log)
+        log_writer.add(db, log)
         return log
 
     @staticmethod
@@ -68,3 +72,34 @@ class VerificationRepository:
         logs = query.order_by(VerificationLog.verified_at.desc()).offset(offset).limit(page_size).all()
 
         return logs, total
+
+    @staticmethod
+    def get_hourly_rollups(
+        db: Session,
+        project_id: str,
+        start: datetime,
+        end: datetime,
+    ) -> list[tuple[datetime, str, int]]:
+        """
+        读取项目在 [start, end) 内的小时核销汇总（合并槽位）
+
+        Args:
+            db: 数据库会话
+            project_id: 项目ID
+            start: 开始时间（UTC，含）
+            end: 结束时间（UTC，不含）
+
+        Returns:
+            list[tuple[datetime, str, int]]: (小时起点, 核销结果, 次数)，按时间升序
+        """
+        stmt = (
+            select(VerificationRollup.bucket_start, VerificationRollup.result, func.sum(VerificationRollup.count))
+            .where(
+                VerificationRollup.project_id == project_id,
+                VerificationRollup.bucket_start >= start,
+                VerificationRollup.bucket_start < end,
+            )
+            .group_by(VerificationRollup.bucket_start, VerificationRollup.result)
+            .order_by(VerificationRollup.bucket_start)
+        )
+        return [(bucket_start, result, int(count)) for bucket_start, result, count in db.execute(stmt)]
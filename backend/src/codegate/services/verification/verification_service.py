@@ -15,23 +15,28 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Any, Optional
 from sqlalchemy.orm import Session
 
 from ...models.invitation_code import InvitationCode
 from ...models.verification_log import VerificationLog
 from ...schemas.verification import VerificationRequest
+from ...schemas.utils import datetime_to_timestamp, timestamp_to_datetime
+from ...core.constants import ALLOWED_SERIES_GRANULARITIES, MAX_SERIES_POINTS
 from ...core.exceptions import (
+    CodeGateException,
     CodeNotFoundError,
     CodeAlreadyVerifiedError,
     CodeExpiredError,
     CodeDisabledError,
     ProjectDisabledError,
     ProjectExpiredError,
+    ProjectNotFoundError,
 )
 from ..code.code_repository import CodeRepository
 from ..code.code_service import CodeService
+from ..project.project_repository import ProjectRepository
 from .verification_repository import VerificationRepository
 from ...utils.audit_log import log_external
 
@@ -66,83 +71,27 @@ class VerificationService:
             ProjectDisabledError: 项目已禁用
             ProjectExpiredError: 项目已过期
         """
-        # 查找激活码
-        code = CodeService.get_by_code(db, request.code)
+        now = datetime.utcnow()
 
         try:
-            if not code:
-                # 记录失败日志（verification_log 无法记录，因为 code_id 为空）
-                # 但可以记录审计日志
-                log_external(db, "verify_code", "code", None, "failed", ip_address=ip_address,
-                             user_agent=user_agent, reason="激活码不存在", code=request.code, verified_by=request.verified_by)
-                db.commit()
-                # 未找到不需要提交，直接抛出
-                raise CodeNotFoundError(request.code)
-
-            # 检查是否已禁用
-            if code.is_disabled:
-                VerificationService._log_verification(
-                    db, code.id, False, "激活码已禁用", ip_address, user_agent, request.verified_by
-                )
-                log_external(db, "verify_code", "code", code.id, "failed", ip_address=ip_address,
-                             user_agent=user_agent, reason="激活码已禁用", verified_by=request.verified_by)
-                raise CodeDisabledError(request.code)
-
-            # 检查是否已核销
-            if code.status:
-                VerificationService._log_verification(
-                    db, code.id, False, "激活码已使用", ip_address, user_agent, request.verified_by
-                )
-                log_external(db, "verify_code", "code", code.id, "failed", ip_address=ip_address,
-                             user_agent=user_agent, reason="激活码已使用", verified_by=request.verified_by)
-                raise CodeAlreadyVerifiedError(request.code)
-
-            # 检查是否过期
-            if code.is_expired:
-                VerificationService._log_verification(
-                    db, code.id, False, "激活码已过期", ip_address, user_agent, request.verified_by
-                )
-                log_external(db, "verify_code", "code", code.id, "failed", ip_address=ip_address,
-                             user_agent=user_agent, reason="激活码已过期", verified_by=request.verified_by)
-                raise CodeExpiredError(request.code)
-
-            # 检查项目是否启用
-            if not code.project.status:
-                VerificationService._log_verification(
-                    db, code.id, False, "项目已禁用", ip_address, user_agent, request.verified_by
-                )
-                log_external(db, "verify_code", "code", code.id, "failed", ip_address=ip_address,
-                             user_agent=user_agent, reason="项目已禁用", verified_by=request.verified_by, project_id=code.project_id)
-                raise ProjectDisabledError(code.project_id)
+            # 单条条件 UPDATE 完成核销：并发请求中只有一个能成功
+            code = CodeRepository.redeem(db, request.code, request.verified_by, now)
 
-            # 检查项目是否过期
-            if code.project.is_expired:
+            if code is not None:
+                # 记录成功日志
                 VerificationService._log_verification(
-                    db, code.id, False, "项目已过期", ip_address, user_agent, request.verified_by
+                    db, code.id, True, None, ip_address, user_agent, request.verified_by
                 )
-                log_external(db, "verify_code", "code", code.id, "failed", ip_address=ip_address,
-                             user_agent=user_agent, reason="项目已过期", verified_by=request.verified_by, project_id=code.project_id)
-                raise ProjectExpiredError(code.project_id)
-
-            # 核销成功
-            code.status = True
-            code.verified_at = datetime.utcnow()
-            code.verified_by = request.verified_by
 
-            # 记录成功日志
-            VerificationService._log_verification(
-                db, code.id, True, None, ip_address, user_agent, request.verified_by
-            )
+                # 记录审计日志（核销成功）
+                log_external(db, "verify_code", "code", code.id, "success", ip_address=ip_address,
+                             user_agent=user_agent, verified_by=request.verified_by, project_id=code.project_id)
 
-            # 记录审计日志（核销成功）
-            log_external(db, "verify_code", "code", code.id, "success", ip_address=ip_address,
-                         user_agent=user_agent, verified_by=request.verified_by, project_id=code.project_id)
-
-            CodeRepository.update(db, code)
+                db.commit()
+                return code
 
-            db.commit()
-            db.refresh(code)
-            return code
+            # 核销未命中，读取当前状态以确定失败原因
+            VerificationService._raise_verify_failure(db, request, ip_address, user_agent)
         except (
             CodeNotFoundError,
             CodeAlreadyVerifiedError,
@@ -158,6 +107,174 @@ class VerificationService:
             db.rollback()
             raise
 
+    @staticmethod
+    def verify_batch(
+        db: Session,
+        project_id: str,
+        codes: list[str],
+        verified_by: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        批量核销同一项目下的激活码
+
+        所有激活码通过一次 IN 查询读取，可核销的激活码通过一条条件 UPDATE 完成核销，
+        全部核销日志与审计日志在同一事务内提交。
+
+        Args:
+            db: 数据库会话
+            project_id: 项目ID
+            codes: 激活码字符串列表（允许重复，重复项按同一激活码处理）
+            verified_by: 核销用户
+            ip_address: IP地址
+            user_agent: 用户代理
+
+        Returns:
+            list[dict[str, Any]]: 与 codes 顺序一致的核销结果，
+                每项包含 code / code_id / verified_at / error（业务异常，成功时为 None）
+
+        Raises:
+            ProjectNotFoundError: 项目不存在
+        """
+        project = ProjectRepository.get_by_id(db, project_id)
+        if not project:
+            raise ProjectNotFoundError(project_id)
+
+        now = datetime.utcnow()
+        unique_codes = list(dict.fromkeys(codes))
+        outcomes: dict[str, dict[str, Any]] = {}
+
+        try:
+            found = {c.code: c for c in CodeRepository.get_by_codes(db, project_id, unique_codes)}
+            candidates: list[InvitationCode] = []
+
+            for code_str in unique_codes:
+                code = found.get(code_str)
+                if code is None:
+                    log_external(db, "verify_code", "code", None, "failed", ip_address=ip_address,
+                                 user_agent=user_agent, reason="激活码不存在", code=code_str, verified_by=verified_by)
+                    outcomes[code_str] = {"code_id": None, "verified_at": None, "error": CodeNotFoundError(code_str)}
+                    continue
+
+                CodeService.refresh_expired_state(code)
+                failure = VerificationService._check_code_state(code)
+                if failure is not None:
+                    reason, error = failure
+                    VerificationService._log_failure(db, code, reason, ip_address, user_agent, verified_by)
+                    outcomes[code_str] = {"code_id": code.id, "verified_at": None, "error": error}
+                    continue
+
+                candidates.append(code)
+
+            redeemed = CodeRepository.redeem_batch(db, [c.id for c in candidates], verified_by, now)
+
+            for code in candidates:
+                if code.id in redeemed:
+                    VerificationService._log_verification(
+                        db, code.id, True, None, ip_address, user_agent, verified_by
+                    )
+                    log_external(db, "verify_code", "code", code.id, "success", ip_address=ip_address,
+                                 user_agent=user_agent, verified_by=verified_by, project_id=project_id)
+                    outcomes[code.code] = {"code_id": code.id, "verified_at": now, "error": None}
+                else:
+                    # 读取后被并发请求抢先核销
+                    VerificationService._log_failure(db, code, "激活码已使用", ip_address, user_agent, verified_by)
+                    outcomes[code.code] = {
+                        "code_id": code.id,
+                        "verified_at": None,
+                        "error": CodeAlreadyVerifiedError(code.code),
+                    }
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        results: list[dict[str, Any]] = []
+        seen: set[str] = set()
+        for code_str in codes:
+            outcome = outcomes[code_str]
+            if code_str in seen and outcome["error"] is None:
+                # 同一批次内重复提交的激活码：首次已核销成功
+                outcome = {"code_id": outcome["code_id"], "verified_at": None,
+                           "error": CodeAlreadyVerifiedError(code_str)}
+            seen.add(code_str)
+            results.append({"code": code_str, **outcome})
+        return results
+
+    @staticmethod
+    def _check_code_state(code: InvitationCode) -> Optional[tuple[str, CodeGateException]]:
+        """
+        按核销前置条件检查激活码状态（调用方需先刷新 is_expired）
+
+        Returns:
+            Optional[tuple[str, CodeGateException]]: (失败原因, 业务异常)，可核销时返回 None
+        """
+        if code.is_disabled:
+            return "激活码已禁用", CodeDisabledError(code.code)
+        if code.status:
+            return "激活码已使用", CodeAlreadyVerifiedError(code.code)
+        if code.is_expired:
+            return "激活码已过期", CodeExpiredError(code.code)
+        if not code.project.status:
+            return "项目已禁用", ProjectDisabledError(code.project_id)
+        if code.project.is_expired:
+            return "项目已过期", ProjectExpiredError(code.project_id)
+        return None
+
+    @staticmethod
+    def _log_failure(
+        db: Session,
+        code: InvitationCode,
+        reason: str,
+        ip_address: Optional[str],
+        user_agent: Optional[str],
+        verified_by: Optional[str],
+    ) -> None:
+        """记录核销失败的核销日志与审计日志"""
+        VerificationService._log_verification(
+            db, code.id, False, reason, ip_address, user_agent, verified_by
+        )
+        log_external(db, "verify_code", "code", code.id, "failed", ip_address=ip_address,
+                     user_agent=user_agent, reason=reason, verified_by=verified_by, project_id=code.project_id)
+
+    @staticmethod
+    def _raise_verify_failure(
+        db: Session,
+        request: VerificationRequest,
+        ip_address: Optional[str],
+        user_agent: Optional[str],
+    ) -> None:
+        """
+        核销失败时判定失败原因，记录日志并抛出对应业务异常
+
+        Raises:
+            CodeNotFoundError: 激活码不存在
+            CodeAlreadyVerifiedError: 激活码已核销
+            CodeDisabledError: 激活码已禁用
+            CodeExpiredError: 激活码已过期
+            ProjectDisabledError: 项目已禁用
+            ProjectExpiredError: 项目已过期
+        """
+        code = CodeService.get_by_code(db, request.code)
+
+        if not code:
+            # 记录失败日志（verification_log 无法记录，因为 code_id 为空）
+            # 但可以记录审计日志
+            log_external(db, "verify_code", "code", None, "failed", ip_address=ip_address,
+                         user_agent=user_agent, reason="激活码不存在", code=request.code, verified_by=request.verified_by)
+            raise CodeNotFoundError(request.code)
+
+        failure = VerificationService._check_code_state(code)
+        if failure is None:
+            # 读取时状态已恢复为可核销（如被并发重新激活），按已被占用处理
+            failure = "激活码已使用", CodeAlreadyVerifiedError(request.code)
+
+        reason, error = failure
+        VerificationService._log_failure(db, code, reason, ip_address, user_agent, request.verified_by)
+        raise error
+
     @staticmethod
     def _log_verification(
         db: Session,
@@ -216,3 +333,68 @@ class VerificationService:
             tuple[list[VerificationLog], int]: (日志列表, 总数)
         """
         return VerificationRepository.get_list(db, code_id, page, page_size)
+
+    @staticmethod
+    def get_series(
+        db: Session,
+        project_id: str,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        granularity: str = "hour",
+    ) -> list[dict[str, int]]:
+        """
+        获取项目的核销次数时间序列（读取小时汇总表，不扫描核销日志）
+
+        时间桶按 UTC 对齐，返回与 [start_time, end_time) 相交的全部时间桶（首尾桶计完整的一小时/一天）；
+        没有核销的时间桶计数为 0。end_time 默认为当前时间，start_time 默认为
+        end_time 之前 24 小时（hour）或 30 天（day）。
+
+        Args:
+            db: 数据库会话
+            project_id: 项目ID
+            start_time: 开始时间（UTC时间戳，秒级，可选）
+            end_time: 结束时间（UTC时间戳，秒级，可选）
+            granularity: 时间粒度（hour / day）
+
+        Returns:
+            list[dict]: 每项含 bucket_start（UTC时间戳，秒级）, success, failed
+
+        Raises:
+            ProjectNotFoundError: 项目不存在
+            ValueError: 粒度无效、时间范围无效或时间桶数量超过限制
+        """
+        if granularity not in ALLOWED_SERIES_GRANULARITIES:
+            raise ValueError(f"不支持的时间粒度: {granularity}")
+        step = timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+        if end_time is None:
+            end_time = datetime_to_timestamp(datetime.utcnow())
+        if start_time is None:
+            start_time = end_time - int((step * (24 if granularity == "hour" else 30)).total_seconds())
+        if end_time <= start_time:
+            raise ValueError("结束时间必须晚于开始时间")
+        if not ProjectRepository.get_by_id(db, project_id):
+            raise ProjectNotFoundError(project_id)
+
+        start = timestamp_to_datetime(start_time).replace(minute=0, second=0, microsecond=0)
+        if granularity == "day":
+            start = start.replace(hour=0)
+        end = timestamp_to_datetime(end_time)
+        if (end - start) / step > MAX_SERIES_POINTS:
+            raise ValueError(f"时间桶数量不能超过 {MAX_SERIES_POINTS}")
+
+        buckets: dict[datetime, dict[str, int]] = {}
+        bucket = start
+        while bucket < end:
+            buckets[bucket] = {"success": 0, "failed": 0}
+            bucket += step
+
+        for bucket_start, result, count in VerificationRepository.get_hourly_rollups(db, project_id, start, end):
+            if granularity == "day":
+                bucket_start = bucket_start.replace(hour=0)
+            if result in buckets[bucket_start]:
+                buckets[bucket_start][result] += count
+
+        return [
+            {"bucket_start": datetime_to_timestamp(bucket_start), **counts}
+            for bucket_start, counts in buckets.items()
+        ]
@@ -15,7 +15,8 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
-import random
+import os
+import secrets
 from typing import Optional, Set
 
 from ..core.constants import (
@@ -27,6 +28,86 @@ from ..core.constants import (
     MIN_CODE_LENGTH,
 )
 
+# NumPy 可选：安装时使用向量化查表，否则使用 bytes.translate 实现
+try:
+    import numpy as np
+    _numpy_available = True
+except ImportError:
+    np = None
+    _numpy_available = False
+
+
+def _byte_limit(charset_size: int) -> int:
+    """
+    可接受随机字节的上界（不含）
+
+    只接受小于字符集大小整数倍的字节，再对字符集大小取模，避免取模偏差。
+    """
+    return 256 - 256 % charset_size
+
+
+def _random_strings_numpy(count: int, length: int, charset: str) -> list[str]:
+    """NumPy 实现：批量读取随机字节，拒绝采样后向量化查表"""
+    size = len(charset)
+    limit = _byte_limit(size)
+    table = np.frombuffer(charset.encode("ascii"), dtype=np.uint8)
+    needed = count * length
+
+    chunks = []
+    collected = 0
+    while collected < needed:
+        # 按接受率多读一些，通常一次即可取够
+        draw = int((needed - collected) * 256 / limit) + 64
+        values = np.frombuffer(os.urandom(draw), dtype=np.uint8)
+        values = values[values < limit]
+        chunks.append(values)
+        collected += values.size
+
+    values = np.concatenate(chunks)[:needed]
+    encoded = table[values % size].tobytes()
+    return [encoded[i:i + length].decode("ascii") for i in range(0, needed, length)]
+
+
+def _random_strings_bytes(count: int, length: int, charset: str) -> list[str]:
+    """纯 Python 实现：bytes.translate 一次完成拒绝采样与字符映射"""
+    size = len(charset)
+    limit = _byte_limit(size)
+    encoded_charset = charset.encode("ascii")
+    # 字节 b（b < limit）映射为 charset[b % size]，其余字节被删除
+    table = bytes(encoded_charset[b % size] if b < limit else 0 for b in range(256))
+    rejected = bytes(range(limit, 256))
+    needed = count * length
+
+    buffer = bytearray()
+    while len(buffer) < needed:
+        draw = int((needed - len(buffer)) * 256 / limit) + 64
+        buffer += os.urandom(draw).translate(table, rejected)
+
+    encoded = bytes(buffer[:needed])
+    return [encoded[i:i + length].decode("ascii") for i in range(0, needed, length)]
+
+
+def random_strings(count: int, length: int, charset: str = DEFAULT_CODE_CHARSET) -> list[str]:
+    """
+    批量生成随机字符串（密码学安全随机源，无取模偏差）
+
+    Args:
+        count: 数量
+        length: 每个字符串的长度
+        charset: 字符集
+
+    Returns:
+        list[str]: 随机字符串列表（可能重复，由调用方去重）
+    """
+    if count <= 0:
+        return []
+    if not charset.isascii() or len(set(charset)) != len(charset):
+        # 非 ASCII 或含重复字符的字符集：逐字符选取
+        return [''.join(secrets.choice(charset) for _ in range(length)) for _ in range(count)]
+    if _numpy_available:
+        return _random_strings_numpy(count, length, charset)
+    return _random_strings_bytes(count, length, charset)
+
 
 def generate_codes(
     count: int,
@@ -47,7 +128,7 @@ def generate_codes(
         suffix: 后缀（可选）
         existing_codes: 已存在的激活码集合，用于避免重复
         charset: 字符集，默认大写字母+数字
-        max_attempts: 生成单个激活码的最大尝试次数
+        max_attempts: 批量补足重复激活码的最大轮数
     
     Returns:
         list[str]: 生成的激活码列表
@@ -88,26 +169,23 @@ def generate_codes(
     
     generated_codes: list[str] = []
     used_codes = existing_codes.copy()
-    
-    for _ in range(count):
-        code = None
-        attempts = 0
-        
-        while code is None or code in used_codes:
-            if attempts >= max_attempts:
-                raise ValueError(
-                    f"无法生成唯一激活码，已尝试 {max_attempts} 次。"
-                    f"当前已生成 {len(generated_codes)} 个，请求 {count} 个。"
-                )
-            
-            # 生成随机部分
-            random_part = ''.join(random.choice(charset) for _ in range(random_length))
-            
-            # 组合前缀、随机部分和后缀
-            code = (prefix or "") + random_part + (suffix or "")
-            attempts += 1
-        
-        generated_codes.append(code)
-        used_codes.add(code)
-    
+    prefix = prefix or ""
+    suffix = suffix or ""
+    rounds = 0
+
+    # 按缺少的数量整批生成，仅对重复的部分重新生成
+    while len(generated_codes) < count:
+        if rounds >= max_attempts:
+            raise ValueError(
+                f"无法生成唯一激活码，已尝试 {max_attempts} 轮。"
+                f"当前已生成 {len(generated_codes)} 个，请求 {count} 个。"
+            )
+        rounds += 1
+
+        for random_part in random_strings(count - len(generated_codes), random_length, charset):
+            code = prefix + random_part + suffix
+            if code not in used_codes:
+                generated_codes.append(code)
+                used_codes.add(code)
+
     return generated_codes
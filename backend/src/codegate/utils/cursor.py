@@ -0,0 +1,56 @@
+"""
+游标分页工具函数
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """
+    将 (created_at, id) 编码为不透明游标
+
+    Args:
+        created_at: 最后一行的创建时间
+        row_id: 最后一行的ID
+
+    Returns:
+        str: URL 安全的 base64 字符串（无填充）
+    """
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    解码游标为 (created_at, id)
+
+    Args:
+        cursor: encode_cursor 生成的游标
+
+    Returns:
+        tuple[datetime, str]: (created_at, id)
+
+    Raises:
+        ValueError: 游标无效
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("无效的分页游标")
@@ -1,5 +1,7 @@
 """
-IP 频率限制工具
+频率限制工具
+
+支持进程内存储与 Redis 存储（多进程/多实例部署时共享计数）。
 
 Copyright 2026 pfeak
 
@@ -15,22 +17,263 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
-from datetime import datetime, timedelta
-from typing import Optional
-from collections import defaultdict
+import logging
 import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Protocol
 
+from ..config import settings
 from ..core.constants import MAX_VERIFICATION_ATTEMPTS, VERIFICATION_RATE_LIMIT_SECONDS
 from ..core.exceptions import RateLimitExceededError
 
+logger = logging.getLogger(__name__)
+
+# 默认分片数：每个分片独立加锁，降低并发请求之间的锁竞争
+DEFAULT_SHARD_COUNT = 16
+
+
+class _WindowState:
+    """单个键的滑动窗口计数状态（固定大小）"""
+
+    __slots__ = ("window_start", "previous", "current")
+
+    def __init__(self, window_start: int):
+        self.window_start = window_start
+        self.previous = 0
+        self.current = 0
+
+
+class _Shard:
+    """限流分片：独立锁 + 有界 LRU"""
+
+    __slots__ = ("lock", "states", "max_keys")
+
+    def __init__(self, max_keys: int):
+        self.lock = threading.Lock()
+        self.states: OrderedDict[str, _WindowState] = OrderedDict()
+        self.max_keys = max_keys
+
+
+class RateLimitStore(Protocol):
+    def hit(self, key: str, max_attempts: int, time_window_seconds: int) -> bool: ...
+
+    def reset(self, key: str) -> None: ...
+
+
+def _sliding_window_count(previous: int, current: int, now: float, window_start: int, window: int) -> float:
+    """按上一窗口剩余占比加权估算滑动窗口内的请求数"""
+    return previous * (1 - (now - window_start) / window) + current
+
+
+class MemoryRateLimitStore:
+    """
+    进程内限流存储（滑动窗口计数）
+
+    每个键只保存上一窗口与当前窗口的计数，按上一窗口剩余占比加权估算滑动窗口内的请求数，
+    单次检查 O(1)、每个键内存固定。键按哈希分片，各分片独立加锁，
+    超过容量时淘汰最久未访问的键。
+    """
+
+    def __init__(self, max_keys: int = 100_000, shard_count: int = DEFAULT_SHARD_COUNT):
+        """
+        初始化进程内限流存储
+
+        Args:
+            max_keys: 最多跟踪的键数量（超过后按 LRU 淘汰）
+            shard_count: 分片数量
+        """
+        per_shard = max(1, -(-max_keys // shard_count))
+        self._shards = [_Shard(per_shard) for _ in range(shard_count)]
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def hit(
+        self,
+        key: str,
+        max_attempts: int,
+        time_window_seconds: int,
+        now: Optional[float] = None,
+    ) -> bool:
+        """
+        记录一次请求并返回是否允许（超限时不计数）
+
+        Args:
+            key: 限流键（IP、API Key 等）
+            max_attempts: 窗口内最大请求数
+            time_window_seconds: 时间窗口（秒）
+            now: 当前时间戳（秒），默认取系统时间
+
+        Returns:
+            bool: 是否允许本次请求
+        """
+        now = time.time() if now is None else now
+        window_start = int(now // time_window_seconds) * time_window_seconds
+        shard = self._shard(key)
+
+        with shard.lock:
+            state = shard.states.get(key)
+            if state is None:
+                state = _WindowState(window_start)
+                shard.states[key] = state
+                if len(shard.states) > shard.max_keys:
+                    shard.states.popitem(last=False)
+            else:
+                shard.states.move_to_end(key)
+                if state.window_start != window_start:
+                    # 进入新窗口：相邻窗口保留当前计数为上一窗口计数，否则清零
+                    adjacent = window_start - state.window_start == time_window_seconds
+                    state.previous = state.current if adjacent else 0
+                    state.current = 0
+                    state.window_start = window_start
+
+            estimated = _sliding_window_count(
+                state.previous, state.current, now, window_start, time_window_seconds
+            )
+            if estimated >= max_attempts:
+                return False
+            state.current += 1
+            return True
+
+    def reset(self, key: str) -> None:
+        """清除键的计数"""
+        shard = self._shard(key)
+        with shard.lock:
+            shard.states.pop(key, None)
+
+    def __len__(self) -> int:
+        """当前跟踪的键数量"""
+        return sum(len(shard.states) for shard in self._shards)
+
+
+# 原子地检查并计数：估算滑动窗口请求数，未超限时才对当前窗口 INCR（与进程内存储一致，超限时不计数）
+# KEYS: 当前窗口键、上一窗口键；ARGV: 上一窗口权重、最大请求数、计数键过期时间（秒）
+_HIT_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[1]) + current >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+class RedisRateLimitStore:
+    """
+    Redis 限流存储（滑动窗口计数）
+
+    每个窗口一个计数键：通过一次 EVAL 在 Redis 内原子地读取当前与上一窗口计数，
+    仅在允许时对当前窗口 INCR 并设置过期时间。
+    Redis 不可用时改用进程内存储（各进程独立计数），恢复后自动切回。
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        prefix: str = "codegate:ratelimit:",
+        socket_timeout: float = 0.5,
+        fallback: Optional[MemoryRateLimitStore] = None,
+    ):
+        try:
+            import redis  # type: ignore
+        except ImportError as exc:
+            raise RuntimeError("Redis 限流存储需要安装 redis 依赖") from exc
+
+        self.prefix = prefix
+        # 超时避免 Redis 无响应时阻塞 worker 线程
+        self.client = redis.Redis.from_url(
+            redis_url,
+            decode_responses=True,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+        )
+        self.fallback = fallback if fallback is not None else MemoryRateLimitStore()
+        self._errors = redis.RedisError
+        self._degraded = False
+
+    def _key(self, key: str, window_start: int) -> str:
+        return f"{self.prefix}{key}:{window_start}"
+
+    def _on_error(self, operation: str) -> None:
+        # 仅在进入降级状态时记录一次，避免故障期间每个请求都输出日志
+        if not self._degraded:
+            self._degraded = True
+            logger.warning(f"Redis 限流存储{operation}失败，改用进程内限流", exc_info=True)
+
+    def _on_success(self) -> None:
+        if self._degraded:
+            self._degraded = False
+            logger.info("Redis 限流存储已恢复")
+
+    def hit(
+        self,
+        key: str,
+        max_attempts: int,
+        time_window_seconds: int,
+        now: Optional[float] = None,
+    ) -> bool:
+        now = time.time() if now is None else now
+        window_start = int(now // time_window_seconds) * time_window_seconds
+        previous_weight = 1 - (now - window_start) / time_window_seconds
+
+        try:
+            allowed = self.client.eval(
+                _HIT_SCRIPT,
+                2,
+                self._key(key, window_start),
+                self._key(key, window_start - time_window_seconds),
+                repr(previous_weight),
+                max_attempts,
+                time_window_seconds * 2,
+            )
+        except self._errors:
+            self._on_error("计数")
+            return self.fallback.hit(key, max_attempts, time_window_seconds, now=now)
+        self._on_success()
+        return bool(allowed)
+
+    def reset(self, key: str, time_window_seconds: int = VERIFICATION_RATE_LIMIT_SECONDS) -> None:
+        self.fallback.reset(key)
+        window_start = int(time.time() // time_window_seconds) * time_window_seconds
+        try:
+            self.client.delete(
+                self._key(key, window_start),
+                self._key(key, window_start - time_window_seconds),
+            )
+        except self._errors:
+            self._on_error("重置")
+            return
+        self._on_success()
+
 
 class RateLimiter:
-    """IP 频率限制器"""
+    """频率限制器（委托给可插拔的限流存储）"""
 
-    def __init__(self):
-        """初始化频率限制器"""
-        self._attempts: dict[str, list[datetime]] = defaultdict(list)
-        self._lock = threading.Lock()
+    def __init__(self, store: Optional[RateLimitStore] = None):
+        """
+        初始化频率限制器
+
+        Args:
+            store: 限流存储，默认为进程内存储
+        """
+        self.store = store if store is not None else MemoryRateLimitStore()
+
+    def hit(self, key: str, max_attempts: int, time_window_seconds: int) -> bool:
+        """
+        记录一次请求并返回是否允许
+
+        Args:
+            key: 限流键（IP、API Key 等）
+            max_attempts: 窗口内最大请求数
+            time_window_seconds: 时间窗口（秒）
+
+        Returns:
+            bool: 是否允许本次请求
+        """
+        return self.store.hit(key, max_attempts, time_window_seconds)
 
     def check_rate_limit(
         self,
@@ -52,22 +295,10 @@ class RateLimiter:
         if not ip_address:
             return  # 无法获取 IP 地址时不限制
 
-        with self._lock:
-            now = datetime.utcnow()
-            time_window = timedelta(seconds=time_window_seconds)
-
-            # 清理过期记录
-            attempts = self._attempts[ip_address]
-            attempts[:] = [attempt_time for attempt_time in attempts if now - attempt_time < time_window]
-
-            # 检查是否超过限制
-            if len(attempts) >= max_attempts:
-                raise RateLimitExceededError(
-                    f"IP {ip_address} 在 {time_window_seconds} 秒内尝试次数超过 {max_attempts} 次，请稍后再试"
-                )
-
-            # 记录本次尝试
-            attempts.append(now)
+        if not self.hit(ip_address, max_attempts, time_window_seconds):
+            raise RateLimitExceededError(
+                f"IP {ip_address} 在 {time_window_seconds} 秒内尝试次数超过 {max_attempts} 次，请稍后再试"
+            )
 
     def reset(self, ip_address: Optional[str]) -> None:
         """
@@ -79,10 +310,27 @@ class RateLimiter:
         if not ip_address:
             return
 
-        with self._lock:
-            if ip_address in self._attempts:
-                del self._attempts[ip_address]
+        self.store.reset(ip_address)
+
+
+def get_rate_limit_store(settings) -> RateLimitStore:
+    """根据配置返回限流存储实现"""
+    backend = (settings.RATE_LIMIT_BACKEND or "memory").lower()
+
+    if backend == "redis":
+        if not settings.RATE_LIMIT_REDIS_URL:
+            logger.warning("RATE_LIMIT_BACKEND=redis 但 RATE_LIMIT_REDIS_URL 未配置，回退到进程内限流")
+        else:
+            logger.info("使用 Redis 限流存储")
+            return RedisRateLimitStore(
+                settings.RATE_LIMIT_REDIS_URL,
+                socket_timeout=settings.RATE_LIMIT_REDIS_TIMEOUT_SECONDS,
+                fallback=MemoryRateLimitStore(max_keys=settings.RATE_LIMIT_MAX_KEYS),
+            )
+
+    logger.info("使用进程内限流存储（多进程部署时各进程独立计数）")
+    return MemoryRateLimitStore(max_keys=settings.RATE_LIMIT_MAX_KEYS)
 
 
 # 全局频率限制器实例
-rate_limiter = RateLimiter()
+rate_limiter = RateLimiter(get_rate_limit_store(settings))
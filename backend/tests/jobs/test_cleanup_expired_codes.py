@@ -0,0 +1,147 @@
+"""
+激活码过期状态任务测试
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+from codegate.jobs import cleanup_expired_codes as job
+from codegate.models import Project, InvitationCode, ProjectPurge, VerificationLog
+
+
+@pytest.fixture
+def use_session_factory(session_factory, monkeypatch):
+    """让任务使用测试数据库"""
+
+    @contextmanager
+    def get_db_context():
+        db = session_factory()
+        try:
+            yield db
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    monkeypatch.setattr(job, "get_db_context", get_db_context)
+    return session_factory
+
+
+class TestUpdateExpiredStatus:
+    """过期状态更新任务测试类"""
+
+    def _seed(self, session_factory) -> dict[str, str]:
+        now = datetime.utcnow()
+        past, future = now - timedelta(days=1), now + timedelta(days=1)
+        with session_factory() as db:
+            expired_project = Project(name="已过期项目", expires_at=past)
+            active_project = Project(name="有效项目", expires_at=future)
+            db.add_all([expired_project, active_project])
+            db.flush()
+            codes = {
+                # 自身过期时间已过 -> 过期
+                **{f"PAST{i:05d}": InvitationCode(project_id=active_project.id, code=f"PAST{i:05d}", expires_at=past) for i in range(5)},
+                # 跟随已过期项目 -> 过期
+                "INHERIT01": InvitationCode(project_id=expired_project.id, code="INHERIT01"),
+                # 已使用/已禁用的激活码不标记过期
+                "USEDPAST1": InvitationCode(project_id=active_project.id, code="USEDPAST1", expires_at=past, status=True, verified_at=now),
+                "DISABLED1": InvitationCode(project_id=active_project.id, code="DISABLED1", expires_at=past, is_disabled=True),
+                # 有效期被延长 -> 取消过期
+                "EXTENDED1": InvitationCode(project_id=expired_project.id, code="EXTENDED1", expires_at=future, is_expired=True),
+                "INHERIT02": InvitationCode(project_id=active_project.id, code="INHERIT02", is_expired=True),
+                # 已过期且未延长 -> 保持
+                "STILLEXP1": InvitationCode(project_id=active_project.id, code="STILLEXP1", expires_at=past, is_expired=True),
+            }
+            db.add_all(codes.values())
+            db.commit()
+            return {code: item.id for code, item in codes.items()}
+
+    def test_chunked_update(self, use_session_factory):
+        """测试分块更新过期状态，结果与逐条判断一致"""
+        ids = self._seed(use_session_factory)
+
+        stats = job.update_expired_status(batch_size=2)
+
+        assert stats["expired_updated"] == 6
+        assert stats["unexpired_updated"] == 2
+        assert stats["inconsistent_fixed"] == 0
+        # 过期 6 行按每块 2 行分 3 块，取消过期 2 行 1 块
+        assert stats["chunks"] == 4
+        assert stats["elapsed_seconds"] >= 0
+
+        with use_session_factory() as db:
+            expired = {code: db.get(InvitationCode, code_id).is_expired for code, code_id in ids.items()}
+        assert expired == {
+            **{f"PAST{i:05d}": True for i in range(5)},
+            "INHERIT01": True,
+            "USEDPAST1": False,
+            "DISABLED1": False,
+            "EXTENDED1": False,
+            "INHERIT02": False,
+            "STILLEXP1": True,
+        }
+
+        # 再次运行无需更新
+        stats = job.update_expired_status(batch_size=2)
+        assert (stats["expired_updated"], stats["unexpired_updated"], stats["chunks"]) == (0, 0, 0)
+
+    def test_dry_run_counts_only(self, use_session_factory):
+        """测试模拟运行只统计数量，不修改数据"""
+        ids = self._seed(use_session_factory)
+
+        stats = job.update_expired_status(dry_run=True)
+
+        assert (stats["expired_updated"], stats["unexpired_updated"], stats["chunks"]) == (6, 2, 0)
+        with use_session_factory() as db:
+            assert db.get(InvitationCode, ids["PAST00000"]).is_expired is False
+            assert db.get(InvitationCode, ids["EXTENDED1"]).is_expired is True
+
+
+class TestCleanupExpiredCodes:
+    """过期项目清理任务测试类"""
+
+    def test_purges_expired_and_pending_projects(self, use_session_factory):
+        """测试清理超过保留期的项目，并继续未完成的清除任务"""
+        now = datetime.utcnow()
+        with use_session_factory() as db:
+            old = Project(name="过期已久", expires_at=now - timedelta(days=100))
+            recent = Project(name="刚过期", expires_at=now - timedelta(days=1))
+            pending = Project(name="删除中")
+            db.add_all([old, recent, pending])
+            db.flush()
+            for project in (old, recent, pending):
+                db.add_all([InvitationCode(project_id=project.id, code=f"{project.name}{i}") for i in range(3)])
+            db.flush()
+            db.add(VerificationLog(code_id=db.query(InvitationCode).filter_by(project_id=old.id).first().id))
+            db.add(ProjectPurge(project_id=pending.id))
+            db.commit()
+            old_id, recent_id, pending_id = old.id, recent.id, pending.id
+
+        stats = job.cleanup_expired_codes(retention_days=90, dry_run=True)
+        assert (stats["projects_deleted"], stats["codes_deleted"], stats["logs_deleted"]) == (2, 6, 1)
+
+        stats = job.cleanup_expired_codes(retention_days=90, batch_size=2)
+        assert (stats["projects_deleted"], stats["codes_deleted"], stats["logs_deleted"]) == (2, 6, 1)
+        assert stats["chunks"] == 5
+
+        with use_session_factory() as db:
+            assert {p.id for p in db.query(Project)} == {recent_id}
+            assert db.query(InvitationCode).count() == 3
+            assert db.get(Project, old_id) is None and db.get(Project, pending_id) is None
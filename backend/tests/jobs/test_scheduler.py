@@ -0,0 +1,115 @@
+"""
+定时任务调度器测试
+
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import asyncio
+import json
+import threading
+
+from sqlalchemy import update
+
+from codegate.jobs.scheduler import JobScheduler, get_job_status
+from codegate.models import ScheduledJob
+
+
+class TestJobScheduler:
+    """定时任务调度器测试类"""
+
+    def test_single_runner_per_period(self, session_factory):
+        """测试同一任务在多个 worker 中只运行一次，并记录耗时与统计"""
+        engine = session_factory.kw["bind"]
+        calls = []
+        first, second = JobScheduler(engine), JobScheduler(engine)
+
+        def job():
+            # 运行期间另一个 worker 取不到租约
+            calls.append(second.run_if_due("demo"))
+            return {"rows": 3}
+
+        first.register("demo", job, 3600)
+        second.register("demo", job, 3600)
+        second.register("disabled", job, 0)
+        assert [j.name for j in second.jobs] == ["demo"]
+
+        outcome = first.run_if_due("demo")
+        assert outcome["status"] == "success" and outcome["result"] == {"rows": 3}
+        assert calls == [None]
+        # 本周期已运行，其他 worker 不再运行
+        assert second.run_if_due("demo") is None
+
+        with session_factory() as db:
+            [row] = get_job_status(db)
+            assert row.lease_owner is None
+            assert row.last_status == "success"
+            assert json.loads(row.last_result) == {"rows": 3}
+            assert row.last_duration_seconds >= 0
+
+            # 到期后由任一 worker 再次运行
+            db.execute(update(ScheduledJob).values(last_started_at=row.last_started_at.replace(year=2000)))
+            db.commit()
+        assert second.run_if_due("demo")["status"] == "success"
+        assert len(calls) == 2
+
+    def test_failure_and_expired_lease(self, session_factory):
+        """测试失败记录原因并释放租约，异常退出残留的租约到期后可被抢占"""
+        engine = session_factory.kw["bind"]
+        scheduler = JobScheduler(engine, lease_seconds=60)
+
+        def fail():
+            raise RuntimeError("boom")
+
+        scheduler.register("demo", fail, 3600)
+        assert scheduler.run_if_due("demo")["status"] == "failed"
+
+        with session_factory() as db:
+            row = db.get(ScheduledJob, "demo")
+            assert (row.last_status, row.last_error, row.lease_owner) == ("failed", "boom", None)
+
+            # 模拟其他 worker 持有租约后异常退出
+            held = row.last_started_at.replace(year=2000)
+            db.execute(update(ScheduledJob).values(last_started_at=held, lease_owner="dead", lease_until=held.replace(year=2099)))
+            db.commit()
+        if engine.dialect.name == "sqlite":
+            assert scheduler.run_if_due("demo") is None
+            with session_factory() as db:
+                db.execute(update(ScheduledJob).values(lease_until=held))
+                db.commit()
+        assert scheduler.run_if_due("demo") is not None
+
+    def test_start_and_stop(self, session_factory):
+        """测试调度循环启动后运行任务，关闭时等待运行中的任务结束"""
+        engine = session_factory.kw["bind"]
+        scheduler = JobScheduler(engine)
+        started, release = threading.Event(), threading.Event()
+
+        def job():
+            started.set()
+            release.wait(5)
+            return {"rows": 1}
+
+        scheduler.register("demo", job, 3600)
+
+        async def run():
+            scheduler.start()
+            await asyncio.to_thread(started.wait, 5)
+            threading.Timer(0.1, release.set).start()
+            await scheduler.stop()
+
+        asyncio.run(run())
+        with session_factory() as db:
+            row = db.get(ScheduledJob, "demo")
+            assert (row.last_status, row.lease_owner) == ("success", None)
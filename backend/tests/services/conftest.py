@@ -0,0 +1,54 @@
+"""
+服务层测试公共配置
+
+PostgreSQL 用例需设置环境变量 CODEGATE_TEST_POSTGRESQL_URL，否则跳过。
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from codegate.database import Base
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def session_factory(request, tmp_path):
+    """为每个用例创建独立的数据库（SQLite 文件库 / PostgreSQL）"""
+    if request.param == "sqlite":
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'codegate.db'}",
+            connect_args={"check_same_thread": False, "timeout": 30},
+        )
+
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragma(dbapi_conn, connection_record):
+            cursor = dbapi_conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+    else:
+        url = os.environ.get("CODEGATE_TEST_POSTGRESQL_URL")
+        if not url:
+            pytest.skip("未设置 CODEGATE_TEST_POSTGRESQL_URL")
+        engine = create_engine(url, pool_size=20)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
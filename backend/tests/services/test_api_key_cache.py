@@ -0,0 +1,201 @@
+"""
+API Key 缓存与 last_used_at 合并写入测试
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import asyncio
+import hashlib
+import hmac
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from codegate.database import Base
+from codegate.models import Project
+from codegate.models.api_key import ApiKey
+from codegate.api.sdk.auth import EMPTY_STRING_HASH, verify_sdk_auth
+from codegate.services.api_key.api_key_cache import ApiKeyCache, ApiKeyUsageRecorder, CachedApiKey
+from codegate.services.api_key.api_key_service import ApiKeyService
+
+
+def _snapshot(key_id: str = "k1", project_id: str = "p1") -> CachedApiKey:
+    return CachedApiKey(id=key_id, project_id=project_id, api_key=f"key-{key_id}", secret="s")
+
+
+class TestApiKeyCache:
+    """API Key 缓存测试类"""
+
+    def test_hit_and_negative_cache(self):
+        """测试命中、负缓存与未命中"""
+        cache = ApiKeyCache(ttl_seconds=60, negative_ttl_seconds=60, max_entries=10)
+        cache.set("key-k1", _snapshot())
+        cache.set("unknown", None)
+
+        assert cache.get("key-k1") == (True, _snapshot())
+        assert cache.get("unknown") == (True, None)
+        assert cache.get("other") == (False, None)
+
+    def test_ttl_expiry(self, monkeypatch):
+        """测试过期后不再命中"""
+        cache = ApiKeyCache(ttl_seconds=10, negative_ttl_seconds=1, max_entries=10)
+        cache.set("key-k1", _snapshot())
+        cache.set("unknown", None)
+
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 5)
+        assert cache.get("key-k1")[0] is True
+        assert cache.get("unknown")[0] is False
+
+    def test_lru_bound_and_invalidation(self):
+        """测试容量上限与按 ID / 项目失效"""
+        cache = ApiKeyCache(ttl_seconds=60, negative_ttl_seconds=60, max_entries=2)
+        cache.set("key-k1", _snapshot("k1", "p1"))
+        cache.set("key-k2", _snapshot("k2", "p1"))
+        cache.set("key-k3", _snapshot("k3", "p2"))
+        assert cache.get("key-k1")[0] is False
+
+        cache.invalidate_project("p1")
+        assert cache.get("key-k2")[0] is False
+        assert cache.get("key-k3")[0] is True
+
+        cache.invalidate_id("k3")
+        assert cache.get("key-k3")[0] is False
+
+
+    def test_invalidate_on_commit(self, tmp_path):
+        """测试会话提交后才失效（回滚不失效），且失效前开始的查询结果不写入缓存"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+        SessionLocal = sessionmaker(bind=engine)
+        cache = ApiKeyCache(ttl_seconds=60, negative_ttl_seconds=60, max_entries=10)
+        cache.set("key-k1", _snapshot("k1", "p1"))
+        cache.set("key-k2", _snapshot("k2", "p2"))
+
+        with SessionLocal() as db:
+            cache.invalidate_id_on_commit(db, "k1")
+            db.rollback()
+        assert cache.get("key-k1")[0] is True
+
+        with SessionLocal() as db:
+            cache.invalidate_id_on_commit(db, "k1")
+            cache.invalidate_project_on_commit(db, "p2")
+            # SAVEPOINT 回滚不丢弃外层事务登记的失效
+            db.begin_nested().rollback()
+            assert cache.get("key-k1")[0] is True
+            db.commit()
+        assert cache.get("key-k1")[0] is False
+        assert cache.get("key-k2")[0] is False
+
+        # 并发请求在提交前读到旧数据，提交后才写入缓存：丢弃
+        generation = cache.generation
+        cache.invalidate_id("k1")
+        cache.set("key-k1", _snapshot("k1", "p1"), generation)
+        assert cache.get("key-k1")[0] is False
+        cache.set("key-k1", _snapshot("k1", "p1"), cache.generation)
+        assert cache.get("key-k1")[0] is True
+
+    def test_toggle_status_invalidates_negative_entry(self, tmp_path, monkeypatch):
+        """测试禁用 → 认证失败（负缓存）→ 重新启用后立即认证成功"""
+        cache = ApiKeyCache(ttl_seconds=60, negative_ttl_seconds=60, max_entries=10)
+        monkeypatch.setattr("codegate.services.api_key.api_key_service.api_key_cache", cache)
+        monkeypatch.setattr("codegate.api.sdk.auth.api_key_cache", cache)
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'auth.db'}")
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with factory() as db:
+            project = Project(name="项目")
+            db.add(project)
+            db.flush()
+            api_key = ApiKeyService.generate_or_refresh(db, project.id, None, "admin")
+            db.commit()
+            key_id, key, secret = api_key.id, api_key.api_key, api_key.secret
+
+        async def authenticate():
+            timestamp = int(time.time())
+            string_to_sign = f"GET\n/api/sdk/codes\n\n{EMPTY_STRING_HASH}\n{timestamp}"
+            signature = hmac.new(secret.encode(), string_to_sign.encode(), hashlib.sha256).hexdigest()
+            request = Request({"type": "http", "method": "GET", "path": "/api/sdk/codes",
+                               "query_string": b"", "headers": []})
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'auth.db'}")
+            try:
+                async with async_engine.connect() as connection:
+                    async with AsyncSession(bind=connection) as db:
+                        return await verify_sdk_auth(request, key, str(timestamp), signature, db)
+            finally:
+                await async_engine.dispose()
+
+        assert asyncio.run(authenticate()).id == key_id
+
+        with factory() as db:
+            ApiKeyService.toggle_status(db, key_id, False)
+            db.commit()
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(authenticate())
+        assert exc_info.value.status_code == 401
+        assert cache.get(key) == (True, None)
+
+        with factory() as db:
+            ApiKeyService.toggle_status(db, key_id, True)
+            db.commit()
+        assert asyncio.run(authenticate()).id == key_id
+
+        engine.dispose()
+
+
+class TestApiKeyUsageRecorder:
+    """last_used_at 合并写入测试类"""
+
+    def test_flush_bulk_update(self, tmp_path):
+        """测试多次使用合并为最新时间并一次写回"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'usage.db'}")
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        with factory() as db:
+            project = Project(name="项目")
+            db.add(project)
+            db.flush()
+            keys = [
+                ApiKey(project_id=project.id, api_key=ApiKey.generate_api_key(),
+                       secret=ApiKey.generate_secret(), created_by="admin")
+                for _ in range(2)
+            ]
+            db.add_all(keys)
+            db.commit()
+            key_ids = [k.id for k in keys]
+
+        recorder = ApiKeyUsageRecorder()
+        base = datetime(2026, 1, 1)
+        recorder.record(key_ids[0], base)
+        recorder.record(key_ids[0], base + timedelta(seconds=3))
+        recorder.record(key_ids[0], base + timedelta(seconds=1))
+        recorder.record(key_ids[1], base)
+
+        with factory() as db:
+            assert recorder.flush(db) == 2
+            db.commit()
+            assert recorder.flush(db) == 0
+
+        with factory() as db:
+            assert db.get(ApiKey, key_ids[0]).last_used_at == base + timedelta(seconds=3)
+            assert db.get(ApiKey, key_ids[1]).last_used_at == base
+
+        engine.dispose()
@@ -0,0 +1,113 @@
+"""
+审计日志存储测试
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import json
+from datetime import datetime, timedelta
+
+from codegate.models import AuditLog
+from codegate.services.audit.audit_sink import DatabaseAuditSink, FanoutAuditSink, FileAuditSink
+
+
+def _timestamp(value: datetime) -> int:
+    return int((value - datetime(1970, 1, 1)).total_seconds())
+
+
+class TestFileAuditSink:
+    """本地文件审计日志存储测试类"""
+
+    def test_rotates_segments_and_queries_by_time_range(self, session_factory, tmp_path):
+        """测试提交后写入、回滚丢弃、按大小轮转压缩，以及按时间范围跳过分段的查询"""
+        sink = FileAuditSink(str(tmp_path / "audit"), max_bytes=1, rotate_seconds=3600)
+        base = datetime(2026, 1, 1)
+
+        for hour in range(3):
+            with session_factory() as db:
+                for minute in range(2):
+                    sink.write(db, AuditLog(
+                        action="verify_code" if minute else "login",
+                        actor_type="external",
+                        resource_type="code",
+                        resource_id=f"code-{hour}",
+                        created_at=base + timedelta(hours=hour, minutes=minute),
+                    ))
+                db.commit()
+
+        with session_factory() as db:
+            sink.write(db, AuditLog(action="discarded", created_at=base))
+            db.rollback()
+
+        # 每次提交后超过 max_bytes，下次写入前轮转：前两个分段已压缩并登记索引，最后一个仍为活动分段
+        index = [json.loads(line) for line in (tmp_path / "audit" / "index.jsonl").read_text().splitlines()]
+        assert [entry["count"] for entry in index] == [2, 2]
+        assert index[0]["start"] == "2026-01-01T00:00:00.000000"
+        assert len(list((tmp_path / "audit").glob("*.jsonl.gz"))) == 2
+
+        with session_factory() as db:
+            logs, total = sink.query(db, page=1, page_size=4)
+            assert total == 6
+            assert [log.created_at for log in logs] == [
+                base + timedelta(hours=2, minutes=1),
+                base + timedelta(hours=2),
+                base + timedelta(hours=1, minutes=1),
+                base + timedelta(hours=1),
+            ]
+            assert logs[0].id and logs[0].actor_type == "external" and logs[0].resource_id == "code-2"
+
+            logs, total = sink.query(db, page=2, page_size=4)
+            assert total == 6 and [log.resource_id for log in logs] == ["code-0", "code-0"]
+
+            logs, total = sink.query(
+                db,
+                action="verify_code",
+                start_time=_timestamp(base + timedelta(minutes=30)),
+                end_time=_timestamp(base + timedelta(hours=1, minutes=30)),
+            )
+            assert total == 1 and logs[0].resource_id == "code-1"
+
+        # 时间范围不相交的已压缩分段不被读取
+        (tmp_path / "audit" / index[0]["segment"]).write_bytes(b"corrupted")
+        with session_factory() as db:
+            _, total = sink.query(db, start_time=_timestamp(base + timedelta(hours=1)))
+        assert total == 4
+
+        sink.close()
+        assert not list((tmp_path / "audit").glob("audit-*.jsonl"))
+        with session_factory() as db:
+            _, total = sink.query(db, start_time=_timestamp(base + timedelta(hours=1)))
+        assert total == 4
+
+
+class TestFanoutAuditSink:
+    """多路审计日志存储测试类"""
+
+    def test_writes_all_sinks_and_reads_first(self, session_factory, tmp_path):
+        """测试同时写入数据库与文件（ID 一致），查询从第一个存储读取"""
+        file_sink = FileAuditSink(str(tmp_path / "audit"), max_bytes=1024 * 1024, rotate_seconds=3600)
+        sink = FanoutAuditSink([DatabaseAuditSink(), file_sink])
+
+        with session_factory() as db:
+            log = AuditLog(action="create_project", actor_id="admin-1", resource_type="project")
+            sink.write(db, log)
+            db.commit()
+            log_id = log.id
+
+        with session_factory() as db:
+            db_logs, db_total = sink.query(db, actor_id="admin-1")
+            file_logs, file_total = file_sink.query(db, actor_id="admin-1")
+        assert db_total == file_total == 1
+        assert db_logs[0].id == file_logs[0].id == log_id
+        assert file_logs[0].created_at == db_logs[0].created_at
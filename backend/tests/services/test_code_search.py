@@ -0,0 +1,80 @@
+"""
+激活码子串搜索索引测试
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from sqlalchemy import delete, text, update
+
+from codegate.models import Project, InvitationCode
+from codegate.models.code_search import SEARCH_TABLE, drop_search_index, install_search_index
+from codegate.services.code import CodeRepository
+
+
+def _search(db, project_id: str, term: str) -> set[str]:
+    codes, _ = CodeRepository.get_list(db, project_id, page_size=100, search=term)
+    return {c.code for c in codes}
+
+
+class TestCodeSearch:
+    """激活码搜索索引测试类"""
+
+    def test_prefix_infix_and_sync(self, session_factory):
+        """测试前缀/中缀/短关键词搜索，以及插入、更新、删除后的索引同步"""
+        with session_factory() as db:
+            project = Project(name="项目")
+            db.add(project)
+            db.flush()
+            db.add_all([
+                InvitationCode(project_id=project.id, code=code)
+                for code in ["PROMO2024AAA", "PROMO2025BBB", "VIP2024CCC", "XY"]
+            ])
+            db.commit()
+            project_id = project.id
+
+            assert _search(db, project_id, "PROMO") == {"PROMO2024AAA", "PROMO2025BBB"}
+            assert _search(db, project_id, "2024") == {"PROMO2024AAA", "VIP2024CCC"}
+            assert _search(db, project_id, "BBB") == {"PROMO2025BBB"}
+            assert _search(db, project_id, "P2") == {"VIP2024CCC"}
+            assert _search(db, project_id, "Y") == {"XY"}
+            assert CodeRepository.count_disable_unused(db, project_id, search="2024") == 2
+
+            db.execute(update(InvitationCode).where(InvitationCode.code == "VIP2024CCC").values(code="VIP2026CCC"))
+            db.execute(delete(InvitationCode).where(InvitationCode.code == "PROMO2024AAA"))
+            db.commit()
+
+            assert _search(db, project_id, "2024") == set()
+            assert _search(db, project_id, "2026C") == {"VIP2026CCC"}
+
+            # 删除项目时级联删除的激活码同样从索引移除
+            db.delete(db.get(Project, project_id))
+            db.commit()
+            if db.get_bind().dialect.name == "sqlite":
+                assert db.execute(text(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")).scalar() == 0
+
+    def test_install_backfills_existing_rows(self, session_factory):
+        """测试在已有数据的库上补建索引时回填"""
+        with session_factory() as db:
+            project = Project(name="项目")
+            db.add(project)
+            db.flush()
+            project_id = project.id
+
+            drop_search_index(db.connection())
+            db.add(InvitationCode(project_id=project_id, code="LEGACY12345"))
+            db.flush()
+            install_search_index(db.connection())
+            db.commit()
+
+            assert _search(db, project_id, "GACY123") == {"LEGACY12345"}
@@ -0,0 +1,268 @@
+"""
+激活码服务测试
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, select
+
+from codegate.models import Project, InvitationCode
+from codegate.schemas.invitation_code import CodeGenerateRequest, InvitationCodeResponse
+from codegate.services.code import CodeService
+from codegate.services.code import code_service as code_service_module
+from codegate.services.code.code_repository import CodeRepository
+from codegate.services.code.code_service import EXPORT_FIELDS
+
+
+def _create_project(factory, name: str = "项目") -> str:
+    with factory() as db:
+        project = Project(name=name)
+        db.add(project)
+        db.commit()
+        return project.id
+
+
+class TestCodeService:
+    """激活码服务测试类"""
+
+    def test_generate_in_chunks(self, session_factory):
+        """测试跨多个插入分块生成"""
+        project_id = _create_project(session_factory)
+
+        with session_factory() as db:
+            codes = CodeService.generate(db, project_id, CodeGenerateRequest(count=2500, length=12))
+            assert len(codes) == len({c.code for c in codes}) == 2500
+            assert all(c.project_id == project_id and c.id and c.created_at for c in codes)
+            # 返回对象不加入会话，也不加载项目的全部激活码
+            assert codes[0].project.id == project_id and codes[0] not in db
+            assert "invitation_codes" not in codes[0].project.__dict__
+            response = InvitationCodeResponse.model_validate(codes[0])
+            assert response.is_valid is True and response.verified_at is None
+
+        with session_factory() as db:
+            total = db.execute(select(func.count(InvitationCode.id))).scalar()
+            assert total == 2500
+
+    def test_generate_regenerates_conflicts(self, session_factory, monkeypatch):
+        """测试与其他项目激活码冲突的行被跳过并重新生成"""
+        other_id = _create_project(session_factory, "其他项目")
+        project_id = _create_project(session_factory)
+        with session_factory() as db:
+            db.add(InvitationCode(project_id=other_id, code="TAKEN0000001"))
+            db.commit()
+
+        real_generate = code_service_module.generate_codes
+        calls = []
+
+        def fake_generate(count, **kwargs):
+            calls.append(count)
+            if len(calls) == 1:
+                return ["TAKEN0000001"] + real_generate(count=count - 1, **kwargs)
+            return real_generate(count=count, **kwargs)
+
+        monkeypatch.setattr(code_service_module, "generate_codes", fake_generate)
+
+        with session_factory() as db:
+            codes = CodeService.generate(db, project_id, CodeGenerateRequest(count=5, length=12))
+            assert len(codes) == 5
+            assert "TAKEN0000001" not in {c.code for c in codes}
+        assert calls == [5, 1]
+
+        with session_factory() as db:
+            owner = db.execute(
+                select(InvitationCode.project_id).where(InvitationCode.code == "TAKEN0000001")
+            ).scalar_one()
+            assert owner == other_id
+
+    def test_insert_skipping_violations_fallback(self, session_factory):
+        """测试通用插入实现：整块冲突时逐行重试，跳过已存在的激活码，其余行写入且事务可继续"""
+        project_id = _create_project(session_factory)
+        with session_factory() as db:
+            db.add(InvitationCode(project_id=project_id, code="TAKEN0000001"))
+            db.commit()
+
+        now = datetime.utcnow()
+        rows = [
+            {"id": f"{index:032d}", "project_id": project_id, "code": code, "status": False,
+             "is_disabled": False, "is_expired": False, "expires_at": None, "created_at": now}
+            for index, code in enumerate(["FREE00000001", "TAKEN0000001", "FREE00000002"])
+        ]
+        with session_factory() as db:
+            assert CodeRepository._insert_skipping_violations(db, rows[:1]) == {"FREE00000001"}
+            assert CodeRepository._insert_skipping_violations(db, rows[1:]) == {"FREE00000002"}
+            db.commit()
+
+        with session_factory() as db:
+            codes = set(db.scalars(select(InvitationCode.code)))
+        assert codes == {"TAKEN0000001", "FREE00000001", "FREE00000002"}
+
+    def test_iter_export_csv_and_ndjson(self, session_factory):
+        """测试 CSV / NDJSON（gzip）流式导出与筛选"""
+        project_id = _create_project(session_factory)
+        with session_factory() as db:
+            CodeService.generate(db, project_id, CodeGenerateRequest(count=30, length=12))
+            db.add(InvitationCode(project_id=project_id, code="DISABLED0001", is_disabled=True))
+            db.commit()
+
+        with session_factory() as db:
+            chunks = list(CodeService.iter_export(db, project_id, "csv", batch_size=10))
+            assert len(chunks) > 1
+            rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+            assert len(rows) == 31
+            assert set(rows[0]) == set(EXPORT_FIELDS)
+            assert {r["is_disabled"] for r in rows} == {"true", "false"}
+
+            data = b"".join(CodeService.iter_export(db, project_id, "ndjson", compress=True, is_disabled=True))
+            lines = gzip.decompress(data).decode("utf-8").splitlines()
+            assert [json.loads(line)["code"] for line in lines] == ["DISABLED0001"]
+            assert isinstance(json.loads(lines[0])["created_at"], int)
+
+    def test_import_codes_csv_report(self, session_factory):
+        """测试 CSV 导入：分块写入，逐行报告无效、重复与已存在的激活码"""
+        project_id = _create_project(session_factory)
+        with session_factory() as db:
+            db.add(InvitationCode(project_id=project_id, code="EXISTING1"))
+            db.commit()
+
+        lines = ["project_id,code,status,verified_at,verified_by"]
+        lines += [f"1,IMPORT{i:04d},false,," for i in range(25)]
+        lines += [
+            "1,GHI789RST,true,2026-01-15T10:30:00,user1",
+            "1,EXISTING1,false,,",
+            "1,IMPORT0003,false,,",
+            "1,BAD CODE,false,,",
+            "1,NEWCODE1,maybe,,",
+            "1,NEWCODE2,false,2026-01-15T10:30:00,",
+        ]
+        stream = io.BytesIO("\n".join(lines).encode("utf-8"))
+
+        with session_factory() as db:
+            report = CodeService.import_codes(db, project_id, stream, "csv", chunk_size=10)
+
+        assert report["total"] == 31
+        assert report["imported_count"] == 26
+        assert [(r["row"], r["error_code"]) for r in report["rejections"]] == [
+            (27, "CODE_EXISTS"),
+            (28, "DUPLICATE_IN_FILE"),
+            (29, "INVALID_CODE"),
+            (30, "INVALID_STATUS"),
+            (31, "INCONSISTENT_STATUS"),
+        ]
+        assert not stream.closed
+
+        with session_factory() as db:
+            used = db.execute(select(InvitationCode).where(InvitationCode.code == "GHI789RST")).scalar_one()
+            assert used.status is True and used.verified_by == "user1"
+            total = db.execute(
+                select(func.count(InvitationCode.id)).where(InvitationCode.project_id == project_id)
+            ).scalar()
+            assert total == 27
+
+    def test_import_codes_json_array_and_lines(self, session_factory):
+        """测试 JSON 数组与 JSON Lines 两种格式，格式错误时整体回滚"""
+        project_id = _create_project(session_factory)
+        array = json.dumps([{"code": "JSONCODE1"}, {"code": "JSONCODE2", "status": True, "verified_at": 1768473000}])
+        lines = '{"code": "JSONCODE3"}\n{"code": "JSONCODE4", "status": "false"}\n'
+
+        with session_factory() as db:
+            assert CodeService.import_codes(db, project_id, io.BytesIO(array.encode()), "json")["imported_count"] == 2
+            assert CodeService.import_codes(db, project_id, io.BytesIO(lines.encode()), "json")["imported_count"] == 2
+
+        with session_factory() as db:
+            try:
+                CodeService.import_codes(db, project_id, io.BytesIO(b'[{"code": "JSONCODE5"}, {"code"'), "json")
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("格式错误的 JSON 应抛出 ValueError")
+
+        with session_factory() as db:
+            codes = set(db.execute(select(InvitationCode.code)).scalars().all())
+            assert codes == {"JSONCODE1", "JSONCODE2", "JSONCODE3", "JSONCODE4"}
+
+    def test_get_list_cursor_pagination(self, session_factory):
+        """测试游标分页：相同 created_at 的行按 id 续接，不重复不遗漏"""
+        project_id = _create_project(session_factory)
+        with session_factory() as db:
+            created = CodeService.generate(db, project_id, CodeGenerateRequest(count=25, length=12))
+
+        seen: list[str] = []
+        cursor = None
+        with session_factory() as db:
+            first, total, cursor = CodeService.get_list(db, project_id, page_size=10)
+            assert total == 25 and cursor
+            seen.extend(c.id for c in first)
+            while cursor:
+                page, total, cursor = CodeService.get_list(db, project_id, page_size=10, cursor=cursor, with_total=False)
+                assert total is None
+                seen.extend(c.id for c in page)
+
+            offset_page, _, _ = CodeService.get_list(db, project_id, page=2, page_size=10)
+            assert [c.id for c in offset_page] == seen[10:20]
+
+        assert len(seen) == len(set(seen)) == 25
+        assert set(seen) == {c.id for c in created}
+
+    def test_read_paths_compute_expiry_without_writing(self, session_factory):
+        """测试列表/详情在 SQL 中计算实际过期状态，读取时不执行任何写入"""
+        now = datetime.utcnow()
+        with session_factory() as db:
+            project = Project(name="项目", expires_at=now - timedelta(hours=1))
+            db.add(project)
+            db.flush()
+            db.add_all([
+                # is_expired 尚未刷新的激活码
+                InvitationCode(project_id=project.id, code="STALE0001", expires_at=now - timedelta(minutes=1)),
+                InvitationCode(project_id=project.id, code="FOLLOW001"),
+                InvitationCode(project_id=project.id, code="FUTURE001", expires_at=now + timedelta(days=1), is_expired=True),
+                # 已使用/已禁用的激活码不计为过期
+                InvitationCode(project_id=project.id, code="USED00001", status=True, verified_at=now),
+                InvitationCode(project_id=project.id, code="DISABLED1", is_disabled=True),
+            ])
+            db.commit()
+            project_id = project.id
+
+        statements = []
+        engine = session_factory.kw["bind"]
+        listener = lambda conn, cursor, statement, *args: statements.append(statement.split()[0].upper())
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            with session_factory() as db:
+                codes, total, _ = CodeService.get_list(db, project_id, page_size=10)
+                assert total == 5
+                assert {c.code: c.is_expired for c in codes} == {
+                    "STALE0001": True,
+                    "FOLLOW001": True,
+                    "FUTURE001": False,
+                    "USED00001": False,
+                    "DISABLED1": False,
+                }
+                expired, total, _ = CodeService.get_list(db, project_id, is_expired=True)
+                assert total == 2 and {c.code for c in expired} == {"STALE0001", "FOLLOW001"}
+                assert CodeService.get_by_code(db, "STALE0001").is_expired is True
+                assert CodeService.get_by_id(db, expired[0].id).is_expired is True
+                db.commit()
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        assert set(statements) == {"SELECT"}
+
+        with session_factory() as db:
+            stored = dict(db.execute(select(InvitationCode.code, InvitationCode.is_expired)).all())
+            assert stored["STALE0001"] is False and stored["FUTURE001"] is True
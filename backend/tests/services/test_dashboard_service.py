@@ -0,0 +1,131 @@
+"""
+项目概览服务测试
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import threading
+import time
+
+import pytest
+
+from codegate.models import Project, InvitationCode, VerificationLog
+from codegate.schemas.invitation_code import CodeGenerateRequest
+from codegate.services.code import CodeService
+from codegate.services.dashboard import DashboardService, OverviewCache, overview_cache
+
+
+@pytest.fixture
+def fresh_overview_cache(monkeypatch):
+    monkeypatch.setattr(overview_cache, "ttl_seconds", 60)
+    overview_cache.invalidate()
+    yield overview_cache
+    overview_cache.invalidate()
+
+
+class TestOverviewCache:
+    """概览快照缓存测试类"""
+
+    def test_single_flight(self):
+        """测试并发未命中只计算一次"""
+        cache = OverviewCache(ttl_seconds=60)
+        calls = []
+        barrier = threading.Barrier(8)
+        results = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"value": len(calls)}
+
+        def worker():
+            barrier.wait()
+            results.append(cache.get(loader))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [{"value": 1}] * 8
+
+    def test_invalidate_during_load_not_cached(self):
+        """测试计算期间发生失效时，结果不写入缓存"""
+        cache = OverviewCache(ttl_seconds=60)
+
+        def stale_loader():
+            cache.invalidate()
+            return "stale"
+
+        assert cache.get(stale_loader) == "stale"
+        assert cache.get(lambda: "fresh") == "fresh"
+        assert cache.get(lambda: "ignored") == "fresh"
+
+    def test_ttl_disabled(self):
+        """测试 TTL 为 0 时不缓存"""
+        cache = OverviewCache(ttl_seconds=0)
+        assert cache.get(lambda: 1) == 1
+        assert cache.get(lambda: 2) == 2
+
+
+class TestDashboardService:
+    """项目概览服务测试类"""
+
+    def test_overview_invalidated_on_commit(self, session_factory, fresh_overview_cache):
+        """测试写入项目/激活码/成功核销记录提交后快照失效，失败核销记录不失效"""
+        with session_factory() as db:
+            assert DashboardService.get_overview(db).project_count == 0
+
+            project = Project(name="项目")
+            db.add(project)
+            db.flush()
+            code = InvitationCode(project_id=project.id, code="CODE00000001")
+            db.add(code)
+            db.commit()
+            overview = DashboardService.get_overview(db)
+            assert (overview.project_count, overview.code_count) == (1, 1)
+
+            db.add(VerificationLog(code_id=code.id, result="failed", reason="test"))
+            db.commit()
+            assert DashboardService.get_overview(db) is overview
+
+            # 回滚的写入不失效
+            db.add(Project(name="回滚项目"))
+            db.flush()
+            db.rollback()
+            assert DashboardService.get_overview(db) is overview
+
+            # SAVEPOINT 回滚不丢弃外层事务中已标记的写入
+            db.add(Project(name="外层项目"))
+            db.flush()
+            savepoint = db.begin_nested()
+            db.add(Project(name="回滚项目"))
+            db.flush()
+            savepoint.rollback()
+            db.commit()
+            overview = DashboardService.get_overview(db)
+            assert overview.project_count == 2
+
+            code.status = True
+            db.add(VerificationLog(code_id=code.id, result="success"))
+            db.commit()
+            overview = DashboardService.get_overview(db)
+            assert (overview.verified_count, overview.unverified_count) == (1, 0)
+            assert [v.code for v in overview.recent_verifications] == ["CODE00000001"]
+
+            # 批量写入（Core INSERT）同样使快照失效
+            CodeService.generate(db, project.id, CodeGenerateRequest(count=3, length=12))
+            assert DashboardService.get_overview(db).code_count == 4
@@ -0,0 +1,84 @@
+"""
+激活码过期引擎测试
+
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from codegate.models import Project, InvitationCode
+from codegate.services.code.expiry_engine import ExpiryEngine
+
+
+def _engine(session_factory, **kwargs) -> ExpiryEngine:
+    @contextmanager
+    def session():
+        with session_factory() as db:
+            yield db
+            db.commit()
+
+    return ExpiryEngine(session_factory=session, **kwargs)
+
+
+class TestExpiryEngine:
+    """激活码过期引擎测试类"""
+
+    def test_expires_codes_at_deadlines(self, session_factory):
+        """测试在各截止时间到达时只标记到期的激活码（含跟随项目过期与新登记的截止时间）"""
+        t0 = datetime.utcnow()
+        minutes = lambda n: t0 + timedelta(minutes=n)
+        with session_factory() as db:
+            project = Project(name="项目", expires_at=minutes(30))
+            db.add(project)
+            db.flush()
+            codes = {
+                "PAST0001": InvitationCode(project_id=project.id, code="PAST0001", expires_at=minutes(-60)),
+                "SOON0001": InvitationCode(project_id=project.id, code="SOON0001", expires_at=minutes(10)),
+                "USED0001": InvitationCode(project_id=project.id, code="USED0001", expires_at=minutes(10), status=True),
+                "LATE0001": InvitationCode(project_id=project.id, code="LATE0001", expires_at=minutes(20)),
+                "FOLLOW01": InvitationCode(project_id=project.id, code="FOLLOW01"),
+                "NEVER001": InvitationCode(project_id=project.id, code="NEVER001", expires_at=minutes(600)),
+            }
+            db.add_all(codes.values())
+            db.commit()
+            ids = {code: item.id for code, item in codes.items()}
+
+        def expired() -> set[str]:
+            with session_factory() as db:
+                return {code for code, code_id in ids.items() if db.get(InvitationCode, code_id).is_expired}
+
+        engine = _engine(session_factory, horizon_seconds=3600, max_deadlines=2)
+
+        # 首次运行补齐已到期的激活码；最多加载 2 个截止时间，窗口截止到第 2 个
+        assert engine.run_pending(now=t0) == 600
+        assert expired() == {"PAST0001"}
+
+        assert engine.run_pending(now=minutes(10)) == 600
+        assert expired() == {"PAST0001", "SOON0001"}
+
+        # 窗口内新登记的截止时间提前处理
+        with session_factory() as db:
+            db.get(InvitationCode, ids["NEVER001"]).expires_at = minutes(15)
+            db.commit()
+        engine.schedule(minutes(15))
+        engine.run_pending(now=minutes(15))
+        assert expired() == {"PAST0001", "SOON0001", "NEVER001"}
+
+        # 到达窗口末尾后重新加载，项目截止时间到达时跟随项目的激活码过期
+        engine.run_pending(now=minutes(20))
+        assert expired() == {"PAST0001", "SOON0001", "NEVER001", "LATE0001"}
+        engine.run_pending(now=minutes(30))
+        assert expired() == {"PAST0001", "SOON0001", "NEVER001", "LATE0001", "FOLLOW01"}
@@ -0,0 +1,180 @@
+"""
+核销日志 / 审计日志批量写入测试
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import func, select
+
+from codegate.models import AuditLog, InvitationCode, Project, VerificationLog
+from codegate.models.verification_rollup import VerificationRollup
+from codegate.services.audit.log_writer import LogWriter
+from codegate.services.dashboard import overview_cache
+
+
+def _writer(session_factory, **kwargs) -> LogWriter:
+    @contextmanager
+    def session():
+        with session_factory() as db:
+            yield db
+
+    options = {"max_queue_size": 100, "batch_size": 100, "flush_interval_seconds": 60, "enqueue_timeout_seconds": 0}
+    options.update(kwargs)
+    return LogWriter(session_factory=session, **options)
+
+
+def _count(session_factory, model) -> int:
+    with session_factory() as db:
+        return db.scalar(select(func.count()).select_from(model))
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestLogWriter:
+    """日志批量写入器测试类"""
+
+    def test_writes_committed_logs_in_batches(self, session_factory):
+        """测试提交后的日志按批写入（含核销汇总），回滚的日志被丢弃，停止时写入剩余日志"""
+        with session_factory() as db:
+            project = Project(name="项目")
+            db.add(project)
+            db.flush()
+            code = InvitationCode(project_id=project.id, code="CODE0001")
+            db.add(code)
+            db.commit()
+            code_id = code.id
+
+        writer = _writer(session_factory, batch_size=3)
+        writer.start()
+        try:
+            with session_factory() as db:
+                log = VerificationLog(code_id=code_id, result="failed", reason="测试")
+                writer.add(db, log)
+                writer.add(db, AuditLog(action="verify_code", actor_type="external"))
+                assert log.id and log.verified_at is not None
+                db.commit()
+
+            with session_factory() as db:
+                writer.add(db, AuditLog(action="discarded", actor_type="external"))
+                db.rollback()
+
+            # 未达到批量大小且未到写入间隔：尚未写入
+            assert _count(session_factory, VerificationLog) == 0
+
+            with session_factory() as db:
+                writer.add(db, VerificationLog(code_id=code_id, result="success"))
+                db.commit()
+            assert _wait_for(lambda: _count(session_factory, VerificationLog) == 2)
+            assert _count(session_factory, AuditLog) == 1
+
+            with session_factory() as db:
+                writer.add(db, AuditLog(action="login", actor_type="admin"))
+                db.commit()
+        finally:
+            writer.stop()
+
+        with session_factory() as db:
+            assert set(db.scalars(select(AuditLog.action))) == {"verify_code", "login"}
+            rollups = {row.result: row.count for row in db.scalars(select(VerificationRollup))}
+        assert rollups == {"failed": 1, "success": 1}
+
+        # 停止后同步写入
+        with session_factory() as db:
+            writer.add(db, AuditLog(action="after_stop", actor_type="system"))
+            db.commit()
+        assert _count(session_factory, AuditLog) == 3
+
+    def test_full_queue_drops_without_blocking_and_skips_invalid_rows(self, session_factory):
+        """测试提交时队列已满则丢弃并计数（不阻塞）、事件循环线程上不等待，无法写入的日志被丢弃而不影响同批日志"""
+        with session_factory() as db:
+            project = Project(name="项目")
+            db.add(project)
+            db.flush()
+            code = InvitationCode(project_id=project.id, code="CODE0001")
+            db.add(code)
+            db.commit()
+            code_id = code.id
+
+        writer = _writer(session_factory, max_queue_size=3, batch_size=10, enqueue_timeout_seconds=5)
+        writer.start()
+        try:
+            with session_factory() as db:
+                writer.add(db, VerificationLog(code_id=code_id, result="failed"))
+                writer.add(db, VerificationLog(code_id="0" * 32, result="failed"))
+                writer.add(db, AuditLog(action="queued", actor_type="system"))
+                db.commit()
+
+            # 队列已满：事件循环线程上记录日志不等待，提交时丢弃
+            async def log_on_event_loop():
+                with session_factory() as db:
+                    writer.add(db, AuditLog(action="overflow", actor_type="system"))
+                    db.commit()
+
+            started = time.monotonic()
+            asyncio.run(log_on_event_loop())
+            assert time.monotonic() - started < 1
+            assert writer.dropped == 1
+        finally:
+            writer.stop()
+
+        assert _count(session_factory, VerificationLog) == 1
+        with session_factory() as db:
+            assert list(db.scalars(select(AuditLog.action))) == ["queued"]
+
+    def test_failed_only_batch_keeps_overview_snapshot(self, session_factory, monkeypatch):
+        """测试只含失败核销记录的批次不失效概览快照，含成功核销记录的批次失效"""
+        with session_factory() as db:
+            project = Project(name="项目")
+            db.add(project)
+            db.flush()
+            code = InvitationCode(project_id=project.id, code="CODE0001")
+            db.add(code)
+            db.commit()
+            code_id = code.id
+
+        monkeypatch.setattr(overview_cache, "ttl_seconds", 60)
+        overview_cache.invalidate()
+        assert overview_cache.get(lambda: "snapshot") == "snapshot"
+
+        writer = _writer(session_factory)
+        writer.start()
+        try:
+            with session_factory() as db:
+                for _ in range(3):
+                    writer.add(db, VerificationLog(code_id=code_id, result="failed"))
+                writer.add(db, AuditLog(action="verify_code", actor_type="external"))
+                db.commit()
+            assert writer.flush() == 4
+            assert overview_cache.get(lambda: "recomputed") == "snapshot"
+
+            with session_factory() as db:
+                writer.add(db, VerificationLog(code_id=code_id, result="failed"))
+                writer.add(db, VerificationLog(code_id=code_id, result="success"))
+                db.commit()
+            assert writer.flush() == 2
+            assert overview_cache.get(lambda: "recomputed") == "recomputed"
+        finally:
+            writer.stop()
+            overview_cache.invalidate()
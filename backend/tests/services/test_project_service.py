@@ -0,0 +1,209 @@
+"""
+项目服务测试
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import io
+import time
+from datetime import datetime
+
+from sqlalchemy import update
+
+from codegate.models import Project, InvitationCode, ProjectCodeCounter, ProjectPurge, VerificationLog
+from codegate.models.project_code_counter import drop_code_counters, install_code_counters
+from codegate.schemas.invitation_code import CodeGenerateRequest, CodeUpdateRequest
+from codegate.schemas.project import ProjectUpdate
+from codegate.schemas.verification import VerificationRequest
+from codegate.services.code import CodeService
+from codegate.services.project import CodeCounterRepository, ProjectPurgeService, ProjectService
+from codegate.services.project import project_service
+from codegate.services.verification import VerificationService
+
+
+def _stats(total=0, verified=0, unverified=0, disabled=0, expired=0) -> dict[str, int]:
+    return {"total": total, "verified": verified, "unverified": unverified, "disabled": disabled, "expired": expired}
+
+
+class TestProjectService:
+    """项目服务测试类"""
+
+    def test_get_code_stats_buckets(self, session_factory):
+        """测试单次聚合统计五个分组（含已禁用），且只统计本项目"""
+        with session_factory() as db:
+            project = Project(name="项目")
+            other = Project(name="其他项目")
+            db.add_all([project, other])
+            db.flush()
+            db.add_all([
+                InvitationCode(project_id=project.id, code="UNUSED001"),
+                InvitationCode(project_id=project.id, code="UNUSED002"),
+                InvitationCode(project_id=project.id, code="USED00001", status=True, verified_at=datetime.utcnow()),
+                InvitationCode(project_id=project.id, code="DISABLED1", is_disabled=True),
+                InvitationCode(project_id=project.id, code="EXPIRED01", is_expired=True),
+                InvitationCode(project_id=other.id, code="OTHER0001"),
+            ])
+            db.commit()
+
+            assert ProjectService.get_code_stats(db, project.id) == {
+                "total": 5,
+                "verified": 1,
+                "unverified": 2,
+                "disabled": 1,
+                "expired": 1,
+            }
+
+    def test_code_counters_follow_state_transitions(self, session_factory):
+        """测试计数器随生成/导入/核销/禁用/启用/有效期变更/删除在同一事务内更新"""
+        with session_factory() as db:
+            project = Project(name="项目")
+            db.add(project)
+            db.commit()
+            project_id = project.id
+
+        with session_factory() as db:
+            codes = CodeService.generate(db, project_id, CodeGenerateRequest(count=10, length=12))
+            CodeService.import_codes(db, project_id, io.BytesIO(b"code,status\nIMPORTED0001,true\n"), "csv")
+            assert ProjectService.get_code_stats(db, project_id) == _stats(11, 1, 10)
+
+            VerificationService.verify(db, VerificationRequest(code=codes[0].code))
+            VerificationService.verify_batch(db, project_id, [codes[1].code, codes[2].code])
+            CodeService.update_by_id(db, codes[3].id, CodeUpdateRequest(is_disabled=True))
+            past = int(time.time()) - 86400
+            CodeService.update_by_id(db, codes[4].id, CodeUpdateRequest(expires_at=past))
+            assert ProjectService.get_code_stats(db, project_id) == _stats(11, 4, 5, 1, 1)
+
+            CodeService.update_by_id(db, codes[3].id, CodeUpdateRequest(is_disabled=False))
+            assert CodeService.batch_disable_unused(db, project_id, search=codes[5].code) == 1
+            CodeService.delete(db, codes[0].id)
+            CodeService.delete_batch(db, [codes[4].id, codes[6].id])
+            assert ProjectService.get_code_stats(db, project_id) == _stats(8, 3, 4, 1, 0)
+
+            before, after = CodeCounterRepository.rebuild(db, project_id)
+            assert before == after == _stats(8, 3, 4, 1, 0)
+            db.rollback()
+
+            # 项目删除后计数行随之删除，全局统计不再包含该项目
+            ProjectService.delete(db, project_id)
+            assert CodeCounterRepository.get_stats(db) == _stats()
+            assert db.query(ProjectCodeCounter).count() == 0
+
+    def test_code_counters_rebuild_and_backfill(self, session_factory):
+        """测试对账重建偏差计数，以及在已有数据上首次安装触发器时回填"""
+        with session_factory() as db:
+            project = Project(name="项目")
+            db.add(project)
+            db.flush()
+            db.add_all([
+                InvitationCode(project_id=project.id, code="CODE00000001"),
+                InvitationCode(project_id=project.id, code="CODE00000002", status=True),
+            ])
+            db.commit()
+            project_id = project.id
+
+            db.execute(update(ProjectCodeCounter).values(unverified_count=ProjectCodeCounter.unverified_count + 5))
+            db.commit()
+            assert CodeCounterRepository.get_stats(db, project_id) == _stats(7, 1, 6)
+
+            before, after = CodeCounterRepository.rebuild(db, project_id)
+            db.commit()
+            assert before == _stats(7, 1, 6)
+            assert after == ProjectService.get_code_stats(db, project_id) == _stats(2, 1, 1)
+
+            # 触发器缺失期间写入的激活码在重新安装时回填
+            connection = db.connection()
+            drop_code_counters(connection)
+            db.add(InvitationCode(project_id=project_id, code="CODE00000003", is_disabled=True))
+            db.flush()
+            install_code_counters(connection)
+            db.commit()
+            assert ProjectService.get_code_stats(db, project_id) == _stats(3, 1, 1, 1)
+
+    def test_purge_in_chunks_and_resume(self, session_factory):
+        """测试按块清除项目：先日志后激活码，进度可续，完成后项目及任务删除"""
+        with session_factory() as db:
+            project = Project(name="项目")
+            other = Project(name="其他项目")
+            db.add_all([project, other])
+            db.flush()
+            codes = [InvitationCode(project_id=project.id, code=f"CODE{i:08d}") for i in range(7)]
+            db.add_all(codes + [InvitationCode(project_id=other.id, code="OTHER0000001")])
+            db.flush()
+            db.add_all([VerificationLog(code_id=code.id, result="failed") for code in codes[:5]])
+            db.commit()
+            project_id = project.id
+
+            # 登记后项目禁用并从列表移除
+            ProjectService.request_delete(db, project_id)
+            db.commit()
+            assert db.get(Project, project_id).status is False
+            assert [p.id for p in ProjectService.get_list(db)[0]] == [other.id]
+            assert ProjectPurgeService.list_pending(db) == [project_id]
+
+            # 模拟中断：处理第一块后抛出
+            def interrupt(progress):
+                raise KeyboardInterrupt
+
+            try:
+                ProjectPurgeService.purge(db, project_id, batch_size=2, on_progress=interrupt)
+            except KeyboardInterrupt:
+                pass
+            db.expire_all()
+            assert db.get(ProjectPurge, project_id).logs_deleted == 2
+            assert db.query(VerificationLog).count() == 3
+
+            progress = []
+            result = ProjectPurgeService.purge(db, project_id, batch_size=2, on_progress=progress.append)
+            assert (result["logs_deleted"], result["codes_deleted"]) == (5, 7)
+            # 日志 3 行分 2 块，激活码 7 行分 4 块
+            assert result["chunks"] == len(progress) == 6
+            assert [p["codes_deleted"] for p in progress] == [0, 0, 2, 4, 6, 7]
+
+            db.expire_all()
+            assert db.get(Project, project_id) is None
+            assert ProjectPurgeService.list_pending(db) == []
+            assert db.query(InvitationCode).count() == 1
+            assert CodeCounterRepository.get_stats(db, project_id) == _stats()
+
+    def test_update_expires_at_recomputes_codes(self, session_factory, monkeypatch):
+        """测试项目过期时间变更时同一事务内重算跟随项目的激活码，超过上限时改为分块重算"""
+        with session_factory() as db:
+            project = Project(name="项目")
+            db.add(project)
+            db.flush()
+            now = datetime.utcnow()
+            db.add_all([InvitationCode(project_id=project.id, code=f"FOLLOW{i:04d}") for i in range(3)] + [
+                InvitationCode(project_id=project.id, code="OWNEXPIRY01", expires_at=now.replace(year=now.year + 1)),
+                InvitationCode(project_id=project.id, code="USED0000001", status=True, verified_at=now),
+            ])
+            db.commit()
+            project_id = project.id
+            past, future = int(time.time()) - 3600, int(time.time()) + 3600
+
+            # 过期时间提前到过去：跟随项目的 3 个未使用激活码立即过期
+            _, expiry = ProjectService.update(db, project_id, ProjectUpdate(expires_at=past))
+            assert expiry == {"updated": 3, "deferred": False}
+            assert ProjectService.get_code_stats(db, project_id) == _stats(5, 1, 1, 0, 3)
+
+            # 未变更时不重算
+            _, expiry = ProjectService.update(db, project_id, ProjectUpdate(expires_at=past))
+            assert expiry == {"updated": 0, "deferred": False}
+
+            # 超过上限时不在事务内更新，由分块重算完成
+            monkeypatch.setattr(project_service, "PROJECT_EXPIRY_INLINE_LIMIT", 2)
+            _, expiry = ProjectService.update(db, project_id, ProjectUpdate(expires_at=future))
+            assert expiry == {"updated": 0, "deferred": True}
+            assert ProjectService.get_code_stats(db, project_id)["expired"] == 3
+            assert ProjectService.recompute_code_expiry(db, project_id, batch_size=2) == 3
+            assert ProjectService.get_code_stats(db, project_id) == _stats(5, 1, 4)
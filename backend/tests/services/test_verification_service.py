@@ -0,0 +1,182 @@
+"""
+核销服务测试
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from codegate.models import Project, InvitationCode, VerificationLog
+from codegate.schemas.verification import VerificationRequest
+from codegate.services.verification import VerificationService
+from codegate.core.exceptions import (
+    CodeAlreadyVerifiedError,
+    CodeDisabledError,
+    CodeExpiredError,
+    CodeNotFoundError,
+    ProjectDisabledError,
+)
+
+
+def _create_code(factory, code="TESTCODE0001", project_status=True, **code_fields) -> str:
+    """创建项目和一个激活码，返回激活码 ID"""
+    with factory() as db:
+        project = Project(name=f"项目-{code}", status=project_status)
+        db.add(project)
+        db.flush()
+        invitation_code = InvitationCode(project_id=project.id, code=code, **code_fields)
+        db.add(invitation_code)
+        db.commit()
+        return invitation_code.id
+
+
+class TestVerificationService:
+    """核销服务测试类"""
+
+    def test_verify_success(self, session_factory):
+        """测试正常核销"""
+        code_id = _create_code(session_factory)
+
+        with session_factory() as db:
+            code = VerificationService.verify(db, VerificationRequest(code="TESTCODE0001", verified_by="u1"))
+            assert code.id == code_id
+            assert code.status is True
+            assert code.verified_by == "u1"
+            assert code.verified_at is not None
+
+        with session_factory() as db:
+            logs = db.execute(select(VerificationLog)).scalars().all()
+            assert [log.result for log in logs] == ["success"]
+
+    def test_verify_failure_reasons(self, session_factory):
+        """测试各类失败原因"""
+        _create_code(session_factory, code="DISABLED0001", is_disabled=True)
+        _create_code(session_factory, code="EXPIRED00001", expires_at=datetime.utcnow() - timedelta(days=1))
+        _create_code(session_factory, code="PROJOFF00001", project_status=False)
+
+        with session_factory() as db:
+            with pytest.raises(CodeNotFoundError):
+                VerificationService.verify(db, VerificationRequest(code="NOTEXIST0001"))
+            with pytest.raises(CodeDisabledError):
+                VerificationService.verify(db, VerificationRequest(code="DISABLED0001"))
+            with pytest.raises(CodeExpiredError):
+                VerificationService.verify(db, VerificationRequest(code="EXPIRED00001"))
+            with pytest.raises(ProjectDisabledError):
+                VerificationService.verify(db, VerificationRequest(code="PROJOFF00001"))
+
+    def test_verify_twice(self, session_factory):
+        """测试重复核销"""
+        _create_code(session_factory)
+
+        with session_factory() as db:
+            VerificationService.verify(db, VerificationRequest(code="TESTCODE0001"))
+            with pytest.raises(CodeAlreadyVerifiedError):
+                VerificationService.verify(db, VerificationRequest(code="TESTCODE0001"))
+
+    def test_concurrent_verify_single_winner(self, session_factory):
+        """测试并发核销同一激活码时只有一个请求成功"""
+        _create_code(session_factory)
+        workers = 16
+        barrier = threading.Barrier(workers)
+        results: list[str] = []
+        results_lock = threading.Lock()
+
+        def redeem(index: int) -> None:
+            with session_factory() as db:
+                barrier.wait()
+                try:
+                    VerificationService.verify(
+                        db, VerificationRequest(code="TESTCODE0001", verified_by=f"worker-{index}")
+                    )
+                    outcome = "success"
+                except CodeAlreadyVerifiedError:
+                    outcome = "already_verified"
+            with results_lock:
+                results.append(outcome)
+
+        threads = [threading.Thread(target=redeem, args=(i,)) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results.count("success") == 1
+        assert results.count("already_verified") == workers - 1
+
+        with session_factory() as db:
+            logs = db.execute(select(VerificationLog)).scalars().all()
+            assert sum(1 for log in logs if log.result == "success") == 1
+
+    def test_verify_batch(self, session_factory):
+        """测试批量核销：成功/不存在/重复/已禁用/其他项目的激活码"""
+        first_id = _create_code(session_factory, code="BATCHCODE001")
+        _create_code(session_factory, code="OTHERPROJ001")
+
+        with session_factory() as db:
+            project_id = db.get(InvitationCode, first_id).project_id
+            db.add(InvitationCode(project_id=project_id, code="BATCHCODE002"))
+            db.add(InvitationCode(project_id=project_id, code="BATCHCODE003", is_disabled=True))
+            db.commit()
+
+        with session_factory() as db:
+            results = VerificationService.verify_batch(
+                db,
+                project_id=project_id,
+                codes=["BATCHCODE001", "NOTEXIST0001", "BATCHCODE001", "BATCHCODE002", "BATCHCODE003", "OTHERPROJ001"],
+                verified_by="pos",
+            )
+
+        assert [r["code"] for r in results][:2] == ["BATCHCODE001", "NOTEXIST0001"]
+        assert results[0]["error"] is None and results[0]["code_id"] == first_id
+        assert isinstance(results[1]["error"], CodeNotFoundError)
+        assert isinstance(results[2]["error"], CodeAlreadyVerifiedError)
+        assert results[3]["error"] is None
+        assert isinstance(results[4]["error"], CodeDisabledError)
+        assert isinstance(results[5]["error"], CodeNotFoundError)
+
+        with session_factory() as db:
+            logs = db.execute(select(VerificationLog)).scalars().all()
+            assert sorted(log.result for log in logs) == ["failed", "success", "success"]
+
+    def test_verification_series_from_rollups(self, session_factory):
+        """测试核销日志写入时增量汇总，按小时/按天读取时间序列"""
+        code_id = _create_code(session_factory, code="SERIESCODE01")
+        base = datetime(2026, 1, 1, 10, 30)
+
+        with session_factory() as db:
+            project_id = db.get(InvitationCode, code_id).project_id
+            db.add_all([
+                VerificationLog(code_id=code_id, verified_at=base, result="success"),
+                VerificationLog(code_id=code_id, verified_at=base + timedelta(minutes=20), result="failed"),
+                VerificationLog(code_id=code_id, verified_at=base + timedelta(minutes=40), result="failed"),
+                VerificationLog(code_id=code_id, verified_at=base + timedelta(days=1), result="failed"),
+            ])
+            db.commit()
+
+            start = int(datetime(2026, 1, 1, 9, 15).replace(tzinfo=timezone.utc).timestamp())
+            hourly = VerificationService.get_series(db, project_id, start, start + 3 * 3600, "hour")
+            assert [(p["success"], p["failed"]) for p in hourly] == [(0, 0), (1, 1), (0, 1), (0, 0)]
+            assert hourly[0]["bucket_start"] == start - 15 * 60
+
+            daily = VerificationService.get_series(db, project_id, start, start + 2 * 86400, "day")
+            assert [(p["success"], p["failed"]) for p in daily] == [(1, 2), (0, 1), (0, 0)]
+
+            with pytest.raises(ValueError):
+                VerificationService.get_series(db, project_id, start, start + 20000 * 3600, "hour")
+            with pytest.raises(ValueError):
+                VerificationService.get_series(db, project_id, start, start, "minute")
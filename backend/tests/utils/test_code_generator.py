@@ -0,0 +1,62 @@
+"""
+激活码生成器测试
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from collections import Counter
+
+import pytest
+
+from codegate.core.constants import DEFAULT_CODE_CHARSET
+from codegate.utils import code_generator
+from codegate.utils.code_generator import generate_codes, random_strings
+
+
+class TestCodeGenerator:
+    """激活码生成器测试类"""
+
+    def test_generate_unique_with_prefix_suffix(self):
+        """测试生成数量、唯一性与前后缀"""
+        codes = generate_codes(2000, length=12, prefix="AB", suffix="Z")
+        assert len(codes) == len(set(codes)) == 2000
+        for code in codes:
+            assert len(code) == 12 and code.startswith("AB") and code.endswith("Z")
+            assert set(code[2:-1]) <= set(DEFAULT_CODE_CHARSET)
+
+    def test_existing_codes_avoided(self):
+        """测试避开已存在的激活码（小空间下需多轮补足）"""
+        existing = {"PROMO" + a + b + "A" for a in "AB" for b in "AB"}
+        codes = generate_codes(4, length=8, prefix="PROMO", charset="AB", existing_codes=existing)
+        assert len(set(codes)) == 4
+        assert not set(codes) & existing
+
+    @pytest.mark.parametrize("numpy_enabled", [True, False])
+    def test_uniform_distribution(self, monkeypatch, numpy_enabled):
+        """测试非 2 的幂大小字符集下字符分布均匀（无取模偏差）"""
+        if numpy_enabled and not code_generator._numpy_available:
+            pytest.skip("未安装 numpy")
+        monkeypatch.setattr(code_generator, "_numpy_available", numpy_enabled)
+
+        charset = "ABCDEFGHIJ"  # 256 % 10 != 0
+        counts = Counter("".join(random_strings(20000, 10, charset)))
+        expected = 20000 * 10 / len(charset)
+        assert set(counts) == set(charset)
+        for count in counts.values():
+            assert abs(count - expected) / expected < 0.03
+
+    def test_non_ascii_charset(self):
+        """测试非 ASCII 字符集"""
+        values = random_strings(50, 8, "甲乙丙丁")
+        assert all(len(v) == 8 and set(v) <= set("甲乙丙丁") for v in values)
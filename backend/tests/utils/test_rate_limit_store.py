@@ -0,0 +1,174 @@
+"""
+Redis 限流存储测试
+
+默认使用进程内的最小 Redis 协议替身（支持 GET、TTL、DEL，并以 Python 实现限流存储
+使用的 EVAL 脚本，记录其设置的过期时间）；
+设置环境变量 CODEGATE_TEST_REDIS_URL 时改为连接真实 Redis。
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+import socketserver
+import threading
+
+import pytest
+
+pytest.importorskip("redis")
+
+from codegate.utils.rate_limiter import _HIT_SCRIPT, MemoryRateLimitStore, RedisRateLimitStore
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    """最小 Redis 协议实现，仅覆盖限流存储使用的命令"""
+
+    def _read_command(self) -> list[str]:
+        header = self.rfile.readline()
+        if not header:
+            return []
+        args = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2].decode())
+        return args
+
+    def _execute(self, args: list[str]) -> bytes:
+        data, expiry = self.server.data, self.server.expiry
+        name = args[0].upper()
+        if name == "HELLO":
+            # 除空值外，其余应答格式在 RESP2 / RESP3 下相同
+            self.protocol = int(args[1]) if len(args) > 1 else 2
+            return b"%%1\r\n$5\r\nproto\r\n:%d\r\n" % self.protocol
+        if name == "PING":
+            return b"+PONG\r\n"
+        if name == "GET":
+            if args[1] not in data:
+                return b"_\r\n" if self.protocol == 3 else b"$-1\r\n"
+            value = str(data[args[1]]).encode()
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == "TTL":
+            # 替身不实际过期，返回最近一次设置的过期秒数
+            if args[1] not in data:
+                return b":-2\r\n"
+            return b":%d\r\n" % expiry.get(args[1], -1)
+        if name == "EVAL":
+            # 替身不解释 Lua，只接受限流存储的检查并计数脚本
+            if args[1] != _HIT_SCRIPT:
+                return b"-ERR unknown script\r\n"
+            numkeys = int(args[2])
+            (current_key, previous_key), (weight, limit, ttl) = args[3:3 + numkeys], args[3 + numkeys:]
+            current = int(data.get(current_key, 0))
+            if int(data.get(previous_key, 0)) * float(weight) + current >= int(limit):
+                return b":0\r\n"
+            data[current_key] = current + 1
+            expiry[current_key] = int(ttl)
+            return b":1\r\n"
+        if name == "DEL":
+            for key in args[1:]:
+                expiry.pop(key, None)
+            return b":%d\r\n" % sum(data.pop(k, None) is not None for k in args[1:])
+        return b"-ERR unknown command\r\n"
+
+    def handle(self) -> None:
+        self.protocol = 2
+        while True:
+            args = self._read_command()
+            if not args:
+                return
+            with self.server.lock:
+                self.wfile.write(self._execute(args))
+
+
+@pytest.fixture
+def redis_url():
+    """真实 Redis 地址，或启动进程内协议替身"""
+    url = os.environ.get("CODEGATE_TEST_REDIS_URL")
+    if url:
+        yield url
+        return
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _RespHandler)
+    server.daemon_threads = True
+    server.data, server.expiry, server.lock = {}, {}, threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    server.shutdown()
+    server.server_close()
+
+
+class TestRedisRateLimitStore:
+    """Redis 限流存储测试类"""
+
+    def test_limit_and_sliding_window(self, redis_url):
+        """测试窗口内限流与跨窗口加权"""
+        store = RedisRateLimitStore(redis_url, prefix=f"test:{os.getpid()}:")
+
+        for _ in range(10):
+            assert store.hit("k", 10, 60, now=6000.0)
+        assert not store.hit("k", 10, 60, now=6000.0)
+
+        # 上一窗口计数为 10（被拒绝的请求不计数），过去 1/2 后计为 5，可再通过 5 次
+        for _ in range(5):
+            assert store.hit("k", 10, 60, now=6090.0)
+        assert not store.hit("k", 10, 60, now=6090.0)
+
+        # 不同键互不影响
+        assert store.hit("other", 10, 60, now=6090.0)
+
+    def test_shared_between_instances(self, redis_url):
+        """测试多个实例（模拟多进程）共享计数"""
+        prefix = f"test:{os.getpid()}:shared:"
+        first = RedisRateLimitStore(redis_url, prefix=prefix)
+        second = RedisRateLimitStore(redis_url, prefix=prefix)
+
+        assert first.hit("k", 2, 60, now=6000.0)
+        assert second.hit("k", 2, 60, now=6000.0)
+        assert not first.hit("k", 2, 60, now=6000.0)
+        assert not second.hit("k", 2, 60, now=6000.0)
+
+    def test_rejected_requests_are_not_counted(self, redis_url):
+        """测试超限后持续重试不计数：窗口滑动后按已通过的请求数恢复放行"""
+        store = RedisRateLimitStore(redis_url, prefix=f"test:{os.getpid()}:retry:")
+
+        for _ in range(10):
+            assert store.hit("k", 10, 60, now=6000.0)
+        for _ in range(100):
+            assert not store.hit("k", 10, 60, now=6030.0)
+
+        # 上一窗口只计入通过的 10 次，过去 1/2 后计为 5
+        assert store.hit("k", 10, 60, now=6090.0)
+
+    def test_counter_keys_expire(self, redis_url):
+        """测试窗口计数键设置过期时间（覆盖下一窗口的加权计算，之后由 Redis 清除）"""
+        store = RedisRateLimitStore(redis_url, prefix=f"test:{os.getpid()}:ttl:")
+
+        assert store.hit("k", 10, 60, now=6000.0)
+        assert 60 < store.client.ttl(store._key("k", 6000)) <= 120
+        store.reset("k")
+
+    def test_falls_back_to_memory_when_redis_unavailable(self):
+        """测试 Redis 不可用时改用进程内限流（不抛出异常）"""
+        server = socketserver.TCPServer(("127.0.0.1", 0), socketserver.BaseRequestHandler)
+        port = server.server_address[1]
+        server.server_close()
+        store = RedisRateLimitStore(
+            f"redis://127.0.0.1:{port}/0", socket_timeout=0.2, fallback=MemoryRateLimitStore()
+        )
+
+        assert store.hit("k", 2, 60, now=6000.0)
+        assert store.hit("k", 2, 60, now=6000.0)
+        assert not store.hit("k", 2, 60, now=6000.0)
+        store.reset("k")
+        assert store.hit("k", 2, 60, now=6000.0)
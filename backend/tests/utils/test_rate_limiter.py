@@ -0,0 +1,60 @@
+"""
+频率限制器测试
+
+Copyright 2026 pfeak
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import pytest
+
+from codegate.core.exceptions import RateLimitExceededError
+from codegate.utils.rate_limiter import MemoryRateLimitStore, RateLimiter
+
+
+class TestRateLimiter:
+    """频率限制器测试类"""
+
+    def test_limit_within_window(self):
+        """测试窗口内超过次数后拒绝"""
+        limiter = RateLimiter()
+        for _ in range(3):
+            limiter.check_rate_limit("10.0.0.1", max_attempts=3, time_window_seconds=60)
+        with pytest.raises(RateLimitExceededError):
+            limiter.check_rate_limit("10.0.0.1", max_attempts=3, time_window_seconds=60)
+
+        # 其他 IP 不受影响
+        limiter.check_rate_limit("10.0.0.2", max_attempts=3, time_window_seconds=60)
+
+        limiter.reset("10.0.0.1")
+        limiter.check_rate_limit("10.0.0.1", max_attempts=3, time_window_seconds=60)
+
+    def test_sliding_window_weighting(self):
+        """测试上一窗口计数按剩余占比加权"""
+        limiter = MemoryRateLimitStore()
+        for _ in range(10):
+            assert limiter.hit("k", 10, 60, now=6000.0)
+
+        # 下一窗口过去 1/4：上一窗口计为 10 * 0.75 = 7.5，可再通过 3 次
+        for _ in range(3):
+            assert limiter.hit("k", 10, 60, now=6075.0)
+        assert not limiter.hit("k", 10, 60, now=6075.0)
+
+        # 跨越两个窗口后计数清零
+        assert limiter.hit("k", 10, 60, now=6300.0)
+
+    def test_lru_eviction_bounds_memory(self):
+        """测试超过容量后淘汰最久未访问的键"""
+        limiter = MemoryRateLimitStore(max_keys=64, shard_count=4)
+        for i in range(10_000):
+            limiter.hit(f"192.168.{i // 256}.{i % 256}", 5, 60)
+        assert len(limiter) <= 64
@@ -5,9 +5,10 @@ CodeGate SDK 客户端
 """
 
 import requests
+import hashlib
 import json
 import time
-from typing import Dict, Optional, Any
+from typing import BinaryIO, Dict, Iterator, List, Optional, Any
 from urllib.parse import urlencode, quote
 
 from .signature import generate_signature
@@ -44,7 +45,8 @@ class CodeGateClient:
         path: str,
         query_params: Optional[Dict[str, str]] = None,
         body: Optional[str] = None,
-        timestamp: int = None
+        timestamp: int = None,
+        body_hash: Optional[str] = None
     ) -> str:
         """生成 HMAC-SHA256 签名（内部方法）"""
         if timestamp is None:
@@ -56,27 +58,34 @@ class CodeGateClient:
             query_params=query_params,
             body=body,
             timestamp=timestamp,
-            secret=self.secret
+            secret=self.secret,
+            body_hash=body_hash
         )
 
-    def _make_request(
+    def _send_request(
         self,
         method: str,
         path: str,
         query_params: Optional[Dict[str, Any]] = None,
-        body: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
+        body: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        upload: Optional[BinaryIO] = None,
+        upload_hash: Optional[str] = None
+    ) -> requests.Response:
         """
-        发送 HTTP 请求（内部方法）
+        发送已签名的 HTTP 请求（内部方法）
 
         Args:
             method: HTTP 方法
             path: 请求路径
             query_params: 查询参数字典
             body: 请求体字典
+            stream: 是否流式读取响应体
+            upload: 作为请求体上传的二进制文件对象（与 body 互斥）
+            upload_hash: upload 内容的 SHA256
 
         Returns:
-            响应 JSON 数据
+            响应对象
 
         Raises:
             requests.exceptions.HTTPError: HTTP 错误
@@ -103,7 +112,8 @@ class CodeGateClient:
             path=path,
             query_params=query_string_dict,
             body=body_string,
-            timestamp=timestamp
+            timestamp=timestamp,
+            body_hash=upload_hash
         )
 
         # 设置请求头
@@ -111,20 +121,46 @@ class CodeGateClient:
             "X-API-Key": self.api_key,
             "X-Timestamp": str(timestamp),
             "X-Signature": signature,
-            "Content-Type": "application/json"
+            "Content-Type": "application/octet-stream" if upload is not None else "application/json"
         }
 
-        # 发送请求
+        # 发送请求（上传文件时由 requests 分块读取文件对象）
         response = self.session.request(
             method=method,
             url=url,
             headers=headers,
-            data=body_string if body_string else None
+            data=upload if upload is not None else (body_string if body_string else None),
+            stream=stream
         )
 
         # 处理响应
         response.raise_for_status()
-        return response.json()
+        return response
+
+    def _make_request(
+        self,
+        method: str,
+        path: str,
+        query_params: Optional[Dict[str, Any]] = None,
+        body: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        发送 HTTP 请求（内部方法）
+
+        Args:
+            method: HTTP 方法
+            path: 请求路径
+            query_params: 查询参数字典
+            body: 请求体字典
+
+        Returns:
+            响应 JSON 数据
+
+        Raises:
+            requests.exceptions.HTTPError: HTTP 错误
+            requests.exceptions.RequestException: 请求异常
+        """
+        return self._send_request(method, path, query_params=query_params, body=body).json()
 
     # ========== 项目信息 API ==========
 
@@ -145,19 +181,23 @@ class CodeGateClient:
         page: int = 1,
         page_size: int = 20,
         status: Optional[str] = None,
-        search: Optional[str] = None
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = True
     ) -> Dict[str, Any]:
         """
         查询激活码列表
 
         Args:
-            page: 页码（>= 1）
+            page: 页码（>= 1，传入 cursor 时忽略）
             page_size: 每页数量（1-100）
             status: 状态筛选（'unused', 'used', 'disabled', 'expired'）
             search: 搜索关键词
+            cursor: 上一页响应中的 next_cursor（游标分页）
+            include_total: 是否统计总数（False 时 total、total_pages 为 None，查询更快）
 
         Returns:
-            激活码列表响应
+            激活码列表响应（含 next_cursor，没有更多数据时为 None）
         """
         path = f"/api/v1/projects/{self.project_id}/codes"
         query_params = {
@@ -168,9 +208,121 @@ class CodeGateClient:
             query_params["status"] = status
         if search:
             query_params["search"] = search
+        if cursor:
+            query_params["cursor"] = cursor
+        if not include_total:
+            query_params["include_total"] = "false"
 
         return self._make_request("GET", path, query_params=query_params)
 
+    def iter_codes(
+        self,
+        page_size: int = 100,
+        status: Optional[str] = None,
+        search: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        按游标自动翻页，逐个返回激活码（不统计总数）
+
+        Args:
+            page_size: 每次请求的数量（1-100）
+            status: 状态筛选（'unused', 'used', 'disabled', 'expired'）
+            search: 搜索关键词
+
+        Yields:
+            激活码字典，结构同 list_codes 的 items
+        """
+        cursor = None
+        while True:
+            page = self.list_codes(
+                page_size=page_size,
+                status=status,
+                search=search,
+                cursor=cursor,
+                include_total=False
+            )
+            yield from page["items"]
+            cursor = page.get("next_cursor")
+            if not cursor:
+                return
+
+    def export_codes(
+        self,
+        fp: BinaryIO,
+        format: str = "csv",
+        status: Optional[str] = None,
+        search: Optional[str] = None,
+        gzip: bool = False,
+        chunk_size: int = 64 * 1024
+    ) -> int:
+        """
+        流式导出激活码到文件对象（边下载边写入，不在内存中缓存完整内容）
+
+        Args:
+            fp: 以二进制写模式打开的文件对象
+            format: 导出格式（'csv', 'ndjson'）
+            status: 状态筛选（'unused', 'used', 'disabled', 'expired'）
+            search: 搜索关键词
+            gzip: 是否由服务端 gzip 压缩（写入的内容为 .gz 文件）
+            chunk_size: 每次读取的字节数
+
+        Returns:
+            写入的字节数
+        """
+        path = f"/api/v1/projects/{self.project_id}/codes/export"
+        query_params: Dict[str, Any] = {"format": format}
+        if gzip:
+            query_params["gzip"] = "true"
+        if status:
+            query_params["status"] = status
+        if search:
+            query_params["search"] = search
+
+        written = 0
+        with self._send_request("GET", path, query_params=query_params, stream=True) as response:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                fp.write(chunk)
+                written += len(chunk)
+        return written
+
+    def import_codes(
+        self,
+        fp: BinaryIO,
+        format: str = "csv",
+        chunk_size: int = 64 * 1024
+    ) -> Dict[str, Any]:
+        """
+        从文件批量导入激活码（文件内容直接作为请求体上传，不整体读入内存）
+
+        CSV 首行为表头，至少包含 code 列，可选 status、verified_at、verified_by、expires_at；
+        JSON 为对象数组或每行一个对象。单次最多 50000 行，更大的数据请拆分文件分批导入。
+
+        Args:
+            fp: 以二进制读模式打开的可 seek 文件对象
+            format: 文件格式（'csv', 'json'）
+            chunk_size: 计算签名时每次读取的字节数
+
+        Returns:
+            导入报告：total、imported_count、rejected_count、rejections（逐行拒绝原因）
+        """
+        path = f"/api/v1/projects/{self.project_id}/codes/import"
+
+        # 签名需要请求体哈希：先流式计算，再回到起始位置上传
+        start = fp.tell()
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: fp.read(chunk_size), b""):
+            digest.update(chunk)
+        fp.seek(start)
+
+        response = self._send_request(
+            "POST",
+            path,
+            query_params={"format": format},
+            upload=fp,
+            upload_hash=digest.hexdigest()
+        )
+        return response.json()
+
     def get_code(self, code_id: str) -> Dict[str, Any]:
         """
         查询单个激活码详情
@@ -222,6 +374,28 @@ class CodeGateClient:
 
         return self._make_request("POST", path, body=body)
 
+    def verify_codes(
+        self,
+        codes: List[str],
+        verified_by: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        批量核销激活码（单次请求，单个事务）
+
+        Args:
+            codes: 激活码内容列表（单次最多 500 个）
+            verified_by: 核销用户标识（可选）
+
+        Returns:
+            批量核销结果，items 与 codes 顺序一致，每项结构同 verify_code 的返回值
+        """
+        path = f"/api/v1/projects/{self.project_id}/codes/verify-batch"
+        body = {"codes": list(codes)}
+        if verified_by:
+            body["verified_by"] = verified_by
+
+        return self._make_request("POST", path, body=body)
+
     def reactivate_code(
         self,
         code: str,
@@ -259,3 +433,28 @@ class CodeGateClient:
         """
         path = f"/api/v1/projects/{self.project_id}/statistics"
         return self._make_request("GET", path)
+
+    def get_verification_series(
+        self,
+        granularity: str = "hour",
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        获取核销成功/失败次数的时间序列
+
+        Args:
+            granularity: 时间粒度（'hour' 或 'day'，按 UTC 对齐）
+            start_time: 开始时间（UTC 秒级时间戳，默认 24 小时/30 天前）
+            end_time: 结束时间（UTC 秒级时间戳，默认当前时间）
+
+        Returns:
+            时间序列响应（items 中每项含 bucket_start、success、failed）
+        """
+        path = f"/api/v1/projects/{self.project_id}/statistics/verifications"
+        query_params = {"granularity": granularity}
+        if start_time is not None:
+            query_params["start_time"] = start_time
+        if end_time is not None:
+            query_params["end_time"] = end_time
+        return self._make_request("GET", path, query_params=query_params)
@@ -19,7 +19,8 @@ def generate_signature(
     query_params: Optional[Dict[str, str]] = None,
     body: Optional[str] = None,
     timestamp: int = None,
-    secret: str = None
+    secret: str = None,
+    body_hash: Optional[str] = None
 ) -> str:
     """
     生成 HMAC-SHA256 签名
@@ -31,6 +32,7 @@ def generate_signature(
         body: 请求体字符串（可选）
         timestamp: Unix 时间戳（秒级）
         secret: API Secret（64 位十六进制字符串）
+        body_hash: 已计算的请求体 SHA256（可选，用于上传文件，提供时忽略 body）
 
     Returns:
         HMAC-SHA256 签名的十六进制字符串（64 个字符，小写）
@@ -51,11 +53,12 @@ def generate_signature(
         query_string = ""
 
     # 2. 计算请求体哈希
-    if body:
-        body_hash = hashlib.sha256(body.encode('utf-8')).hexdigest()
-    else:
-        # 使用空字符串哈希常量
-        body_hash = EMPTY_STRING_HASH
+    if body_hash is None:
+        if body:
+            body_hash = hashlib.sha256(body.encode('utf-8')).hexdigest()
+        else:
+            # 使用空字符串哈希常量
+            body_hash = EMPTY_STRING_HASH
 
     # 3. 构建签名字符串
     string_to_sign = f"{method}\n{path}\n{query_string}\n{body_hash}\n{timestamp}"